@@ -126,3 +126,11 @@ CREATE TABLE RESULTADO_DISTRITAL (
 );
 
 
+-- Paginación por clave de GET /api/votantes filtrada por región y distrito
+CREATE INDEX IX_VOTANTES_REGION_DISTRITO ON VOTANTES (REGION, DISTRITO, ID_VOTANTES DESC);
+-- Filtro solo por distrito (sin región): el índice anterior empieza por REGION y no sirve para buscarlo
+CREATE INDEX IX_VOTANTES_DISTRITO ON VOTANTES (DISTRITO, ID_VOTANTES DESC);
+
+
+-- Sincronización del flujo de votación (votantes por minuto de FECHA_VOTO desde una fecha)
+CREATE INDEX IX_VOTANTES_FECHA_VOTO ON VOTANTES (FECHA_VOTO);
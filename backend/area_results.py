@@ -0,0 +1,123 @@
+"""
+Resultados regionales y distritales por área, agregados en memoria
+Cada voto confirmado suma en su región (voto regional) o distrito (voto distrital),
+así que consultar los resultados de un área no recorre VOTO_* con GROUP BY.
+Los conteos se reconstruyen desde la base al arrancar (una consulta por categoría) y,
+con varios workers, cada cierto intervalo para sumar los votos que registraron los demás.
+"""
+import heapq
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+# Categoría -> columna de VOTANTES que define su área
+AREAS = {"regional": "region", "distrital": "distrito"}
+
+
+class AreaResults:
+    """Conteos categoría -> área -> candidato -> votos"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts: Dict[str, Dict[str, Dict[int, int]]] = {categoria: {} for categoria in AREAS}
+        self.loaded = False
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        # Métricas
+        self._votes = 0
+        self._rebuilds = 0
+        self._last_rebuild_ms = 0.0
+        self._last_rebuild: Optional[float] = None
+
+    def add(self, categoria: str, area: Optional[str], id_candidato: int, n: int = 1):
+        """Suma un voto confirmado; las categorías sin área (presidencial) se ignoran"""
+        if categoria not in AREAS:
+            return
+        area = (area or "").strip()
+        with self._lock:
+            por_area = self._counts[categoria].setdefault(area, {})
+            por_area[id_candidato] = por_area.get(id_candidato, 0) + n
+            self._votes += n
+
+    def rebuild(self, filas: Dict[str, Iterable[Tuple[Optional[str], int, int]]]):
+        """
+        Reemplaza los conteos por las filas (área, candidato, votos) de cada categoría.
+        También corre con votos en curso (después de un reenvío o con AREA_RESULTS_REFRESH):
+        lo que add() sume mientras se consultan las filas va a los conteos que se reemplazan.
+        Esos votos ya están confirmados, así que la consulta casi siempre los incluye; volver
+        a sumarlos tras el reemplazo los contaría dos veces. Un voto que la consulta no llegó
+        a leer falta hasta la reconstrucción siguiente
+        """
+        t0 = time.monotonic()
+        counts: Dict[str, Dict[str, Dict[int, int]]] = {categoria: {} for categoria in AREAS}
+        for categoria, filas_categoria in filas.items():
+            for area, id_candidato, votos in filas_categoria:
+                por_area = counts[categoria].setdefault((area or "").strip(), {})
+                por_area[id_candidato] = por_area.get(id_candidato, 0) + votos
+        with self._lock:
+            self._counts = counts
+            self.loaded = True
+            self._rebuilds += 1
+            self._last_rebuild_ms = (time.monotonic() - t0) * 1000
+            self._last_rebuild = time.time()
+
+    # ========== RECONSTRUCCIÓN PERIÓDICA ==========
+    def start(self, loader: Callable[[], Dict[str, Iterable[Tuple[Optional[str], int, int]]]], interval: float):
+        """Reconstruye con `loader` cada `interval` segundos en un hilo de fondo"""
+        if interval <= 0 or self._thread is not None:
+            return
+        self._thread = threading.Thread(
+            target=self._run, args=(loader, interval), name="area-results-refresh", daemon=True
+        )
+        self._thread.start()
+
+    def _run(self, loader, interval: float):
+        while not self._stopped.wait(interval):
+            try:
+                self.rebuild(loader())
+            except Exception as e:
+                print(f"No se pudieron reconstruir los resultados por área: {e}")
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    # ========== CONSULTA ==========
+    def top(self, categoria: str, area: Optional[str] = None, k: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Por área (todas, o solo `area`): total de votos y los `k` candidatos más votados
+        (todos si k es None), de mayor a menor. Las áreas van ordenadas por nombre
+        """
+        with self._lock:
+            if area is not None:
+                area = area.strip()
+                seleccion = {area: dict(self._counts[categoria].get(area, {}))}
+            else:
+                seleccion = {nombre: dict(conteos) for nombre, conteos in self._counts[categoria].items()}
+        resultado = []
+        for nombre in sorted(seleccion):
+            conteos = seleccion[nombre]
+            if k is None:
+                mejores = sorted(conteos.items(), key=lambda item: (-item[1], item[0]))
+            else:
+                mejores = heapq.nsmallest(k, conteos.items(), key=lambda item: (-item[1], item[0]))
+            resultado.append({
+                "area": nombre,
+                "total_votos": sum(conteos.values()),
+                "candidatos": mejores,
+            })
+        return resultado
+
+    def metrics(self) -> Dict[str, Any]:
+        """Áreas por categoría, votos sumados y reconstrucciones"""
+        with self._lock:
+            return {
+                "loaded": self.loaded,
+                "areas": {categoria: len(por_area) for categoria, por_area in self._counts.items()},
+                "votesAdded": self._votes,
+                "rebuilds": self._rebuilds,
+                "lastRebuildMs": round(self._last_rebuild_ms, 3),
+                "lastRebuild": self._last_rebuild,
+            }
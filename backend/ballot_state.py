@@ -0,0 +1,119 @@
+"""
+Índice en memoria del estado de votación de cada votante
+DNI -> ID_VOTANTES -> máscara de 3 bits con las categorías ya votadas
+"""
+import threading
+from typing import Any, Dict, Optional
+
+from votos_sql import VOTOS_COMPLETOS, YA_VOTO, VotoRechazado
+
+# Bits de la máscara por categoría
+VOTO_PRESIDENCIAL = 0b001
+VOTO_REGIONAL = 0b010
+VOTO_DISTRITAL = 0b100
+TODOS_LOS_VOTOS = VOTO_PRESIDENCIAL | VOTO_REGIONAL | VOTO_DISTRITAL
+
+BITS_CATEGORIA = {
+    "presidencial": VOTO_PRESIDENCIAL,
+    "regional": VOTO_REGIONAL,
+    "distrital": VOTO_DISTRITAL,
+}
+
+_TABLAS_VOTO = {
+    VOTO_PRESIDENCIAL: "VOTO_PRESIDENCIAL",
+    VOTO_REGIONAL: "VOTO_REGIONAL",
+    VOTO_DISTRITAL: "VOTO_DISTRITAL",
+}
+
+_FETCH_SIZE = 5000
+
+
+class BallotStateIndex:
+    """
+    Estado de votación local al proceso. Los bits solo pasan de 0 a 1, así que un
+    índice desactualizado (otro worker registró el voto) solo puede decir "puede votar";
+    el registro del voto sigue validando contra la base de datos.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._dni_a_id: Dict[str, int] = {}
+        self._mascaras: Dict[int, int] = {}
+        self._loaded = False
+        self._hits = 0
+        self._misses = 0
+
+    def load_from_db(self, cursor):
+        """Carga votantes y votos existentes desde las tablas VOTANTES y VOTO_*"""
+        dni_a_id: Dict[str, int] = {}
+        mascaras: Dict[int, int] = {}
+
+        cursor.execute("SELECT ID_VOTANTES, DNI FROM VOTANTES")
+        while True:
+            rows = cursor.fetchmany(_FETCH_SIZE)
+            if not rows:
+                break
+            for id_votantes, dni in rows:
+                dni_a_id[dni] = id_votantes
+                mascaras.setdefault(id_votantes, 0)
+
+        for bit, tabla in _TABLAS_VOTO.items():
+            cursor.execute(f"SELECT DISTINCT ID_VOTANTES FROM {tabla}")
+            while True:
+                rows = cursor.fetchmany(_FETCH_SIZE)
+                if not rows:
+                    break
+                for (id_votantes,) in rows:
+                    mascaras[id_votantes] = mascaras.get(id_votantes, 0) | bit
+
+        with self._lock:
+            # Conservar lo registrado mientras se cargaba
+            for dni, id_votantes in self._dni_a_id.items():
+                dni_a_id.setdefault(dni, id_votantes)
+            for id_votantes, mascara in self._mascaras.items():
+                mascaras[id_votantes] = mascaras.get(id_votantes, 0) | mascara
+            self._dni_a_id = dni_a_id
+            self._mascaras = mascaras
+            self._loaded = True
+
+    def register_votante(self, dni: str, id_votantes: int, mascara: int = 0):
+        """Agrega (o completa) un votante en el índice"""
+        with self._lock:
+            self._dni_a_id[dni] = id_votantes
+            self._mascaras[id_votantes] = self._mascaras.get(id_votantes, 0) | mascara
+
+    def mark_voto(self, id_votantes: int, categoria: str):
+        """Marca una categoría como votada tras confirmar el commit"""
+        self.mark_mascara(id_votantes, BITS_CATEGORIA[categoria])
+
+    def mark_mascara(self, id_votantes: int, mascara: int):
+        """Marca varias categorías a la vez"""
+        with self._lock:
+            self._mascaras[id_votantes] = self._mascaras.get(id_votantes, 0) | mascara
+
+    def mark_rechazo(self, id_votantes: int, error: VotoRechazado):
+        """Aprende de un voto rechazado por la BD lo que este proceso aún no sabía"""
+        if error.codigo == YA_VOTO:
+            self.mark_voto(id_votantes, error.categoria)
+        elif error.codigo == VOTOS_COMPLETOS:
+            self.mark_mascara(id_votantes, TODOS_LOS_VOTOS)
+
+    def get_mascara(self, dni: str) -> Optional[int]:
+        """Devuelve la máscara del votante o None si el DNI no está en el índice"""
+        with self._lock:
+            id_votantes = self._dni_a_id.get(dni)
+            if id_votantes is None:
+                self._misses += 1
+                return None
+            self._hits += 1
+            return self._mascaras.get(id_votantes, 0)
+
+    def metrics(self) -> Dict[str, Any]:
+        """Tamaño del índice y aciertos de consulta"""
+        with self._lock:
+            return {
+                "loaded": self._loaded,
+                "votantes": len(self._dni_a_id),
+                "hits": self._hits,
+                "misses": self._misses,
+            }
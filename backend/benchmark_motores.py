@@ -0,0 +1,155 @@
+"""
+Benchmark de los motores del modo simulado: diarios JSONL (SimulatedStorage) contra SQLite en WAL (SQLiteStorage)
+
+Para cada tamaño (votos ya emitidos, 3 por boleta) se precarga el almacenamiento y se mide:
+- abrir: cuánto tarda en quedar listo al arrancar el backend
+- boleta: latencia de registrar una boleta completa (misma secuencia que los endpoints), con durabilidad `batched`
+- dni: latencia de buscar un votante por DNI
+- resultados: leer todos los votos presidenciales y los candidatos (lo que recorre /api/resultados)
+- lectura concurrente: latencia de consultar el estado de un votante (lectura(), como
+  RepositorioLocal.estado_votante) mientras otro hilo mantiene abiertas transacciones de escritura
+- disco: tamaño de los archivos
+
+Uso:
+    python benchmark_motores.py [votos ...]      (por defecto 10000 100000 1000000)
+"""
+import gc
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from benchmark_simulado import registrar_boleta
+from simulated_journal import DURABILIDAD_ASINCRONA, DURABILIDAD_EN_LOTE
+from simulated_storage import SimulatedStorage
+from sqlite_storage import SQLiteStorage
+
+BOLETAS_MEDIDAS = 1000
+BUSQUEDAS = 10000
+LOTE_PRECARGA = 1000
+# Segundos que dura la prueba de lecturas concurrentes
+DURACION_LECTURAS = 2.0
+# Cuánto mantiene abierta cada transacción el hilo escritor de la prueba de lecturas concurrentes
+ESCRITURA_LARGA = 0.05
+
+
+def abrir(motor: str, directorio: Path, durabilidad: str):
+    if motor == "sqlite":
+        return SQLiteStorage(directorio / "sistema_electoral.db", durabilidad=durabilidad)
+    return SimulatedStorage(durabilidad=durabilidad, directorio=directorio)
+
+
+def precargar(motor: str, directorio: Path, boletas: int):
+    """Carga las boletas iniciales en lotes grandes y sin esperar al disco (no es lo que se mide)"""
+    storage = abrir(motor, directorio, DURABILIDAD_ASINCRONA)
+    with storage.transaction():
+        storage.add_candidato_presidencial(1, 'Candidato 1', 'Presidencial')
+        storage.add_candidato_regional(1, 'Candidato 1', 'Regional')
+        storage.add_candidato_distrital(1, 'Candidato 1', 'Distrital')
+    for inicio in range(1, boletas + 1, LOTE_PRECARGA):
+        with storage.transaction():
+            for id_votantes in range(inicio, min(inicio + LOTE_PRECARGA, boletas + 1)):
+                registrar_boleta(storage, id_votantes)
+    storage.flush()
+    storage.close()
+
+
+def estado_votante(storage, dni: str):
+    """Misma lectura que RepositorioLocal.estado_votante"""
+    with storage.lectura():
+        votante = storage.get_votante_by_dni(dni)
+        return storage.count_votos_presidenciales(votante['id_votantes'])
+
+
+def lecturas_concurrentes(storage, boletas: int, siguiente_id: int):
+    """Latencias de lectura mientras un hilo escribe boletas en transacciones de ESCRITURA_LARGA segundos"""
+    terminar = threading.Event()
+
+    def escritor():
+        id_votantes = siguiente_id
+        while not terminar.is_set():
+            with storage.transaction():
+                registrar_boleta(storage, id_votantes)
+                time.sleep(ESCRITURA_LARGA)
+            id_votantes += 1
+
+    hilo = threading.Thread(target=escritor)
+    hilo.start()
+    time.sleep(ESCRITURA_LARGA / 2)
+    latencias = []
+    fin = time.perf_counter() + DURACION_LECTURAS
+    i = 0
+    try:
+        while time.perf_counter() < fin:
+            i += 1
+            t0 = time.perf_counter()
+            estado_votante(storage, f'DNI{(i * 7919) % boletas + 1}')
+            latencias.append((time.perf_counter() - t0) * 1000)
+    finally:
+        terminar.set()
+        hilo.join()
+    latencias.sort()
+    return latencias[len(latencias) // 2], latencias[-1]
+
+
+def percentiles(latencias):
+    latencias = sorted(latencias)
+    return statistics.mean(latencias), latencias[len(latencias) // 2], latencias[int(len(latencias) * 0.95) - 1]
+
+
+def medir(motor: str, votos: int):
+    boletas = votos // 3
+    with tempfile.TemporaryDirectory() as tmp:
+        directorio = Path(tmp)
+        t0 = time.perf_counter()
+        precargar(motor, directorio, boletas)
+        precarga = time.perf_counter() - t0
+        gc.collect()
+
+        t0 = time.perf_counter()
+        storage = abrir(motor, directorio, DURABILIDAD_EN_LOTE)
+        apertura = (time.perf_counter() - t0) * 1000
+
+        latencias = []
+        for id_votantes in range(boletas + 1, boletas + 1 + BOLETAS_MEDIDAS):
+            t0 = time.perf_counter()
+            registrar_boleta(storage, id_votantes)
+            latencias.append((time.perf_counter() - t0) * 1000)
+        media, p50, p95 = percentiles(latencias)
+
+        t0 = time.perf_counter()
+        for i in range(BUSQUEDAS):
+            assert storage.get_votante_by_dni(f'DNI{(i * 7919) % boletas + 1}') is not None
+        dni = (time.perf_counter() - t0) * 1e6 / BUSQUEDAS
+
+        t0 = time.perf_counter()
+        total = len(storage.get_all_votos_presidenciales())
+        storage.get_all_candidatos_presidenciales()
+        resultados = (time.perf_counter() - t0) * 1000
+        assert total == boletas + BOLETAS_MEDIDAS
+        assert storage.get_candidato_presidencial(1)['cantidad_votos'] == total
+
+        lectura_p50, lectura_max = lecturas_concurrentes(storage, boletas, boletas + 1 + BOLETAS_MEDIDAS)
+        storage.close()
+
+        disco = sum(f.stat().st_size for f in directorio.iterdir() if f.is_file())
+
+    print(
+        f"{motor:<6} votos={votos:<8} precarga={precarga:7.1f} s  abrir={apertura:8.1f} ms  "
+        f"boleta media={media:6.2f} p50={p50:6.2f} p95={p95:6.2f} ms  "
+        f"dni={dni:6.1f} us  resultados={resultados:8.1f} ms  "
+        f"lectura concurrente p50={lectura_p50:7.3f} max={lectura_max:7.1f} ms  disco={disco / 2**20:7.1f} MiB"
+    )
+
+
+def main():
+    tamanos = [int(a) for a in sys.argv[1:]] or [10000, 100000, 1000000]
+    for votos in tamanos:
+        for motor in ("json", "sqlite"):
+            medir(motor, votos)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Benchmark del almacenamiento simulado: modos de durabilidad del diario (per_vote, batched, async)
+
+Cada hilo registra boletas completas (votante + 3 votos + contadores + fecha de voto)
+con la misma secuencia que los endpoints en modo simulado, sobre un directorio temporal.
+
+Con varios procesos, todos comparten el mismo directorio como lo harían los workers
+de `uvicorn --workers N`; al final se verifica que no se perdió ni duplicó ningún voto.
+
+Uso:
+    python benchmark_simulado.py [boletas_por_hilo] [hilos] [procesos]
+"""
+import multiprocessing
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+from simulated_journal import MODOS_DURABILIDAD
+from simulated_storage import SimulatedStorage
+
+
+def registrar_boleta(storage: SimulatedStorage, id_votantes: int):
+    """Misma secuencia que POST /api/votos/ballot en modo simulado"""
+    with storage.transaction():
+        if not storage.get_votante(id_votantes):
+            storage.add_votante({'id_votantes': id_votantes, 'dni': f'DNI{id_votantes}', 'fecha_voto': None})
+        if (storage.count_votos_presidenciales(id_votantes) or storage.count_votos_regionales(id_votantes)
+                or storage.count_votos_distritales(id_votantes)):
+            raise RuntimeError(f"Voto duplicado para {id_votantes}")
+        storage.add_voto_presidencial(id_votantes, 1, 'Candidato 1', 'Presidencial')
+        storage.add_voto_regional(id_votantes, 1, 'Candidato 1', 'Regional')
+        storage.add_voto_distrital(id_votantes, 1, 'Candidato 1', 'Distrital')
+        storage.update_candidato_presidencial_votos(1, 1)
+        storage.update_candidato_regional_votos(1, 1)
+        storage.update_candidato_distrital_votos(1, 1)
+        storage.update_votante_fecha_voto(id_votantes, datetime.now())
+
+
+def preparar(directorio: Path):
+    storage = SimulatedStorage(directorio=directorio)
+    with storage.transaction():
+        storage.add_candidato_presidencial(1, 'Candidato 1', 'Presidencial')
+        storage.add_candidato_regional(1, 'Candidato 1', 'Regional')
+        storage.add_candidato_distrital(1, 'Candidato 1', 'Distrital')
+    storage.close()
+
+
+def correr_proceso(directorio: str, modo: str, ventana: float, primer_id: int, por_hilo: int, hilos: int, salida):
+    """Un worker: `hilos` hilos registrando boletas de votantes distintos sobre el directorio compartido"""
+    storage = SimulatedStorage(durabilidad=modo, ventana_commit=ventana, directorio=Path(directorio))
+    latencias = []
+    latencias_lock = threading.Lock()
+
+    def trabajador(indice: int):
+        propias = []
+        for i in range(por_hilo):
+            t0 = time.perf_counter()
+            registrar_boleta(storage, primer_id + indice * por_hilo + i)
+            propias.append((time.perf_counter() - t0) * 1000)
+        with latencias_lock:
+            latencias.extend(propias)
+
+    threads = [threading.Thread(target=trabajador, args=(i,)) for i in range(hilos)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    writer = storage.metrics()["writer"]
+    storage.close()
+    salida.put((latencias, writer["fsyncs"], writer["avgBatchSize"]))
+
+
+def medir(modo: str, por_hilo: int, hilos: int, procesos: int, ventana: float):
+    with tempfile.TemporaryDirectory() as directorio:
+        preparar(Path(directorio))
+        salida = multiprocessing.Queue()
+        workers = [
+            multiprocessing.Process(
+                target=correr_proceso,
+                args=(directorio, modo, ventana, 1 + p * hilos * por_hilo, por_hilo, hilos, salida)
+            )
+            for p in range(procesos)
+        ]
+        inicio = time.perf_counter()
+        for w in workers:
+            w.start()
+        resultados = [salida.get() for _ in workers]
+        for w in workers:
+            w.join()
+        total = time.perf_counter() - inicio
+
+        # Lo escrito por todos los procesos debe reconstruir el mismo estado
+        latencias = [latencia for r in resultados for latencia in r[0]]
+        recargado = SimulatedStorage(directorio=Path(directorio))
+        assert len(recargado.get_all_votos_presidenciales()) == len(latencias)
+        assert recargado.get_candidato_presidencial(1)['cantidad_votos'] == len(latencias)
+        recargado.close()
+
+    latencias.sort()
+    print(
+        f"{modo:<9} boletas={len(latencias):<6} "
+        f"media={statistics.mean(latencias):7.2f} ms  "
+        f"p50={latencias[len(latencias) // 2]:7.2f} ms  "
+        f"p95={latencias[int(len(latencias) * 0.95) - 1]:7.2f} ms  "
+        f"boletas/s={len(latencias) / total:8.1f}  "
+        f"fsyncs={sum(r[1] for r in resultados):<6} "
+        f"lote medio={statistics.mean(r[2] for r in resultados):.1f}"
+    )
+
+
+def main():
+    por_hilo = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    hilos = int(sys.argv[2]) if len(sys.argv) > 2 else 16
+    procesos = int(sys.argv[3]) if len(sys.argv) > 3 else 1
+    print(f"{procesos} procesos x {hilos} hilos x {por_hilo} boletas (8 registros por boleta)")
+    for modo in MODOS_DURABILIDAD:
+        medir(modo, por_hilo, hilos, procesos, ventana=0.002)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Benchmark: registro de voto en varias consultas vs. lote T-SQL único (votos_sql.emitir_voto)
+
+Crea votantes y un candidato temporales, registra un voto presidencial por votante
+con cada ruta, imprime latencias y elimina los datos de prueba al terminar.
+
+Uso:
+    python benchmark_votos.py [cantidad_votos]
+"""
+import statistics
+import sys
+import time
+from datetime import datetime
+
+from main import _try_db_connection
+from votos_sql import VotoRechazado, emitir_voto
+
+PREFIJO_DNI = "BENCH"
+
+
+def emitir_voto_secuencial(cursor, id_votantes: int, id_candidato: int):
+    """Ruta anterior: una consulta por validación y por actualización"""
+    cursor.execute("SELECT ID_VOTANTES FROM VOTANTES WHERE ID_VOTANTES = ?", (id_votantes,))
+    if not cursor.fetchone():
+        raise VotoRechazado(404, "Votante no encontrado")
+    cursor.execute("SELECT COUNT(*) FROM VOTO_PRESIDENCIAL WHERE ID_VOTANTES = ?", (id_votantes,))
+    votos_presidenciales = cursor.fetchone()[0] or 0
+    cursor.execute("SELECT COUNT(*) FROM VOTO_REGIONAL WHERE ID_VOTANTES = ?", (id_votantes,))
+    votos_regionales = cursor.fetchone()[0] or 0
+    cursor.execute("SELECT COUNT(*) FROM VOTO_DISTRITAL WHERE ID_VOTANTES = ?", (id_votantes,))
+    votos_distritales = cursor.fetchone()[0] or 0
+    if votos_presidenciales >= 1 and votos_regionales >= 1 and votos_distritales >= 1:
+        raise VotoRechazado(400, "El votante ya ha ejercido todos sus votos (presidencial, regional y distrital)")
+    if votos_presidenciales >= 1:
+        raise VotoRechazado(400, "El votante ya ha ejercido su voto presidencial")
+    cursor.execute(
+        "SELECT NOMBRES, APELLIDOS FROM CANDIDATO_PRESIDENCIAL WHERE ID_CANDIDATO_PRESIDENCIAL = ?",
+        (id_candidato,)
+    )
+    candidato = cursor.fetchone()
+    if not candidato:
+        raise VotoRechazado(404, "Candidato no encontrado")
+    cursor.execute(
+        """INSERT INTO VOTO_PRESIDENCIAL (ID_VOTANTES, ID_CANDIDATO, NOMBRE, APELLIDO)
+           VALUES (?, ?, ?, ?)""",
+        (id_votantes, id_candidato, candidato[0], candidato[1])
+    )
+    cursor.execute(
+        "UPDATE CANDIDATO_PRESIDENCIAL SET CANTIDAD_VOTOS = CANTIDAD_VOTOS + 1 WHERE ID_CANDIDATO_PRESIDENCIAL = ?",
+        (id_candidato,)
+    )
+    cursor.execute(
+        "UPDATE VOTANTES SET FECHA_VOTO = ? WHERE ID_VOTANTES = ?",
+        (datetime.now(), id_votantes)
+    )
+
+
+def medir(nombre, conn, funcion, votantes, id_candidato):
+    cursor = conn.cursor()
+    latencias = []
+    inicio = time.perf_counter()
+    for id_votantes in votantes:
+        t0 = time.perf_counter()
+        funcion(cursor, id_votantes, id_candidato)
+        conn.commit()
+        latencias.append((time.perf_counter() - t0) * 1000)
+    total = time.perf_counter() - inicio
+    cursor.close()
+    latencias.sort()
+    print(
+        f"{nombre:<12} votos={len(latencias):<6} "
+        f"media={statistics.mean(latencias):8.2f} ms  "
+        f"p50={latencias[len(latencias) // 2]:8.2f} ms  "
+        f"p95={latencias[int(len(latencias) * 0.95) - 1]:8.2f} ms  "
+        f"votos/s={len(latencias) / total:8.1f}"
+    )
+
+
+def main():
+    cantidad = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    conn = _try_db_connection()
+    cursor = conn.cursor()
+    votantes = []
+    try:
+        cursor.execute(
+            """INSERT INTO CANDIDATO_PRESIDENCIAL (NOMBRES, APELLIDOS, CANTIDAD_VOTOS)
+               OUTPUT INSERTED.ID_CANDIDATO_PRESIDENCIAL VALUES ('Benchmark', 'Voto', 0)"""
+        )
+        id_candidato = cursor.fetchone()[0]
+        for i in range(cantidad * 2):
+            cursor.execute(
+                """INSERT INTO VOTANTES (DNI, NOMBRES, APELLIDOS, FECHA_NACIMIENTO, REGION, DISTRITO)
+                   OUTPUT INSERTED.ID_VOTANTES VALUES (?, 'Bench', 'Votante', '2000-01-01', 'Lima', 'Lima')""",
+                (f"{PREFIJO_DNI}{i:06d}",)
+            )
+            votantes.append(cursor.fetchone()[0])
+        conn.commit()
+
+        print(f"Registrando {cantidad} votos por ruta...\n")
+        medir("secuencial", conn, emitir_voto_secuencial, votantes[:cantidad], id_candidato)
+        medir(
+            "lote único", conn,
+            lambda c, v, cand: emitir_voto(c, "presidencial", v, cand),
+            votantes[cantidad:], id_candidato
+        )
+    finally:
+        print("\nEliminando datos de prueba...")
+        conn.rollback()
+        cursor.execute(
+            "DELETE FROM VOTO_PRESIDENCIAL WHERE ID_VOTANTES IN (SELECT ID_VOTANTES FROM VOTANTES WHERE DNI LIKE ?)",
+            (f"{PREFIJO_DNI}%",)
+        )
+        cursor.execute("DELETE FROM VOTANTES WHERE DNI LIKE ?", (f"{PREFIJO_DNI}%",))
+        cursor.execute(
+            "DELETE FROM CANDIDATO_PRESIDENCIAL WHERE NOMBRES = 'Benchmark' AND APELLIDOS = 'Voto'"
+        )
+        conn.commit()
+        cursor.close()
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Catálogo de candidatos en memoria, versionado y ya serializado
+Cargar la boleta en un kiosco no consulta la base ni pasa por el codificador JSON:
+se devuelven los mismos bytes (o 304 si el cliente ya tiene esa versión)
+"""
+import hashlib
+import json
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+
+class CatalogEntry:
+    """Una versión del catálogo de una categoría"""
+
+    __slots__ = ("version", "body", "etag", "loaded_at", "generation")
+
+    def __init__(self, version: int, body: bytes, etag: str, loaded_at: float, generation: int):
+        self.version = version
+        self.body = body
+        self.etag = etag
+        self.loaded_at = loaded_at
+        self.generation = generation
+
+
+class CandidateCatalog:
+    """
+    `loader(categoria)` devuelve la lista de candidatos a publicar. Crear un candidato
+    invalida su categoría y la siguiente petición la recarga; la versión solo sube si el
+    contenido cambió, así que los clientes con la anterior siguen recibiendo 304.
+    Con varios workers, un candidato creado en otro proceso aparece a más tardar en `ttl` segundos.
+
+    El ETag es un hash del contenido: es el mismo en todos los workers para el mismo catálogo.
+    """
+
+    def __init__(self, loader: Callable[[str], List[Dict[str, Any]]], ttl: float = 60.0):
+        self._loader = loader
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: Dict[str, CatalogEntry] = {}
+        # Sube con cada invalidación; una entrada cargada antes queda desactualizada
+        self._generations: Dict[str, int] = {}
+        # Una carga a la vez por categoría
+        self._load_locks: Dict[str, threading.Lock] = {}
+        self._hits = 0
+        self._not_modified = 0
+        self._loads = 0
+        self._version_bumps = 0
+
+    def get_fresh(self, categoria: str) -> Optional[CatalogEntry]:
+        """La versión vigente, sin bloquear ni cargar (None si hay que recargar)"""
+        with self._lock:
+            entry = self._entries.get(categoria)
+            if (entry is None or entry.generation != self._generations.get(categoria, 0)
+                    or time.monotonic() - entry.loaded_at >= self.ttl):
+                return None
+            self._hits += 1
+            return entry
+
+    def get(self, categoria: str) -> CatalogEntry:
+        """La versión vigente o, si no la hay, la carga (las peticiones simultáneas esperan la misma carga)"""
+        entry = self.get_fresh(categoria)
+        if entry is not None:
+            return entry
+        with self._lock:
+            load_lock = self._load_locks.setdefault(categoria, threading.Lock())
+        with load_lock:
+            entry = self.get_fresh(categoria)
+            if entry is not None:
+                return entry
+            return self._load(categoria)
+
+    def _load(self, categoria: str) -> CatalogEntry:
+        with self._lock:
+            # Se guarda la generación previa a la carga: un candidato creado durante la consulta la deja invalidada
+            generation = self._generations.get(categoria, 0)
+        loaded_at = time.monotonic()
+        candidatos = self._loader(categoria)
+        # Mismo formato que JSONResponse
+        body = json.dumps(candidatos, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+        etag = f'"{hashlib.blake2b(body, digest_size=12).hexdigest()}"'
+        with self._lock:
+            self._loads += 1
+            previous = self._entries.get(categoria)
+            if previous is not None and previous.etag == etag:
+                version = previous.version
+            else:
+                version = (previous.version if previous is not None else 0) + 1
+                if previous is not None:
+                    self._version_bumps += 1
+            entry = CatalogEntry(version, body, etag, loaded_at, generation)
+            self._entries[categoria] = entry
+            return entry
+
+    def invalidate(self, categoria: str):
+        """Marca la categoría para recargar (tras crear un candidato)"""
+        with self._lock:
+            self._generations[categoria] = self._generations.get(categoria, 0) + 1
+
+    def not_modified(self, entry: CatalogEntry, if_none_match: Optional[str]) -> bool:
+        """True si el cliente ya tiene esta versión (If-None-Match con su ETag o `*`)"""
+        if not if_none_match:
+            return False
+        etags = {etag.strip().removeprefix("W/") for etag in if_none_match.split(",")}
+        if entry.etag not in etags and "*" not in etags:
+            return False
+        with self._lock:
+            self._not_modified += 1
+        return True
+
+    def metrics(self) -> Dict[str, Any]:
+        """Versión y ETag por categoría, aciertos, 304 y recargas"""
+        with self._lock:
+            return {
+                "ttlSeconds": self.ttl,
+                "categories": {
+                    categoria: {
+                        "version": entry.version,
+                        "etag": entry.etag,
+                        "stale": entry.generation != self._generations.get(categoria, 0),
+                    }
+                    for categoria, entry in self._entries.items()
+                },
+                "hits": self._hits,
+                "notModified": self._not_modified,
+                "loads": self._loads,
+                "versionBumps": self._version_bumps,
+            }
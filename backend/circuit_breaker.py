@@ -0,0 +1,162 @@
+"""
+Circuit breaker para la disponibilidad de SQL Server
+Con el servidor caído, las peticiones van directo al respaldo en lugar de esperar el timeout de conexión
+"""
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+# Estados del circuito
+CERRADO = "closed"
+ABIERTO = "open"
+SEMIABIERTO = "half_open"
+
+
+class CircuitOpenError(ConnectionError):
+    """El circuito está abierto: no se intenta conectar"""
+
+
+class CircuitBreaker:
+    """
+    - closed: las peticiones pasan; `failure_threshold` fallos de conexión seguidos abren el circuito
+    - open: las peticiones fallan al instante con CircuitOpenError (un ConnectionError, así que
+      el repositorio con respaldo las atiende en local). Un hilo de fondo prueba el servidor
+      cada `probe_interval` segundos
+    - half_open: hay una prueba en curso; las peticiones siguen fallando al instante.
+      `success_threshold` pruebas exitosas seguidas cierran el circuito, una fallida lo reabre
+
+    `probe` debe lanzar una excepción si el servidor no responde.
+    """
+
+    def __init__(
+        self,
+        probe: Callable[[], Any],
+        failure_threshold: int = 2,
+        success_threshold: int = 1,
+        probe_interval: float = 5.0,
+    ):
+        self._probe = probe
+        self.failure_threshold = max(1, failure_threshold)
+        self.success_threshold = max(1, success_threshold)
+        self.probe_interval = probe_interval
+        self._lock = threading.Lock()
+        self._state = CERRADO
+        self._failures = 0
+        self._probe_successes = 0
+        self._closed = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        # Métricas
+        self._opened = 0
+        self._opened_at: Optional[float] = None
+        self._short_circuited = 0
+        self._probes = 0
+        self._probe_failures = 0
+        self._last_error: Optional[str] = None
+        self._last_transition = time.time()
+
+    @property
+    def state(self) -> str:
+        return self._state
+
+    def allow(self) -> bool:
+        """True si la petición puede intentar conectar (circuito cerrado)"""
+        if self._state == CERRADO:
+            return True
+        with self._lock:
+            self._short_circuited += 1
+        return False
+
+    def check(self):
+        """Lanza CircuitOpenError si el circuito no está cerrado"""
+        if not self.allow():
+            raise CircuitOpenError(f"SQL Server no disponible (circuito {self._state}): {self._last_error}")
+
+    def record_success(self):
+        """Conexión exitosa: reinicia la cuenta de fallos"""
+        if self._failures:
+            with self._lock:
+                self._failures = 0
+
+    def record_failure(self, error: BaseException):
+        """Fallo de conexión; abre el circuito al llegar al umbral"""
+        with self._lock:
+            self._last_error = str(error)
+            if self._state != CERRADO:
+                return
+            self._failures += 1
+            if self._failures < self.failure_threshold:
+                return
+            self._abrir()
+
+    def trip(self, error: BaseException):
+        """Abre el circuito sin esperar al umbral (p. ej. si falla la conexión al arrancar)"""
+        with self._lock:
+            self._last_error = str(error)
+            if self._state == CERRADO:
+                self._abrir()
+
+    def _abrir(self):
+        # Con el lock tomado
+        self._state = ABIERTO
+        self._opened += 1
+        self._opened_at = time.monotonic()
+        self._last_transition = time.time()
+        self._probe_successes = 0
+        print(f"Circuito de SQL Server abierto: {self._last_error}")
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="db-circuit-probe", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        """Prueba el servidor mientras el circuito no esté cerrado"""
+        while not self._closed.wait(self.probe_interval):
+            with self._lock:
+                if self._state == CERRADO:
+                    return
+                self._state = SEMIABIERTO
+                self._probes += 1
+            try:
+                self._probe()
+            except Exception as e:
+                with self._lock:
+                    self._probe_failures += 1
+                    self._probe_successes = 0
+                    self._last_error = str(e)
+                    self._state = ABIERTO
+                continue
+            with self._lock:
+                self._probe_successes += 1
+                if self._probe_successes < self.success_threshold:
+                    self._state = ABIERTO
+                    continue
+                self._state = CERRADO
+                self._failures = 0
+                self._last_transition = time.time()
+                print("Circuito de SQL Server cerrado: el servidor volvió a responder")
+                return
+
+    def close(self):
+        """Detiene el hilo de pruebas"""
+        self._closed.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def metrics(self) -> Dict[str, Any]:
+        """Estado del circuito, aperturas y peticiones desviadas al respaldo"""
+        with self._lock:
+            return {
+                "state": self._state,
+                "consecutiveFailures": self._failures,
+                "failureThreshold": self.failure_threshold,
+                "successThreshold": self.success_threshold,
+                "probeIntervalSeconds": self.probe_interval,
+                "opened": self._opened,
+                "openForSeconds": round(time.monotonic() - self._opened_at, 3)
+                if self._state != CERRADO and self._opened_at is not None else 0.0,
+                "shortCircuited": self._short_circuited,
+                "probes": self._probes,
+                "probeFailures": self._probe_failures,
+                "lastError": self._last_error,
+                "lastTransition": self._last_transition,
+            }
@@ -0,0 +1,184 @@
+"""
+Perfil de calidad del padrón (VOTANTES), mantenido de forma incremental
+Cada análisis lee solo los votantes con ID_VOTANTES posterior a la última marca procesada
+y actualiza los nulos por columna, el índice de DNI y los DNI duplicados: revisar la calidad
+durante la elección cuesta O(filas nuevas), no O(tabla).
+
+Los votantes no se modifican ni se borran una vez registrados (solo cambia FECHA_VOTO,
+que no se perfila), así que lo ya procesado no hay que volver a leerlo.
+"""
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+# Columnas perfiladas, en el orden de las filas de Repositorio.votantes_desde (tras ID_VOTANTES)
+COLUMNAS = ("dni", "nombres", "apellidos", "fecha_nacimiento", "region", "distrito")
+
+_LOTE = 5000
+# Un salto de IDENTITY más largo (reinicio del servidor, reseed) no se sigue como huecos
+_MAX_HUECOS = 100_000
+
+
+def _rangos(ids: List[int]) -> List[Tuple[int, int]]:
+    """IDs ordenados agrupados en rangos consecutivos (desde, hasta)"""
+    rangos: List[Tuple[int, int]] = []
+    for id_votantes in ids:
+        if rangos and rangos[-1][1] == id_votantes - 1:
+            rangos[-1] = (rangos[-1][0], id_votantes)
+        else:
+            rangos.append((id_votantes, id_votantes))
+    return rangos
+
+
+class DataQualityProfiler:
+    """
+    Nulos por columna, DNI -> primer ID_VOTANTES y, para los DNI repetidos, los demás IDs.
+
+    Con inserciones concurrentes en SQL Server un ID menor puede confirmarse después que uno
+    mayor ya procesado: los IDs que faltan por debajo de la marca quedan como huecos y se
+    vuelven a buscar por ID durante `huecos_ttl` segundos (un hueco que no aparece es un
+    insert revertido). Si cambia el motor que atiende (SQL Server o local) el perfil empieza
+    de cero. En modo local los IDs no son crecientes: no se siguen huecos y, si aparece un
+    votante por debajo de la marca, el padrón local se vuelve a perfilar completo.
+
+    Los análisis se serializan con su propio lock; el estado tiene otro, que solo se toma
+    para aplicar cada página ya leída, así metrics() no espera a que termine un recorrido.
+    """
+
+    def __init__(self, lote: int = _LOTE, huecos_ttl: float = 60.0, max_muestra: int = 20):
+        self.lote = lote
+        self.huecos_ttl = huecos_ttl
+        self.max_muestra = max_muestra
+        self._refresh_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._reset(None)
+
+        # Métricas
+        self._refreshes = 0
+        self._resets = 0
+        self._last_refresh_ms = 0.0
+        self._last_rows = 0
+        self._gaps_skipped = 0
+        self._rescans = 0
+
+    def _reset(self, modo: Optional[str]):
+        self._modo = modo
+        self.watermark = 0
+        self._total = 0
+        self._nulos: Dict[str, int] = {columna: 0 for columna in COLUMNAS}
+        self._dnis: Dict[str, int] = {}
+        self._duplicados: Dict[str, List[int]] = {}
+        self._filas_duplicadas = 0
+        self._huecos: Dict[int, float] = {}
+
+    def refresh(self, repositorio) -> Dict[str, Any]:
+        """Procesa los votantes nuevos del repositorio y devuelve el perfil completo"""
+        with self._refresh_lock:
+            t0 = time.monotonic()
+            with self._lock:
+                if repositorio.modo != self._modo:
+                    if self._modo is not None:
+                        self._resets += 1
+                    self._reset(repositorio.modo)
+                ahora = time.monotonic()
+                self._huecos = {id_votantes: visto for id_votantes, visto in self._huecos.items()
+                                if ahora - visto < self.huecos_ttl}
+                rangos = _rangos(sorted(self._huecos))
+            # Los huecos se buscan por ID: releer desde el más antiguo volvería a leer todo lo posterior
+            nuevas = self._procesar_huecos(repositorio.votantes_en_rangos(rangos)) if rangos else 0
+            nuevas += self._recorrer(repositorio, ahora)
+            if not repositorio.ids_crecientes and repositorio.contar_votantes()["total"] > self._total:
+                # IDs no crecientes (modo local): un votante nuevo pudo quedar bajo la marca y
+                # no se sabe cuál; se perfila de nuevo el padrón local, que es chico
+                with self._lock:
+                    self._reset(repositorio.modo)
+                    self._rescans += 1
+                nuevas = self._recorrer(repositorio, ahora)
+            with self._lock:
+                self._refreshes += 1
+                self._last_rows = nuevas
+                self._last_refresh_ms = (time.monotonic() - t0) * 1000
+                return self._perfil(nuevas)
+
+    def _procesar_huecos(self, filas: List[Tuple]) -> int:
+        nuevas = 0
+        with self._lock:
+            for fila in filas:
+                if self._huecos.pop(fila[0], None) is not None:
+                    self._procesar(fila)
+                    nuevas += 1
+        return nuevas
+
+    def _recorrer(self, repositorio, ahora: float) -> int:
+        """Procesa los votantes posteriores a la marca, una página por vez"""
+        nuevas = 0
+        desde = self.watermark
+        while True:
+            # La lectura va sin el lock de estado; solo este análisis modifica el perfil
+            filas = repositorio.votantes_desde(desde, self.lote)
+            with self._lock:
+                for fila in filas:
+                    if repositorio.ids_crecientes:
+                        self._registrar_huecos(fila[0], ahora)
+                    self.watermark = fila[0]
+                    self._procesar(fila)
+                    nuevas += 1
+            if len(filas) < self.lote:
+                return nuevas
+            desde = filas[-1][0]
+
+    def _registrar_huecos(self, id_votantes: int, ahora: float):
+        if id_votantes - self.watermark - 1 > _MAX_HUECOS:
+            self._gaps_skipped += 1
+            return
+        for hueco in range(self.watermark + 1, id_votantes):
+            self._huecos[hueco] = ahora
+
+    def _procesar(self, fila: Tuple):
+        id_votantes = fila[0]
+        self._total += 1
+        for columna, valor in zip(COLUMNAS, fila[1:]):
+            if valor is None:
+                self._nulos[columna] += 1
+        dni = fila[1]
+        if dni is None:
+            return
+        if dni in self._dnis:
+            self._duplicados.setdefault(dni, []).append(id_votantes)
+            self._filas_duplicadas += 1
+        else:
+            self._dnis[dni] = id_votantes
+
+    def _perfil(self, nuevas: int) -> Dict[str, Any]:
+        muestra = []
+        for dni, ids in self._duplicados.items():
+            if len(muestra) >= self.max_muestra:
+                break
+            muestra.append({"dni": dni, "ids": [self._dnis[dni], *ids]})
+        return {
+            "totalRecords": self._total,
+            "nullCounts": dict(self._nulos),
+            # Igual que COUNT(*) - COUNT(DISTINCT DNI) sobre los DNI no nulos
+            "duplicateCount": self._filas_duplicadas,
+            "duplicateDnis": len(self._duplicados),
+            "duplicates": muestra,
+            "distinctDnis": len(self._dnis),
+            "newRecords": nuevas,
+            "watermark": self.watermark,
+        }
+
+    def metrics(self) -> Dict[str, Any]:
+        """Marca procesada, huecos pendientes y costo del último análisis"""
+        with self._lock:
+            return {
+                "mode": self._modo,
+                "watermark": self.watermark,
+                "records": self._total,
+                "pendingGaps": len(self._huecos),
+                "gapsSkipped": self._gaps_skipped,
+                "rescans": self._rescans,
+                "refreshes": self._refreshes,
+                "resets": self._resets,
+                "lastRefreshRows": self._last_rows,
+                "lastRefreshMs": round(self._last_refresh_ms, 3),
+            }
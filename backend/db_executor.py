@@ -0,0 +1,113 @@
+"""
+Ejecutor de operaciones bloqueantes de base de datos
+Corre las llamadas síncronas de pyodbc en un pool de hilos acotado para no congelar el event loop
+"""
+import asyncio
+import functools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+
+class ExecutorSaturatedError(Exception):
+    """La cola del ejecutor alcanzó su límite y la operación fue rechazada"""
+
+
+class DBExecutor:
+    """Pool de hilos de tamaño fijo con cola acotada y métricas de espera"""
+
+    def __init__(self, max_workers: int = 20, max_queue: int = 200):
+        if max_workers < 1 or max_queue < 0:
+            raise ValueError("Parámetros de ejecutor inválidos")
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="db-worker")
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._active = 0
+
+        # Métricas acumuladas
+        self._submitted = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+        self._cancelled = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._run_total = 0.0
+        self._queue_peak = 0
+
+    async def run(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """Ejecuta func(*args, **kwargs) en un hilo del pool y espera su resultado"""
+        with self._lock:
+            if self._queued >= self.max_queue + self.max_workers - self._active:
+                self._rejected += 1
+                raise ExecutorSaturatedError(
+                    f"Cola de base de datos llena ({self._queued} operaciones en espera)"
+                )
+            self._queued += 1
+            self._submitted += 1
+            self._queue_peak = max(self._queue_peak, self._queued - (self.max_workers - self._active))
+        submitted_at = time.monotonic()
+        future = self._executor.submit(functools.partial(self._call, func, submitted_at, args, kwargs))
+        # Si quien espera se cancela (cliente desconectado) antes de que un hilo tome la operación,
+        # _call no llega a correr: el lugar en la cola se libera aquí
+        future.add_done_callback(self._liberar_si_cancelada)
+        return await asyncio.wrap_future(future)
+
+    def _liberar_si_cancelada(self, future):
+        if future.cancelled():
+            with self._lock:
+                self._queued -= 1
+                self._cancelled += 1
+
+    def _call(self, func, submitted_at, args, kwargs):
+        started = time.monotonic()
+        waited = started - submitted_at
+        with self._lock:
+            self._queued -= 1
+            self._active += 1
+            self._wait_total += waited
+            self._wait_max = max(self._wait_max, waited)
+        failed = False
+        try:
+            return func(*args, **kwargs)
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            elapsed = time.monotonic() - started
+            with self._lock:
+                self._active -= 1
+                self._run_total += elapsed
+                if failed:
+                    self._failed += 1
+                else:
+                    self._completed += 1
+
+    def shutdown(self):
+        """Espera a que terminen las operaciones en curso y libera los hilos"""
+        self._executor.shutdown(wait=True)
+
+    def metrics(self) -> Dict[str, Any]:
+        """Devuelve la profundidad de cola, hilos ocupados y tiempos de espera"""
+        with self._lock:
+            started = self._completed + self._failed + self._active
+            finished = self._completed + self._failed
+            return {
+                "maxWorkers": self.max_workers,
+                "maxQueue": self.max_queue,
+                "active": self._active,
+                "queueDepth": max(self._queued - (self.max_workers - self._active), 0),
+                "pending": self._queued,
+                "queuePeak": self._queue_peak,
+                "submitted": self._submitted,
+                "completed": self._completed,
+                "failed": self._failed,
+                "rejected": self._rejected,
+                "cancelled": self._cancelled,
+                "avgWaitMs": round(self._wait_total / started * 1000, 3) if started else 0,
+                "maxWaitMs": round(self._wait_max * 1000, 3),
+                "avgRunMs": round(self._run_total / finished * 1000, 3) if finished else 0,
+            }
@@ -0,0 +1,300 @@
+"""
+Pool de conexiones a SQL Server
+Reutiliza conexiones pyodbc entre peticiones para no pagar el handshake TLS + login en cada endpoint
+"""
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Optional
+
+
+class PoolTimeoutError(Exception):
+    """No se liberó ninguna conexión dentro del tiempo de espera"""
+
+
+class _PoolEntry:
+    """Conexión física administrada por el pool"""
+
+    __slots__ = ("raw", "created_at", "last_used")
+
+    def __init__(self, raw: Any):
+        now = time.monotonic()
+        self.raw = raw
+        self.created_at = now
+        self.last_used = now
+
+
+class PooledConnection:
+    """Conexión prestada por el pool. close() la devuelve al pool en lugar de cerrarla"""
+
+    def __init__(self, pool: "ConnectionPool", entry: _PoolEntry):
+        self._pool = pool
+        self._entry = entry
+        self._released = False
+        self._broken = False
+
+    def cursor(self):
+        return self._entry.raw.cursor()
+
+    def commit(self):
+        self._entry.raw.commit()
+
+    def rollback(self):
+        self._entry.raw.rollback()
+
+    def invalidate(self):
+        """Marca la conexión como dañada para que se descarte al devolverla"""
+        self._broken = True
+
+    def close(self):
+        """Devuelve la conexión al pool (idempotente)"""
+        if self._released:
+            return
+        self._released = True
+        self._pool._release(self._entry, self._broken)
+
+    def __getattr__(self, name: str):
+        return getattr(self._entry.raw, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class ConnectionPool:
+    """
+    Pool de conexiones con tamaño mínimo/máximo, verificación al prestar,
+    reciclaje de conexiones ociosas o muy antiguas y métricas de uso
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[], Any],
+        min_size: int = 2,
+        max_size: int = 10,
+        acquire_timeout: float = 10.0,
+        max_idle: float = 300.0,
+        max_lifetime: float = 1800.0,
+        ping_after: float = 5.0,
+        reap_interval: float = 30.0,
+    ):
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError("Tamaños de pool inválidos")
+        self._factory = factory
+        self.min_size = min_size
+        self.max_size = max_size
+        self.acquire_timeout = acquire_timeout
+        self.max_idle = max_idle
+        self.max_lifetime = max_lifetime
+        self.ping_after = ping_after
+        self.reap_interval = reap_interval
+
+        self._idle: Deque[_PoolEntry] = deque()
+        self._size = 0
+        self._waiting = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self._reaper: Optional[threading.Thread] = None
+
+        # Métricas acumuladas
+        self._created = 0
+        self._discarded = 0
+        self._acquired = 0
+        self._timeouts = 0
+        self._health_failures = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    # ========== CICLO DE VIDA ==========
+    def warm(self):
+        """Abre conexiones hasta alcanzar min_size e inicia el reciclador de ociosas"""
+        self._start_reaper()
+        while True:
+            with self._cond:
+                if self._closed or self._size >= self.min_size:
+                    return
+                self._size += 1
+            try:
+                entry = self._open()
+            except Exception:
+                with self._cond:
+                    self._size -= 1
+                    self._cond.notify()
+                raise
+            with self._cond:
+                self._idle.append(entry)
+                self._cond.notify()
+
+    def close_all(self):
+        """Cierra todas las conexiones ociosas y rechaza nuevos préstamos"""
+        with self._cond:
+            self._closed = True
+            entries = list(self._idle)
+            self._idle.clear()
+            self._size -= len(entries)
+            self._cond.notify_all()
+        for entry in entries:
+            self._close_raw(entry)
+
+    # ========== PRÉSTAMO ==========
+    def acquire(self, timeout: Optional[float] = None) -> PooledConnection:
+        """Presta una conexión sana; abre una nueva si hay cupo o espera a que se libere otra"""
+        timeout = self.acquire_timeout if timeout is None else timeout
+        started = time.monotonic()
+        deadline = started + timeout
+        self._start_reaper()
+
+        while True:
+            entry = None
+            must_open = False
+            with self._cond:
+                if self._closed:
+                    raise ConnectionError("El pool de conexiones está cerrado")
+                while not self._idle and self._size >= self.max_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._timeouts += 1
+                        raise PoolTimeoutError(
+                            f"Sin conexiones libres tras {timeout:.1f}s (máximo {self.max_size})"
+                        )
+                    self._waiting += 1
+                    try:
+                        self._cond.wait(remaining)
+                    finally:
+                        self._waiting -= 1
+                    if self._closed:
+                        raise ConnectionError("El pool de conexiones está cerrado")
+                if self._idle:
+                    # LIFO: reutilizar la conexión más reciente deja envejecer a las demás
+                    entry = self._idle.pop()
+                else:
+                    self._size += 1
+                    must_open = True
+
+            if must_open:
+                try:
+                    entry = self._open()
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    raise
+            elif not self._is_usable(entry):
+                self._discard(entry)
+                continue
+
+            waited = time.monotonic() - started
+            with self._cond:
+                self._acquired += 1
+                self._wait_total += waited
+                self._wait_max = max(self._wait_max, waited)
+            return PooledConnection(self, entry)
+
+    def _release(self, entry: _PoolEntry, broken: bool):
+        """Recibe una conexión devuelta; deshace transacciones abiertas antes de reutilizarla"""
+        if not broken:
+            try:
+                entry.raw.rollback()
+            except Exception:
+                broken = True
+        now = time.monotonic()
+        if broken or self._closed or now - entry.created_at > self.max_lifetime:
+            self._discard(entry)
+            return
+        entry.last_used = now
+        with self._cond:
+            self._idle.append(entry)
+            self._cond.notify()
+
+    # ========== SALUD Y RECICLAJE ==========
+    def _is_usable(self, entry: _PoolEntry) -> bool:
+        now = time.monotonic()
+        if now - entry.created_at > self.max_lifetime:
+            return False
+        if now - entry.last_used < self.ping_after:
+            return True
+        try:
+            cursor = entry.raw.cursor()
+            try:
+                cursor.execute("SELECT 1")
+                cursor.fetchone()
+            finally:
+                cursor.close()
+            return True
+        except Exception:
+            with self._cond:
+                self._health_failures += 1
+            return False
+
+    def _reap(self):
+        """Cierra conexiones ociosas por encima de min_size y repone las que falten"""
+        while True:
+            time.sleep(self.reap_interval)
+            if self._closed:
+                return
+            now = time.monotonic()
+            expired = []
+            with self._cond:
+                # Las más antiguas quedan a la izquierda del deque
+                while self._idle and self._size - len(expired) > self.min_size:
+                    oldest = self._idle[0]
+                    if now - oldest.last_used <= self.max_idle and now - oldest.created_at <= self.max_lifetime:
+                        break
+                    expired.append(self._idle.popleft())
+            for entry in expired:
+                self._discard(entry)
+            try:
+                self.warm()
+            except Exception:
+                pass
+
+    def _start_reaper(self):
+        if self._reaper is not None or self.reap_interval <= 0:
+            return
+        with self._cond:
+            if self._reaper is None:
+                self._reaper = threading.Thread(target=self._reap, name="db-pool-reaper", daemon=True)
+                self._reaper.start()
+
+    # ========== UTILIDADES ==========
+    def _open(self) -> _PoolEntry:
+        entry = _PoolEntry(self._factory())
+        with self._cond:
+            self._created += 1
+        return entry
+
+    def _discard(self, entry: _PoolEntry):
+        self._close_raw(entry)
+        with self._cond:
+            self._size -= 1
+            self._discarded += 1
+            self._cond.notify()
+
+    @staticmethod
+    def _close_raw(entry: _PoolEntry):
+        try:
+            entry.raw.close()
+        except Exception:
+            pass
+
+    def metrics(self) -> Dict[str, Any]:
+        """Devuelve el estado actual y los contadores acumulados del pool"""
+        with self._cond:
+            idle = len(self._idle)
+            return {
+                "minSize": self.min_size,
+                "maxSize": self.max_size,
+                "size": self._size,
+                "idle": idle,
+                "inUse": self._size - idle,
+                "waiting": self._waiting,
+                "created": self._created,
+                "discarded": self._discarded,
+                "acquired": self._acquired,
+                "timeouts": self._timeouts,
+                "healthCheckFailures": self._health_failures,
+                "avgWaitMs": round(self._wait_total / self._acquired * 1000, 3) if self._acquired else 0,
+                "maxWaitMs": round(self._wait_max * 1000, 3),
+            }
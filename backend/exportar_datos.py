@@ -0,0 +1,140 @@
+"""
+Exportación de VOTANTES y VOTO_* en CSV o NDJSON, por lotes
+
+Las filas se leen del cursor con fetchmany y cada lote se serializa (y, si se pide,
+se comprime en gzip) antes de leer el siguiente: la memoria no depende del tamaño
+de la tabla. El endpoint entrega los trozos con un StreamingResponse a medida que salen.
+"""
+import csv
+import io
+import json
+import zlib
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, Iterator, List, Sequence
+
+from votos_sql import CATEGORIAS
+
+FORMATO_CSV = "csv"
+FORMATO_NDJSON = "ndjson"
+FORMATOS = (FORMATO_CSV, FORMATO_NDJSON)
+
+TIPOS_CONTENIDO = {FORMATO_CSV: "text/csv; charset=utf-8", FORMATO_NDJSON: "application/x-ndjson"}
+
+
+# Colección del almacenamiento simulado con los votos de cada categoría
+_COLECCIONES_VOTOS = {
+    "presidencial": "votos_presidenciales",
+    "regional": "votos_regionales",
+    "distrital": "votos_distritales",
+}
+
+
+def _exportacion_votos(categoria: str) -> Dict[str, Any]:
+    cfg = CATEGORIAS[categoria]
+    return {
+        "columnas": ("id_votantes", "id_candidato", "nombre", "apellido"),
+        "sql": f"""SELECT ID_VOTANTES, {cfg['columna_candidato']}, NOMBRE, APELLIDO
+                   FROM {cfg['tabla_voto']} ORDER BY ID_{cfg['tabla_voto']}""",
+        # En modo simulado: colección y clave de cada columna en sus registros
+        "coleccion": _COLECCIONES_VOTOS[categoria],
+        "campos": ("id_votantes", cfg["columna_candidato"].lower(), "nombre", "apellido"),
+    }
+
+
+# Tablas exportables: votantes, una por categoría de voto y los votos nulos
+EXPORTACIONES: Dict[str, Dict[str, Any]] = {
+    "votantes": {
+        "columnas": ("id_votantes", "dni", "nombres", "apellidos", "fecha_nacimiento", "region", "distrito",
+                     "fecha_voto"),
+        "sql": """SELECT ID_VOTANTES, DNI, NOMBRES, APELLIDOS, FECHA_NACIMIENTO, REGION, DISTRITO, FECHA_VOTO
+                  FROM VOTANTES ORDER BY ID_VOTANTES""",
+        "coleccion": "votantes",
+        "campos": ("id_votantes", "dni", "nombres", "apellidos", "fecha_nacimiento", "region", "distrito",
+                   "fecha_voto"),
+    },
+    **{categoria: _exportacion_votos(categoria) for categoria in CATEGORIAS},
+    "nulo": {
+        "columnas": ("id_votantes", "dni"),
+        "sql": "SELECT ID_VOTANTES, DNI FROM VOTO_NULO ORDER BY ID_VOTO_NULO",
+        "coleccion": "votos_nulos",
+        "campos": ("id_votantes", "dni"),
+    },
+}
+
+
+class CursorPorLotes:
+    """
+    Recorre el resultado de una consulta ya ejecutada de a `lote` filas.
+    Cierra el cursor y devuelve la conexión al terminar o al llamar a close()
+    (p. ej. si el cliente corta la descarga a la mitad)
+    """
+
+    def __init__(self, conn, cursor, lote: int):
+        self._conn = conn
+        self._cursor = cursor
+        self.lote = lote
+        self._cerrado = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> List[Sequence]:
+        if self._cerrado:
+            raise StopIteration
+        try:
+            filas = self._cursor.fetchmany(self.lote)
+        except BaseException:
+            self.close()
+            raise
+        if not filas:
+            self.close()
+            raise StopIteration
+        return filas
+
+    def close(self):
+        if not self._cerrado:
+            self._cerrado = True
+            self._cursor.close()
+            self._conn.close()
+
+
+def _valor(valor):
+    if isinstance(valor, (datetime, date)):
+        return valor.isoformat()
+    if isinstance(valor, str):
+        return valor.rstrip()
+    return valor
+
+
+def serializar(lotes: Iterable[List[Sequence]], columnas: Sequence[str], formato: str) -> Iterator[bytes]:
+    """Un trozo de bytes por lote de filas (en CSV, la cabecera va en el primero)"""
+    if formato == FORMATO_CSV:
+        buffer = io.StringIO()
+        escritor = csv.writer(buffer, lineterminator="\n")
+        escritor.writerow(columnas)
+        for filas in lotes:
+            escritor.writerows([[_valor(v) for v in fila] for fila in filas])
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            # Tabla vacía: solo la cabecera
+            yield buffer.getvalue().encode("utf-8")
+    elif formato == FORMATO_NDJSON:
+        for filas in lotes:
+            yield "".join(
+                json.dumps(dict(zip(columnas, (_valor(v) for v in fila))), ensure_ascii=False) + "\n"
+                for fila in filas
+            ).encode("utf-8")
+    else:
+        raise ValueError(f"Formato inválido: {formato} (opciones: {', '.join(FORMATOS)})")
+
+
+def comprimir_gzip(trozos: Iterable[bytes], nivel: int = 6) -> Iterator[bytes]:
+    """Comprime en gzip a medida que llegan los trozos (un solo miembro gzip para todo el flujo)"""
+    compresor = zlib.compressobj(nivel, zlib.DEFLATED, 31)
+    for trozo in trozos:
+        salida = compresor.compress(trozo)
+        if salida:
+            yield salida
+    yield compresor.flush()
@@ -0,0 +1,306 @@
+"""
+Importación masiva del padrón de votantes desde CSV o NDJSON
+
+El archivo se lee por trozos: cada trozo se parte en líneas, las líneas completas se
+convierten en registros y los registros se validan e insertan en lotes (fast_executemany
+en SQL Server). En memoria solo quedan el lote en curso y el conjunto de DNI ya
+registrados, que es lo que detecta los duplicados sin una consulta por fila.
+
+- CSV: primera línea con los nombres de columna (separador `,` o `;`, sin importar mayúsculas)
+- NDJSON: un objeto JSON por línea con las mismas claves
+
+Columnas: dni, nombres, apellidos, fecha_nacimiento (AAAA-MM-DD), region, distrito.
+Las filas duplicadas (DNI ya registrado o repetido en el archivo) se omiten; las inválidas
+se reportan con su número de línea y, pasado `max_errores`, la importación se corta sin
+leer el resto. Un archivo que no es un padrón (codificación, cabecera o línea desmedida)
+se rechaza con ArchivoInvalido al llegar a la primera línea que lo delata.
+
+Uso:
+    python importar_votantes.py padron.csv [--formato csv|ndjson] [--lote N]
+                                [--max-errores N] [--dry-run] [--local]
+"""
+import codecs
+import csv
+import json
+import re
+import sys
+import time
+from datetime import date
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+FORMATO_CSV = "csv"
+FORMATO_NDJSON = "ndjson"
+FORMATOS = (FORMATO_CSV, FORMATO_NDJSON)
+
+COLUMNAS = ("dni", "nombres", "apellidos", "fecha_nacimiento", "region", "distrito")
+
+# Largos máximos de VOTANTES (SQLQuery2.sql)
+_LARGOS = {"dni": 20, "nombres": 100, "apellidos": 100, "region": 100, "distrito": 100}
+
+# Una línea más larga que esto no es un registro del padrón (p. ej. un binario sin saltos de línea)
+MAX_LINEA = 64 * 1024
+
+# Errores que se devuelven en el resumen (los demás solo se cuentan)
+_ERRORES_REPORTADOS = 100
+
+_DNI = re.compile(r"[0-9A-Za-z]+")
+_FECHA = re.compile(r"\d{4}-\d{2}-\d{2}")
+
+
+class ArchivoInvalido(ValueError):
+    """El archivo no se puede leer como padrón"""
+
+
+def formato_por_nombre(nombre: str) -> str:
+    """Formato según la extensión del archivo (.ndjson / .jsonl o, si no, CSV)"""
+    return FORMATO_NDJSON if nombre.lower().endswith((".ndjson", ".jsonl")) else FORMATO_CSV
+
+
+class LectorPadron:
+    """
+    Parser incremental: `feed` recibe bytes y devuelve los registros de las líneas completas
+    como (número de línea, dict o mensaje de error); `close` procesa la última línea sin salto.
+    """
+
+    def __init__(self, formato: str):
+        if formato not in FORMATOS:
+            raise ArchivoInvalido(f"Formato inválido: {formato} (opciones: {', '.join(FORMATOS)})")
+        self.formato = formato
+        self._decoder = codecs.getincrementaldecoder("utf-8-sig")()
+        self._pendiente = ""
+        self._linea = 0
+        self._cabecera: Optional[List[str]] = None
+        self._separador = ","
+
+    def feed(self, datos: bytes) -> List[Tuple[int, Any]]:
+        try:
+            texto = self._pendiente + self._decoder.decode(datos)
+        except UnicodeDecodeError as e:
+            raise ArchivoInvalido(f"El archivo no está en UTF-8 (cerca de la línea {self._linea + 1}): {e}")
+        lineas = texto.split("\n")
+        self._pendiente = lineas.pop()
+        if len(self._pendiente) > MAX_LINEA:
+            raise ArchivoInvalido(f"Línea {self._linea + 1} demasiado larga (más de {MAX_LINEA} caracteres)")
+        return self._registros(lineas)
+
+    def close(self) -> List[Tuple[int, Any]]:
+        try:
+            resto = self._pendiente + self._decoder.decode(b"", final=True)
+        except UnicodeDecodeError as e:
+            raise ArchivoInvalido(f"El archivo no está en UTF-8: {e}")
+        self._pendiente = ""
+        registros = self._registros([resto] if resto.strip() else [])
+        if self._cabecera is None and self.formato == FORMATO_CSV:
+            raise ArchivoInvalido("El archivo está vacío")
+        return registros
+
+    def _registros(self, lineas: List[str]) -> List[Tuple[int, Any]]:
+        registros = []
+        for linea in lineas:
+            self._linea += 1
+            if len(linea) > MAX_LINEA:
+                raise ArchivoInvalido(f"Línea {self._linea} demasiado larga (más de {MAX_LINEA} caracteres)")
+            linea = linea.rstrip("\r")
+            if not linea.strip():
+                continue
+            if self.formato == FORMATO_NDJSON:
+                registros.append((self._linea, self._objeto(linea)))
+            elif self._cabecera is None:
+                self._leer_cabecera(linea)
+            else:
+                valores = next(csv.reader([linea], delimiter=self._separador))
+                if len(valores) != len(self._cabecera):
+                    registros.append((self._linea, f"se esperaban {len(self._cabecera)} columnas y hay {len(valores)}"))
+                else:
+                    registros.append((self._linea, dict(zip(self._cabecera, valores))))
+        return registros
+
+    def _leer_cabecera(self, linea: str):
+        self._separador = ";" if linea.count(";") > linea.count(",") else ","
+        cabecera = [c.strip().lower() for c in next(csv.reader([linea], delimiter=self._separador))]
+        faltantes = [c for c in COLUMNAS if c not in cabecera]
+        if faltantes:
+            raise ArchivoInvalido(f"Faltan columnas en la cabecera: {', '.join(faltantes)}")
+        self._cabecera = cabecera
+
+    @staticmethod
+    def _objeto(linea: str):
+        try:
+            objeto = json.loads(linea)
+        except ValueError as e:
+            return f"JSON inválido: {e}"
+        if not isinstance(objeto, dict):
+            return "se esperaba un objeto JSON"
+        return {str(k).lower(): v for k, v in objeto.items()}
+
+
+def validar_lote(registros: List[Tuple[int, Any]]) -> Tuple[List[Tuple], List[Dict[str, Any]]]:
+    """
+    Valida un lote de registros. Devuelve las filas listas para insertar, en el orden de
+    COLUMNAS y con la fecha como date, y los errores como {linea, error}
+    """
+    filas: List[Tuple] = []
+    errores: List[Dict[str, Any]] = []
+    dni_valido = _DNI.fullmatch
+    fecha_valida = _FECHA.fullmatch
+    for linea, registro in registros:
+        if isinstance(registro, str):
+            errores.append({"linea": linea, "error": registro})
+            continue
+        valores = {}
+        error = None
+        for columna in COLUMNAS:
+            valor = registro.get(columna)
+            valor = "" if valor is None else str(valor).strip()
+            if not valor:
+                error = f"{columna} vacío"
+                break
+            if len(valor) > _LARGOS.get(columna, len(valor)):
+                error = f"{columna} supera {_LARGOS[columna]} caracteres"
+                break
+            valores[columna] = valor
+        if error is None and not dni_valido(valores["dni"]):
+            error = "dni solo admite letras y dígitos"
+        if error is None:
+            try:
+                if not fecha_valida(valores["fecha_nacimiento"]):
+                    raise ValueError
+                valores["fecha_nacimiento"] = date.fromisoformat(valores["fecha_nacimiento"])
+            except ValueError:
+                error = "fecha_nacimiento no es una fecha AAAA-MM-DD"
+        if error is not None:
+            errores.append({"linea": linea, "error": error})
+            continue
+        filas.append(tuple(valores[columna] for columna in COLUMNAS))
+    return filas, errores
+
+
+class ImportacionVotantes:
+    """
+    Una importación. `dnis_existentes` son los DNI ya registrados; `insertar` recibe cada
+    lote de filas válidas y sin duplicados (None: solo validar, sin escribir).
+    """
+
+    def __init__(
+        self,
+        dnis_existentes: Iterable[str],
+        insertar: Optional[Callable[[List[Tuple]], None]],
+        max_errores: int = 100,
+    ):
+        self._dnis = set(dnis_existentes)
+        self._insertar = insertar
+        self.max_errores = max(0, max_errores)
+        self.abortada = False
+        self._inicio = time.monotonic()
+        self._leidas = 0
+        self._insertados = 0
+        self._duplicados = 0
+        self._invalidos = 0
+        self._errores: List[Dict[str, Any]] = []
+
+    def procesar(self, registros: List[Tuple[int, Any]]):
+        """Valida, descarta duplicados e inserta un lote"""
+        if self.abortada or not registros:
+            return
+        self._leidas += len(registros)
+        filas, errores = validar_lote(registros)
+        self._invalidos += len(errores)
+        self._errores.extend(errores[:_ERRORES_REPORTADOS - len(self._errores)])
+        if self._invalidos > self.max_errores:
+            # No se inserta nada de este lote: el archivo se da por malo desde aquí
+            self.abortada = True
+            return
+
+        nuevas = []
+        dnis = self._dnis
+        for fila in filas:
+            if fila[0] in dnis:
+                self._duplicados += 1
+                continue
+            dnis.add(fila[0])
+            nuevas.append(fila)
+        if nuevas and self._insertar is not None:
+            self._insertar(nuevas)
+        self._insertados += len(nuevas)
+
+    def resumen(self) -> Dict[str, Any]:
+        segundos = time.monotonic() - self._inicio
+        return {
+            "dryRun": self._insertar is None,
+            "abortada": self.abortada,
+            "filasLeidas": self._leidas,
+            "insertados": self._insertados,
+            "duplicados": self._duplicados,
+            "invalidos": self._invalidos,
+            "errores": self._errores,
+            "segundos": round(segundos, 3),
+            "filasPorSegundo": round(self._leidas / segundos, 1) if segundos > 0 else 0.0,
+        }
+
+
+def importar(trozos: Iterable[bytes], formato: str, importacion: ImportacionVotantes,
+             lote: int = 5000) -> Dict[str, Any]:
+    """Recorre el archivo trozo a trozo y procesa los registros en lotes de `lote`"""
+    lector = LectorPadron(formato)
+    pendientes: List[Tuple[int, Any]] = []
+    for trozo in trozos:
+        pendientes.extend(lector.feed(trozo))
+        while len(pendientes) >= lote and not importacion.abortada:
+            importacion.procesar(pendientes[:lote])
+            del pendientes[:lote]
+        if importacion.abortada:
+            return importacion.resumen()
+    pendientes.extend(lector.close())
+    for inicio in range(0, len(pendientes), lote):
+        importacion.procesar(pendientes[inicio:inicio + lote])
+    return importacion.resumen()
+
+
+def _leer_trozos(ruta: str, tamano: int = 1024 * 1024):
+    with open(ruta, "rb") as f:
+        while True:
+            trozo = f.read(tamano)
+            if not trozo:
+                return
+            yield trozo
+
+
+def main():
+    args = sys.argv[1:]
+    if not args or args[0].startswith("--"):
+        print(__doc__)
+        sys.exit(2)
+    ruta = args[0]
+    formato = args[args.index("--formato") + 1] if "--formato" in args else formato_por_nombre(ruta)
+    lote = int(args[args.index("--lote") + 1]) if "--lote" in args else 5000
+    max_errores = int(args[args.index("--max-errores") + 1]) if "--max-errores" in args else 100
+
+    # Importar main carga config.env
+    from main import _try_db_connection
+    from ballot_state import BallotStateIndex
+    from repositorio import RepositorioLocal, RepositorioSQLServer
+    from simulated_storage import close_simulated_storage, get_simulated_storage
+
+    if "--local" in args:
+        repositorio = RepositorioLocal(get_simulated_storage)
+    else:
+        repositorio = RepositorioSQLServer(_try_db_connection, BallotStateIndex())
+    importacion = ImportacionVotantes(
+        repositorio.dnis_votantes(),
+        None if "--dry-run" in args else repositorio.insertar_votantes,
+        max_errores=max_errores,
+    )
+    try:
+        resumen = importar(_leer_trozos(ruta), formato, importacion, lote=max(1, lote))
+    except ArchivoInvalido as e:
+        print(f"Archivo rechazado: {e}")
+        sys.exit(1)
+    finally:
+        close_simulated_storage()
+    print(json.dumps(resumen, ensure_ascii=False, indent=2))
+    if resumen["abortada"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,17 +3,43 @@ Backend FastAPI para Sistema Electoral
 Conectado a SQL Server
 """
 
-from fastapi import FastAPI, HTTPException, Depends, status
+from fastapi import FastAPI, HTTPException, Depends, Request, Response, status
+from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel, EmailStr
-from typing import List, Optional
-from datetime import datetime, date
+from typing import Any, Dict, List, Optional
+from datetime import datetime, date, timedelta
 import pyodbc
 import os
 from dotenv import load_dotenv
 import hashlib
 import secrets
-from simulated_storage import get_simulated_storage
+import functools
+import threading
+import asyncio
+from simulated_storage import STORAGE_DIR, close_simulated_storage, get_simulated_storage
+from replay_simulado import ReplaySimulado, leer_estado
+from importar_votantes import ArchivoInvalido, FORMATO_CSV, ImportacionVotantes, LectorPadron
+from paginacion import CursorInvalido, codificar_cursor, decodificar_cursor
+from exportar_datos import EXPORTACIONES, FORMATOS, TIPOS_CONTENIDO, comprimir_gzip, serializar
+from db_pool import ConnectionPool, PoolTimeoutError
+from circuit_breaker import CERRADO, CircuitBreaker
+from db_executor import DBExecutor, ExecutorSaturatedError
+from votos_sql import VotoRechazado, marca_fecha_voto
+from repositorio import (
+    BACKEND_AUTO, MODO_SIMULADO, DniDuplicado, RepositorioConRespaldo, RepositorioLocal, RepositorioSQLServer,
+    crear_repositorio
+)
+from results_cache import ResultsCache
+from candidate_catalog import CandidateCatalog
+from area_results import AREAS, AreaResults
+from voting_flow import VotingFlow
+from data_quality import DataQualityProfiler
+from results_stream import ResultsBroadcaster
+from vote_counters import VoteCounterAggregator
+from ballot_state import (
+    BallotStateIndex, TODOS_LOS_VOTOS, VOTO_DISTRITAL, VOTO_PRESIDENCIAL, VOTO_REGIONAL
+)
 
 load_dotenv("config.env")
 
@@ -41,6 +67,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 
@@ -66,16 +93,8 @@ DB_TRUSTED_CONNECTION = os.getenv("DB_TRUSTED_CONNECTION", "true").lower() == "t
 _db_available = None
 
 def check_db_availability():
-    """Verifica si SQL Server está disponible"""
-    global _db_available
-    if _db_available is None:
-        try:
-            conn = _try_db_connection()
-            conn.close()
-            _db_available = True
-        except:
-            _db_available = False
-    return _db_available
+    """Verifica si SQL Server está disponible (según el circuit breaker, sin intentar conectar)"""
+    return _db_breaker.state == CERRADO
 
 def _try_db_connection():
     """Intenta crear una conexión a SQL Server sin lanzar HTTPException"""
@@ -115,17 +134,264 @@ def _try_db_connection():
             )
     return pyodbc.connect(connection_string)
 
+# Pool de conexiones compartido por todos los endpoints
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "2"))
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "20"))
+DB_POOL_ACQUIRE_TIMEOUT = float(os.getenv("DB_POOL_ACQUIRE_TIMEOUT", "10"))
+DB_POOL_MAX_IDLE = float(os.getenv("DB_POOL_MAX_IDLE", "300"))
+DB_POOL_MAX_LIFETIME = float(os.getenv("DB_POOL_MAX_LIFETIME", "1800"))
+DB_POOL_PING_AFTER = float(os.getenv("DB_POOL_PING_AFTER", "5"))
+
+_db_pool = ConnectionPool(
+    _try_db_connection,
+    min_size=DB_POOL_MIN_SIZE,
+    max_size=DB_POOL_MAX_SIZE,
+    acquire_timeout=DB_POOL_ACQUIRE_TIMEOUT,
+    max_idle=DB_POOL_MAX_IDLE,
+    max_lifetime=DB_POOL_MAX_LIFETIME,
+    ping_after=DB_POOL_PING_AFTER,
+)
+
+def _probar_db():
+    """Prueba del circuit breaker: presta una conexión del pool y ejecuta SELECT 1"""
+    # El pool no hace ping a las conexiones usadas hace poco: la prueba consulta siempre
+    conn = _db_pool.acquire()
+    try:
+        cursor = conn.cursor()
+        try:
+            cursor.execute("SELECT 1")
+            cursor.fetchone()
+        finally:
+            cursor.close()
+    except Exception:
+        conn.invalidate()
+        raise
+    finally:
+        conn.close()
+
+# Circuit breaker: con SQL Server caído, las peticiones van al respaldo sin esperar el timeout de conexión
+DB_BREAKER_FAILURE_THRESHOLD = int(os.getenv("DB_BREAKER_FAILURE_THRESHOLD", "2"))
+DB_BREAKER_SUCCESS_THRESHOLD = int(os.getenv("DB_BREAKER_SUCCESS_THRESHOLD", "1"))
+DB_BREAKER_PROBE_INTERVAL = float(os.getenv("DB_BREAKER_PROBE_INTERVAL", "5"))
+
+_db_breaker = CircuitBreaker(
+    _probar_db,
+    failure_threshold=DB_BREAKER_FAILURE_THRESHOLD,
+    success_threshold=DB_BREAKER_SUCCESS_THRESHOLD,
+    probe_interval=DB_BREAKER_PROBE_INTERVAL,
+)
+
 def get_db_connection():
-    """Crea una conexión a SQL Server. Si falla, lanza excepción para usar modo simulado"""
+    """Presta una conexión del pool. Si SQL Server no responde, lanza excepción para usar modo simulado"""
     global _db_available
+    # Circuito abierto: ConnectionError al instante, sin intentar conectar
+    _db_breaker.check()
     try:
-        conn = _try_db_connection()
-        _db_available = True
-        return conn
+        conn = _db_pool.acquire()
+    except PoolTimeoutError as e:
+        # SQL Server responde pero todas las conexiones están ocupadas
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         _db_available = False
+        _db_breaker.record_failure(e)
         # Lanzar excepción especial que será capturada para usar modo simulado
         raise ConnectionError(f"SQL Server no disponible: {str(e)}")
+    _db_available = True
+    _db_breaker.record_success()
+    return conn
+
+# Ejecutor acotado para el trabajo bloqueante (pyodbc y almacenamiento simulado)
+DB_EXECUTOR_WORKERS = int(os.getenv("DB_EXECUTOR_WORKERS", str(DB_POOL_MAX_SIZE)))
+DB_EXECUTOR_MAX_QUEUE = int(os.getenv("DB_EXECUTOR_MAX_QUEUE", "500"))
+
+_db_executor = DBExecutor(max_workers=DB_EXECUTOR_WORKERS, max_queue=DB_EXECUTOR_MAX_QUEUE)
+
+def run_in_db_executor(func):
+    """Convierte un endpoint síncrono en asíncrono ejecutándolo en el ejecutor de BD"""
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        try:
+            return await _db_executor.run(func, *args, **kwargs)
+        except ExecutorSaturatedError as e:
+            raise HTTPException(status_code=503, detail=str(e))
+    return wrapper
+
+@app.on_event("startup")
+def warm_db_pool():
+    """Abre las conexiones mínimas del pool al iniciar el servidor"""
+    try:
+        _db_pool.warm()
+    except Exception as e:
+        print(f"No se pudo precalentar el pool de conexiones: {e}")
+        # Sin servidor al arrancar, las peticiones van al respaldo desde la primera
+        _db_breaker.trip(e)
+
+# Estado de votación por votante, en memoria del proceso
+_ballot_state = BallotStateIndex()
+
+def _cargar_estado_votacion():
+    """Carga el índice de estado de votación desde SQL Server (propaga los errores)"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        _ballot_state.load_from_db(cursor)
+    finally:
+        cursor.close()
+        conn.close()
+
+@app.on_event("startup")
+def warm_ballot_state():
+    """Carga el índice de estado de votación desde SQL Server"""
+    try:
+        _cargar_estado_votacion()
+    except Exception as e:
+        print(f"Índice de estado de votación sin precargar: {e}")
+
+# Caché de resultados: se invalida al confirmar votos y coalesce las recargas
+RESULTS_CACHE_MAX_STALENESS = float(os.getenv("RESULTS_CACHE_MAX_STALENESS", "2"))
+RESULTS_CACHE_TTL = float(os.getenv("RESULTS_CACHE_TTL", "30"))
+
+_results_cache = ResultsCache(max_staleness=RESULTS_CACHE_MAX_STALENESS, ttl=RESULTS_CACHE_TTL)
+
+@run_in_db_executor
+def _load_results(key: str, loader):
+    """Carga una clave de la caché de resultados en el ejecutor de BD"""
+    return _results_cache.get(key, loader)
+
+async def _load_cached_results(key: str, loader):
+    """Devuelve resultados cacheados sin salir del event loop; si están vencidos los recarga"""
+    value = _results_cache.get_fresh(key)
+    if value is not None:
+        return value
+    return await _load_results(key, loader)
+
+# Resultados en vivo por Server-Sent Events
+RESULTS_STREAM_QUEUE_SIZE = int(os.getenv("RESULTS_STREAM_QUEUE_SIZE", "256"))
+RESULTS_STREAM_SNAPSHOT_INTERVAL = float(os.getenv("RESULTS_STREAM_SNAPSHOT_INTERVAL", "30"))
+
+_results_broadcaster = ResultsBroadcaster(queue_size=RESULTS_STREAM_QUEUE_SIZE)
+
+async def _load_results_snapshot():
+    """Resultados completos de todas las categorías (desde la caché de resultados)"""
+    return {
+        "summary": await _load_cached_results("summary", _query_results_summary),
+        "presidencial": await _load_cached_results("presidencial", _query_resultados_presidencial),
+        "regional": await _load_cached_results("regional", _query_resultados_regional),
+        "distrital": await _load_cached_results("distrital", _query_resultados_distrital)
+    }
+
+@app.on_event("startup")
+async def start_results_stream():
+    """Asocia el difusor al event loop e inicia los snapshots periódicos"""
+    _results_broadcaster.attach(asyncio.get_running_loop())
+    app.state.results_snapshot_task = asyncio.create_task(
+        _results_broadcaster.run_snapshots(RESULTS_STREAM_SNAPSHOT_INTERVAL, _load_results_snapshot)
+    )
+
+# Contadores CANTIDAD_VOTOS: "sync" (en el mismo lote del voto) o "write_behind" (agregados en memoria)
+VOTE_COUNTERS_MODE = os.getenv("VOTE_COUNTERS_MODE", "sync").lower()
+VOTE_COUNTERS_FLUSH_MS = float(os.getenv("VOTE_COUNTERS_FLUSH_MS", "500"))
+VOTE_COUNTERS_MAX_PENDING = int(os.getenv("VOTE_COUNTERS_MAX_PENDING", "1000"))
+# Solo con un worker: el recálculo no ve los incrementos pendientes de los demás procesos
+VOTE_COUNTERS_RECONCILE_ON_STARTUP = os.getenv("VOTE_COUNTERS_RECONCILE_ON_STARTUP", "false").lower() == "true"
+
+_write_behind_counters = VOTE_COUNTERS_MODE == "write_behind"
+
+def _on_contadores_volcados(lote: Dict[str, Dict[int, int]]):
+    """Los resultados leídos antes del volcado quedan desactualizados"""
+    _results_cache.invalidate(*[categoria for categoria, ids in lote.items() if ids], "summary")
+
+_vote_counters = VoteCounterAggregator(
+    # Con el circuito abierto el volcado falla al instante y los incrementos quedan pendientes
+    get_db_connection,
+    flush_interval=VOTE_COUNTERS_FLUSH_MS / 1000,
+    max_pending=VOTE_COUNTERS_MAX_PENDING,
+    on_flush=_on_contadores_volcados
+)
+
+@app.on_event("startup")
+def start_vote_counters():
+    """Recupera contadores perdidos en una caída e inicia el volcado periódico"""
+    if not _write_behind_counters:
+        return
+    if VOTE_COUNTERS_RECONCILE_ON_STARTUP:
+        try:
+            _vote_counters.reconcile()
+        except Exception as e:
+            print(f"No se pudieron reconciliar los contadores de votos: {e}")
+    _vote_counters.start()
+
+def _on_votos_confirmados(votos: Dict[str, int]):
+    """Invalida los resultados y difunde votos ya registrados (categoría -> id de candidato)"""
+    _results_cache.invalidate(*votos, "summary")
+    if marca_fecha_voto(votos):
+        _voting_flow.add(datetime.now())
+    _results_broadcaster.publish("votos", {
+        "votos": [
+            {"categoria": categoria, "id_candidato": id_candidato}
+            for categoria, id_candidato in votos.items()
+        ]
+    })
+
+# Resultados regionales y distritales por área, sumados en memoria con cada voto
+AREA_RESULTS_REFRESH = float(os.getenv("AREA_RESULTS_REFRESH", "0"))
+
+_area_results = AreaResults()
+
+# Repositorio de datos: los endpoints no saben qué motor hay detrás
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", BACKEND_AUTO).lower()
+
+_repositorio = crear_repositorio(
+    STORAGE_BACKEND,
+    sqlserver=RepositorioSQLServer(
+        get_db_connection, _ballot_state, contadores=_vote_counters if _write_behind_counters else None,
+        areas=_area_results
+    ),
+    local=RepositorioLocal(get_simulated_storage, areas=_area_results)
+)
+
+def _cargar_votos_por_area():
+    """Filas (área, candidato, votos) de cada categoría con área, desde el repositorio"""
+    return {categoria: _repositorio.votos_por_area(categoria) for categoria in AREAS}
+
+@app.on_event("startup")
+def warm_area_results():
+    """Reconstruye los resultados por área y, con AREA_RESULTS_REFRESH, los refresca en segundo plano"""
+    try:
+        _area_results.rebuild(_cargar_votos_por_area())
+    except Exception as e:
+        print(f"Resultados por área sin precargar: {e}")
+    _area_results.start(_cargar_votos_por_area, AREA_RESULTS_REFRESH)
+
+# Flujo de votación por minuto, hora y día, sumado en memoria con cada voto
+VOTING_FLOW_SYNC_INTERVAL = float(os.getenv("VOTING_FLOW_SYNC_INTERVAL", "60"))
+
+_voting_flow = VotingFlow(
+    _repositorio.votos_por_minuto,
+    path=STORAGE_DIR / "voting_flow.json",
+    window=max(300.0, 2 * VOTING_FLOW_SYNC_INTERVAL)
+)
+
+@app.on_event("startup")
+def warm_voting_flow():
+    """Carga el flujo de votación guardado, relee los minutos recientes e inicia la sincronización periódica"""
+    try:
+        _voting_flow.load()
+    except Exception as e:
+        print(f"Flujo de votación sin precargar: {e}")
+    _voting_flow.start(VOTING_FLOW_SYNC_INTERVAL)
+
+@app.on_event("shutdown")
+def close_db_pool():
+    """Cierra las conexiones del pool al detener el servidor"""
+    if _write_behind_counters:
+        _vote_counters.stop()
+    _area_results.stop()
+    _voting_flow.stop()
+    _db_breaker.close()
+    _db_executor.shutdown()
+    _db_pool.close_all()
+    close_simulated_storage()
 
 # ============================================================================
 # MODELOS PYDANTIC
@@ -174,6 +440,14 @@ class VotoDistritalCreate(BaseModel):
     id_candidato_distrital: int
     distrito: str
 
+class BoletaCreate(BaseModel):
+    id_votantes: int
+    id_candidato: int
+    id_candidato_regional: int
+    region: str
+    id_candidato_distrital: int
+    distrito: str
+
 class VotanteStatus(BaseModel):
     can_vote_presidencial: bool
     can_vote_regional: bool
@@ -196,12 +470,22 @@ def verify_password(password: str, hashed: str) -> bool:
     """Verifica una contraseña"""
     return hash_password(password) == hashed
 
+def _status_desde_mascara(mascara: int) -> VotanteStatus:
+    """Construye el estado de voto a partir de la máscara de categorías votadas"""
+    return VotanteStatus(
+        can_vote_presidencial=not mascara & VOTO_PRESIDENCIAL,
+        can_vote_regional=not mascara & VOTO_REGIONAL,
+        can_vote_distrital=not mascara & VOTO_DISTRITAL,
+        has_all_votes=mascara == TODOS_LOS_VOTOS
+    )
+
 # ============================================================================
 # ENDPOINTS DE AUTENTICACIÓN
 # ============================================================================
 
 @app.post("/api/auth/login")
-async def login(usuario: UsuarioLogin):
+@run_in_db_executor
+def login(usuario: UsuarioLogin):
     """Autentica un usuario"""
     conn = get_db_connection()
     cursor = conn.cursor()
@@ -246,7 +530,8 @@ async def login(usuario: UsuarioLogin):
         conn.close()
 
 @app.post("/api/auth/register")
-async def register(usuario: UsuarioCreate):
+@run_in_db_executor
+def register(usuario: UsuarioCreate):
     """Registra un nuevo usuario"""
     conn = get_db_connection()
     cursor = conn.cursor()
@@ -288,1135 +573,591 @@ async def register(usuario: UsuarioCreate):
 # ============================================================================
 
 @app.post("/api/votantes")
-async def create_votante(votante: VotanteCreate):
+@run_in_db_executor
+def create_votante(votante: VotanteCreate):
     """Registra un nuevo votante"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
     try:
-        # Verificar si el DNI ya existe
-        cursor.execute("SELECT ID_VOTANTES FROM VOTANTES WHERE DNI = ?", (votante.dni,))
-        if cursor.fetchone():
-            raise HTTPException(
-                status_code=400,
-                detail="El DNI ya está registrado"
-            )
-        
-        cursor.execute(
-            """INSERT INTO VOTANTES (DNI, NOMBRES, APELLIDOS, FECHA_NACIMIENTO, REGION, DISTRITO)
-               OUTPUT INSERTED.ID_VOTANTES VALUES (?, ?, ?, ?, ?, ?)""",
-            (votante.dni, votante.nombres, votante.apellidos, votante.fecha_nacimiento,
-             votante.region, votante.distrito)
+        id_votantes = _repositorio.registrar_votante(votante.dict())
+    except DniDuplicado:
+        raise HTTPException(
+            status_code=400,
+            detail="El DNI ya está registrado"
         )
-        id_votantes = cursor.fetchone()[0]
-        conn.commit()
-        
-        return {
-            "id_votantes": id_votantes,
-            "message": "Votante registrado exitosamente"
-        }
     except HTTPException:
         raise
     except Exception as e:
-        conn.rollback()
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        cursor.close()
-        conn.close()
+    _results_cache.invalidate("summary", "votantes")
+    
+    return {
+        "id_votantes": id_votantes,
+        "message": "Votante registrado exitosamente"
+    }
 
-@app.get("/api/votantes/{dni}")
-async def get_votante_by_dni(dni: str):
-    """Obtiene un votante por DNI"""
+# Una importación masiva a la vez: el conjunto de DNI de cada una no ve lo que inserta otra
+_import_lock = asyncio.Lock()
+
+async def _en_ejecutor_con_espera(func, *args):
+    """Ejecuta en el ejecutor de BD; si está saturado espera turno en lugar de responder 503"""
+    while True:
+        try:
+            return await _db_executor.run(func, *args)
+        except ExecutorSaturatedError:
+            await asyncio.sleep(0.05)
+
+def _error_importacion(error: Exception, importacion: Optional[ImportacionVotantes], modo: str) -> Dict[str, Any]:
+    """Detalle de un error de importación con lo avanzado hasta ese momento"""
+    resumen = importacion.resumen() if importacion is not None else {}
+    return {"error": str(error), **resumen, "modo": modo}
+
+@app.post("/api/votantes/import")
+async def import_votantes(
+    request: Request,
+    formato: str = FORMATO_CSV,
+    dry_run: bool = False,
+    lote: int = 5000,
+    max_errores: int = 100
+):
+    """
+    Importa el padrón desde el cuerpo de la petición (CSV o NDJSON, ver importar_votantes.py).
+    El cuerpo se procesa a medida que llega; dry_run=true solo valida
+    """
+    if _import_lock.locked():
+        raise HTTPException(status_code=409, detail="Ya hay una importación en curso")
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
+        lector = LectorPadron(formato.lower())
+    except ArchivoInvalido as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    lote = max(1, min(lote, 50000))
+
+    async with _import_lock:
+        # El motor se fija al empezar para no repartir el padrón entre SQL Server y el local
+        destino = _repositorio.activo() if isinstance(_repositorio, RepositorioConRespaldo) else _repositorio
+        importacion = None
         try:
-            cursor.execute(
-                """SELECT ID_VOTANTES, DNI, NOMBRES, APELLIDOS, FECHA_NACIMIENTO, REGION, DISTRITO, FECHA_VOTO
-                   FROM VOTANTES WHERE DNI = ?""",
-                (dni,)
+            importacion = ImportacionVotantes(
+                await _en_ejecutor_con_espera(destino.dnis_votantes),
+                None if dry_run else destino.insertar_votantes,
+                max_errores=max_errores
             )
-            row = cursor.fetchone()
-            
-            if not row:
-                raise HTTPException(status_code=404, detail="Votante no encontrado")
-            
-            return {
-                "id_votantes": row[0],
-                "dni": row[1],
-                "nombres": row[2],
-                "apellidos": row[3],
-                "fecha_nacimiento": str(row[4]),
-                "region": row[5],
-                "distrito": row[6],
-                "fecha_voto": str(row[7]) if row[7] else None
-            }
-        except HTTPException:
-            raise
+            # El cuerpo ya se está leyendo: con el ejecutor saturado cada lote espera turno
+            pendientes = []
+            async for trozo in request.stream():
+                pendientes.extend(lector.feed(trozo))
+                while len(pendientes) >= lote and not importacion.abortada:
+                    await _en_ejecutor_con_espera(importacion.procesar, pendientes[:lote])
+                    del pendientes[:lote]
+                if importacion.abortada:
+                    break
+            else:
+                pendientes.extend(lector.close())
+                for inicio in range(0, len(pendientes), lote):
+                    await _en_ejecutor_con_espera(importacion.procesar, pendientes[inicio:inicio + lote])
+        # Lo insertado en lotes anteriores queda; el resumen dice cuánto fue
+        except ArchivoInvalido as e:
+            raise HTTPException(status_code=400, detail=_error_importacion(e, importacion, destino.modo))
+        except ConnectionError as e:
+            raise HTTPException(status_code=503, detail=_error_importacion(e, importacion, destino.modo))
         except Exception as e:
-            raise HTTPException(status_code=500, detail=str(e))
+            raise HTTPException(status_code=500, detail=_error_importacion(e, importacion, destino.modo))
         finally:
-            cursor.close()
-            conn.close()
-    except ConnectionError:
-        # Modo simulado
-        storage = get_simulated_storage()
-        votante = storage.get_votante_by_dni(dni)
-        
-        if not votante:
-            # Crear votante simulado si no existe
-            from simulated_storage import VOTANTES_FILE
-            import random
-            id_votante = random.randint(1000, 9999)
-            votante = {
-                'id_votantes': id_votante,
-                'dni': dni,
-                'nombres': 'Votante',
-                'apellidos': 'Simulado',
-                'fecha_nacimiento': '2000-01-01',
-                'region': 'Lima',
-                'distrito': 'Lima',
-                'fecha_voto': None
-            }
-            storage._votantes[str(id_votante)] = votante
-            storage._save_json(VOTANTES_FILE, storage._votantes)
-        
-        return {
-            "id_votantes": votante.get('id_votantes'),
-            "dni": votante.get('dni', dni),
-            "nombres": votante.get('nombres', 'Votante'),
-            "apellidos": votante.get('apellidos', 'Simulado'),
-            "fecha_nacimiento": votante.get('fecha_nacimiento', '2000-01-01'),
-            "region": votante.get('region', 'Lima'),
-            "distrito": votante.get('distrito', 'Lima'),
-            "fecha_voto": votante.get('fecha_voto')
-        }
+            _results_cache.invalidate("summary", "votantes")
 
-@app.get("/api/votantes/{dni}/status", response_model=VotanteStatus)
-async def get_votante_status(dni: str):
-    """Devuelve el estado de voto de un votante por DNI"""
-    try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
+    resumen = {**importacion.resumen(), "modo": destino.modo}
+    if importacion.abortada:
+        raise HTTPException(status_code=422, detail=resumen)
+    return resumen
 
-        try:
-            # Buscar votante por DNI
-            cursor.execute(
-                "SELECT ID_VOTANTES FROM VOTANTES WHERE DNI = ?",
-                (dni,)
-            )
-            row = cursor.fetchone()
-
-            if not row:
-                # No existe votante: puede votar en todas las categorías
-                return VotanteStatus(
-                    can_vote_presidencial=True,
-                    can_vote_regional=True,
-                    can_vote_distrital=True,
-                    has_all_votes=False
-                )
-
-            id_votantes = row[0]
-
-            # Contar votos por categoría
-            cursor.execute(
-                "SELECT COUNT(*) FROM VOTO_PRESIDENCIAL WHERE ID_VOTANTES = ?",
-                (id_votantes,)
-            )
-            votos_presidenciales = cursor.fetchone()[0] or 0
-            cursor.execute(
-                "SELECT COUNT(*) FROM VOTO_REGIONAL WHERE ID_VOTANTES = ?",
-                (id_votantes,)
-            )
-            votos_regionales = cursor.fetchone()[0] or 0
-            cursor.execute(
-                "SELECT COUNT(*) FROM VOTO_DISTRITAL WHERE ID_VOTANTES = ?",
-                (id_votantes,)
-            )
-            votos_distritales = cursor.fetchone()[0] or 0
-
-            can_vote_presidencial = votos_presidenciales < 1
-            can_vote_regional = votos_regionales < 1
-            can_vote_distrital = votos_distritales < 1
-            has_all_votes = (
-                votos_presidenciales >= 1 and
-                votos_regionales >= 1 and
-                votos_distritales >= 1
-            )
+@app.get("/api/votantes/{dni}")
+@run_in_db_executor
+def get_votante_by_dni(dni: str):
+    """Obtiene un votante por DNI (en modo simulado se crea si no existe)"""
+    try:
+        votante = _repositorio.obtener_votante_por_dni(dni)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    if not votante:
+        raise HTTPException(status_code=404, detail="Votante no encontrado")
+    return votante
 
-            return VotanteStatus(
-                can_vote_presidencial=can_vote_presidencial,
-                can_vote_regional=can_vote_regional,
-                can_vote_distrital=can_vote_distrital,
-                has_all_votes=has_all_votes
-            )
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=str(e))
-        finally:
-            cursor.close()
-            conn.close()
-    except ConnectionError:
-        # Modo simulado
-        storage = get_simulated_storage()
-        votante = storage.get_votante_by_dni(dni)
-        
-        if not votante:
-            # No existe votante: puede votar en todas las categorías
-            return VotanteStatus(
-                can_vote_presidencial=True,
-                can_vote_regional=True,
-                can_vote_distrital=True,
-                has_all_votes=False
-            )
-        
-        id_votantes = votante.get('id_votantes')
-        
-        # Contar votos por categoría
-        votos_presidenciales = storage.count_votos_presidenciales(id_votantes)
-        votos_regionales = storage.count_votos_regionales(id_votantes)
-        votos_distritales = storage.count_votos_distritales(id_votantes)
-        
-        can_vote_presidencial = votos_presidenciales < 1
-        can_vote_regional = votos_regionales < 1
-        can_vote_distrital = votos_distritales < 1
-        has_all_votes = (
-            votos_presidenciales >= 1 and
-            votos_regionales >= 1 and
-            votos_distritales >= 1
-        )
-        
-        return VotanteStatus(
-            can_vote_presidencial=can_vote_presidencial,
-            can_vote_regional=can_vote_regional,
-            can_vote_distrital=can_vote_distrital,
-            has_all_votes=has_all_votes
-        )
+@app.get("/api/votantes/{dni}/status", response_model=VotanteStatus)
+@run_in_db_executor
+def get_votante_status(dni: str, verify: bool = False):
+    """Devuelve el estado de voto de un votante por DNI (verify=true consulta la BD en lugar del índice en memoria)"""
+    try:
+        # Si el votante no existe, la máscara es 0: puede votar en todas las categorías
+        return _status_desde_mascara(_repositorio.estado_votante(dni, verify))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/votantes")
-async def get_all_votantes(limit: int = 100, offset: int = 0):
-    """Obtiene todos los votantes"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
+@run_in_db_executor
+def get_all_votantes(
+    response: Response,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    region: Optional[str] = None,
+    distrito: Optional[str] = None
+):
+    """
+    Obtiene los votantes del más reciente al más antiguo, de a `limit`.
+    Si hay más, el encabezado X-Next-Cursor trae el token para pedir la página siguiente (?cursor=...)
+    """
+    limit = max(1, min(limit, 1000))
     try:
-        cursor.execute(
-            """SELECT ID_VOTANTES, DNI, NOMBRES, APELLIDOS, FECHA_NACIMIENTO, REGION, DISTRITO
-               FROM VOTANTES ORDER BY ID_VOTANTES DESC OFFSET ? ROWS FETCH NEXT ? ROWS ONLY""",
-            (offset, limit)
-        )
-        rows = cursor.fetchall()
-        
-        votantes = []
-        for row in rows:
-            votantes.append({
-                "id_votantes": row[0],
-                "dni": row[1],
-                "nombres": row[2],
-                "apellidos": row[3],
-                "fecha_nacimiento": str(row[4]),
-                "region": row[5],
-                "distrito": row[6]
-            })
-        
-        return votantes
+        despues_de = decodificar_cursor(cursor, region, distrito) if cursor else None
+    except CursorInvalido as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        # Una fila de más para saber si hay página siguiente
+        votantes = _repositorio.listar_votantes(limit + 1, despues_de, region, distrito)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        cursor.close()
-        conn.close()
+    if len(votantes) > limit:
+        votantes = votantes[:limit]
+        response.headers["X-Next-Cursor"] = codificar_cursor(votantes[-1]["id_votantes"], region, distrito)
+    return votantes
 
 # ============================================================================
 # ENDPOINTS DE CANDIDATOS
 # ============================================================================
 
-@app.get("/api/candidatos/presidenciales")
-async def get_candidatos_presidenciales():
-    """Obtiene todos los candidatos presidenciales"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
+def _listar_candidatos(categoria: str):
+    """Candidatos de una categoría con su nombre completo (sin votos: el catálogo no cambia al votar)"""
+    return [
+        {
+            "id": candidato["id"],
+            "nombres": candidato["nombres"],
+            "apellidos": candidato["apellidos"],
+            "nombre_completo": f"{candidato['nombres']} {candidato['apellidos']}"
+        }
+        for candidato in _repositorio.listar_candidatos(categoria)
+    ]
+
+CANDIDATE_CATALOG_TTL = float(os.getenv("CANDIDATE_CATALOG_TTL", "60"))
+
+_candidate_catalog = CandidateCatalog(_listar_candidatos, ttl=CANDIDATE_CATALOG_TTL)
+
+async def _servir_catalogo(categoria: str, request: Request) -> Response:
+    """Catálogo ya serializado; 304 si el cliente envía el ETag vigente"""
+    entrada = _candidate_catalog.get_fresh(categoria)
+    if entrada is None:
+        try:
+            entrada = await _db_executor.run(_candidate_catalog.get, categoria)
+        except ExecutorSaturatedError as e:
+            raise HTTPException(status_code=503, detail=str(e))
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+    # no-cache: el navegador guarda la respuesta pero la revalida en cada carga de la boleta
+    headers = {"ETag": entrada.etag, "Cache-Control": "no-cache"}
+    if _candidate_catalog.not_modified(entrada, request.headers.get("if-none-match")):
+        return Response(status_code=304, headers=headers)
+    return Response(content=entrada.body, media_type="application/json", headers=headers)
+
+def _crear_candidato(categoria: str, candidato: BaseModel):
+    """Crea un candidato en una categoría"""
     try:
-        cursor.execute(
-            "SELECT ID_CANDIDATO_PRESIDENCIAL, NOMBRES, APELLIDOS, CANTIDAD_VOTOS FROM CANDIDATO_PRESIDENCIAL"
-        )
-        rows = cursor.fetchall()
-        
-        candidatos = []
-        for row in rows:
-            candidatos.append({
-                "id": row[0],
-                "nombres": row[1],
-                "apellidos": row[2],
-                "nombre_completo": f"{row[1]} {row[2]}",
-                "cantidad_votos": row[3] or 0
-            })
-        
-        return candidatos
+        id_candidato = _repositorio.crear_candidato(categoria, candidato.nombres, candidato.apellidos)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        cursor.close()
-        conn.close()
+    _results_cache.invalidate(categoria, "summary")
+    _candidate_catalog.invalidate(categoria)
+    
+    return {
+        "id": id_candidato,
+        "nombres": candidato.nombres,
+        "apellidos": candidato.apellidos,
+        "message": f"Candidato {categoria} creado exitosamente"
+    }
+
+@app.get("/api/candidatos/presidenciales")
+async def get_candidatos_presidenciales(request: Request):
+    """Obtiene todos los candidatos presidenciales"""
+    return await _servir_catalogo("presidencial", request)
 
 @app.get("/api/candidatos/regionales")
-async def get_candidatos_regionales():
+async def get_candidatos_regionales(request: Request):
     """Obtiene todos los candidatos regionales"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    try:
-        cursor.execute(
-            "SELECT ID_CANDIDATO_REGIONAL, NOMBRES, APELLIDOS, CANTIDAD_VOTOS FROM CANDIDATO_REGIONAL"
-        )
-        rows = cursor.fetchall()
-        
-        candidatos = []
-        for row in rows:
-            candidatos.append({
-                "id": row[0],
-                "nombres": row[1],
-                "apellidos": row[2],
-                "nombre_completo": f"{row[1]} {row[2]}",
-                "cantidad_votos": row[3] or 0
-            })
-        
-        return candidatos
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        cursor.close()
-        conn.close()
+    return await _servir_catalogo("regional", request)
 
 @app.get("/api/candidatos/distritales")
-async def get_candidatos_distritales():
+async def get_candidatos_distritales(request: Request):
     """Obtiene todos los candidatos distritales"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    try:
-        cursor.execute(
-            "SELECT ID_CANDIDATO_DISTRITAL, NOMBRES, APELLIDOS, CANTIDAD_VOTOS FROM CANDIDATO_DISTRITAL"
-        )
-        rows = cursor.fetchall()
-        
-        candidatos = []
-        for row in rows:
-            candidatos.append({
-                "id": row[0],
-                "nombres": row[1],
-                "apellidos": row[2],
-                "nombre_completo": f"{row[1]} {row[2]}",
-                "cantidad_votos": row[3] or 0
-            })
-        
-        return candidatos
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        cursor.close()
-        conn.close()
+    return await _servir_catalogo("distrital", request)
 
 @app.post("/api/candidatos/presidenciales")
-async def create_candidato_presidencial(candidato: CandidatoPresidencialCreate):
+@run_in_db_executor
+def create_candidato_presidencial(candidato: CandidatoPresidencialCreate):
     """Crea un nuevo candidato presidencial"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    try:
-        cursor.execute(
-            """INSERT INTO CANDIDATO_PRESIDENCIAL (NOMBRES, APELLIDOS)
-               OUTPUT INSERTED.ID_CANDIDATO_PRESIDENCIAL VALUES (?, ?)""",
-            (candidato.nombres, candidato.apellidos)
-        )
-        id_candidato = cursor.fetchone()[0]
-        conn.commit()
-        
-        return {
-            "id": id_candidato,
-            "nombres": candidato.nombres,
-            "apellidos": candidato.apellidos,
-            "message": "Candidato presidencial creado exitosamente"
-        }
-    except Exception as e:
-        conn.rollback()
-        raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        cursor.close()
-        conn.close()
+    return _crear_candidato("presidencial", candidato)
 
 @app.post("/api/candidatos/regionales")
-async def create_candidato_regional(candidato: CandidatoRegionalCreate):
+@run_in_db_executor
+def create_candidato_regional(candidato: CandidatoRegionalCreate):
     """Crea un nuevo candidato regional"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    try:
-        cursor.execute(
-            """INSERT INTO CANDIDATO_REGIONAL (NOMBRES, APELLIDOS)
-               OUTPUT INSERTED.ID_CANDIDATO_REGIONAL VALUES (?, ?)""",
-            (candidato.nombres, candidato.apellidos)
-        )
-        id_candidato = cursor.fetchone()[0]
-        conn.commit()
-        
-        return {
-            "id": id_candidato,
-            "nombres": candidato.nombres,
-            "apellidos": candidato.apellidos,
-            "message": "Candidato regional creado exitosamente"
-        }
-    except Exception as e:
-        conn.rollback()
-        raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        cursor.close()
-        conn.close()
+    return _crear_candidato("regional", candidato)
 
 @app.post("/api/candidatos/distritales")
-async def create_candidato_distrital(candidato: CandidatoDistritalCreate):
+@run_in_db_executor
+def create_candidato_distrital(candidato: CandidatoDistritalCreate):
     """Crea un nuevo candidato distrital"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    try:
-        cursor.execute(
-            """INSERT INTO CANDIDATO_DISTRITAL (NOMBRES, APELLIDOS)
-               OUTPUT INSERTED.ID_CANDIDATO_DISTRITAL VALUES (?, ?)""",
-            (candidato.nombres, candidato.apellidos)
-        )
-        id_candidato = cursor.fetchone()[0]
-        conn.commit()
-        
-        return {
-            "id": id_candidato,
-            "nombres": candidato.nombres,
-            "apellidos": candidato.apellidos,
-            "message": "Candidato distrital creado exitosamente"
-        }
-    except Exception as e:
-        conn.rollback()
-        raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        cursor.close()
-        conn.close()
+    return _crear_candidato("distrital", candidato)
 
 # ============================================================================
 # ENDPOINTS DE VOTOS
 # ============================================================================
 
-@app.post("/api/votos/presidencial")
-async def create_voto_presidencial(voto: VotoPresidencialCreate):
-    """Registra un voto presidencial"""
+def _sufijo_modo(modo: str) -> str:
+    """Los mensajes indican cuando el voto quedó en el almacenamiento simulado"""
+    return " (modo simulado)" if modo == MODO_SIMULADO else ""
+
+def _emitir_votos(id_votantes: int, votos: Dict[str, int]) -> str:
+    """Registra votos (categoría -> id de candidato) por el repositorio; devuelve el modo que los registró"""
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        try:
-            # Verificar si el votante existe
-            cursor.execute(
-                "SELECT ID_VOTANTES FROM VOTANTES WHERE ID_VOTANTES = ?",
-                (voto.id_votantes,)
-            )
-            votante = cursor.fetchone()
-            
-            if not votante:
-                raise HTTPException(status_code=404, detail="Votante no encontrado")
-            
-            # Verificar si el votante ya emitió los tres tipos de voto
-            cursor.execute(
-                "SELECT COUNT(*) FROM VOTO_PRESIDENCIAL WHERE ID_VOTANTES = ?",
-                (voto.id_votantes,)
-            )
-            votos_presidenciales = cursor.fetchone()[0] or 0
-            cursor.execute(
-                "SELECT COUNT(*) FROM VOTO_REGIONAL WHERE ID_VOTANTES = ?",
-                (voto.id_votantes,)
-            )
-            votos_regionales = cursor.fetchone()[0] or 0
-            cursor.execute(
-                "SELECT COUNT(*) FROM VOTO_DISTRITAL WHERE ID_VOTANTES = ?",
-                (voto.id_votantes,)
-            )
-            votos_distritales = cursor.fetchone()[0] or 0
-            
-            if votos_presidenciales >= 1 and votos_regionales >= 1 and votos_distritales >= 1:
-                raise HTTPException(
-                    status_code=400,
-                    detail="El votante ya ha ejercido todos sus votos (presidencial, regional y distrital)"
-                )
-
-            # Verificar si ya votó presidencial
-            if votos_presidenciales >= 1:
-                raise HTTPException(
-                    status_code=400,
-                    detail="El votante ya ha ejercido su voto presidencial"
-                )
-            
-            # Obtener datos del candidato
-            cursor.execute(
-                "SELECT NOMBRES, APELLIDOS FROM CANDIDATO_PRESIDENCIAL WHERE ID_CANDIDATO_PRESIDENCIAL = ?",
-                (voto.id_candidato,)
-            )
-            candidato = cursor.fetchone()
-            
-            if not candidato:
-                raise HTTPException(status_code=404, detail="Candidato no encontrado")
-            
-            # Registrar el voto
-            cursor.execute(
-                """INSERT INTO VOTO_PRESIDENCIAL (ID_VOTANTES, ID_CANDIDATO, NOMBRE, APELLIDO)
-                   VALUES (?, ?, ?, ?)""",
-                (voto.id_votantes, voto.id_candidato, candidato[0], candidato[1])
-            )
-            
-            # Actualizar cantidad de votos del candidato
-            cursor.execute(
-                "UPDATE CANDIDATO_PRESIDENCIAL SET CANTIDAD_VOTOS = CANTIDAD_VOTOS + 1 WHERE ID_CANDIDATO_PRESIDENCIAL = ?",
-                (voto.id_candidato,)
-            )
-            
-            # Actualizar votante
-            cursor.execute(
-                "UPDATE VOTANTES SET FECHA_VOTO = ? WHERE ID_VOTANTES = ?",
-                (datetime.now(), voto.id_votantes)
-            )
-            
-            conn.commit()
-            
-            return {
-                "message": "Voto presidencial registrado exitosamente"
-            }
-        except HTTPException:
-            raise
-        except Exception as e:
-            conn.rollback()
-            raise HTTPException(status_code=500, detail=str(e))
-        finally:
-            cursor.close()
-            conn.close()
-    except ConnectionError:
-        # Modo simulado: usar almacenamiento en archivo JSON
-        storage = get_simulated_storage()
-        
-        # Verificar si el votante existe (simulado - asumimos que existe si tiene ID)
-        votante = storage.get_votante(voto.id_votantes)
-        if not votante:
-            # En modo simulado, creamos el votante si no existe
-            from simulated_storage import VOTANTES_FILE
-            storage._votantes[str(voto.id_votantes)] = {
-                'id_votantes': voto.id_votantes,
-                'dni': f'DNI{voto.id_votantes}',
-                'fecha_voto': None
-            }
-            storage._save_json(VOTANTES_FILE, storage._votantes)
-        
-        # Verificar votos existentes
-        votos_presidenciales = storage.count_votos_presidenciales(voto.id_votantes)
-        votos_regionales = storage.count_votos_regionales(voto.id_votantes)
-        votos_distritales = storage.count_votos_distritales(voto.id_votantes)
-        
-        if votos_presidenciales >= 1 and votos_regionales >= 1 and votos_distritales >= 1:
-            raise HTTPException(
-                status_code=400,
-                detail="El votante ya ha ejercido todos sus votos (presidencial, regional y distrital)"
-            )
-        
-        if votos_presidenciales >= 1:
-            raise HTTPException(
-                status_code=400,
-                detail="El votante ya ha ejercido su voto presidencial"
-            )
-        
-        # Obtener candidato (simulado)
-        candidato = storage.get_candidato_presidencial(voto.id_candidato)
-        if not candidato:
-            # Crear candidato simulado si no existe
-            from simulated_storage import CANDIDATOS_PRESIDENCIALES_FILE
-            candidato = {
-                'nombres': f'Candidato {voto.id_candidato}',
-                'apellidos': 'Presidencial'
-            }
-            storage._candidatos_presidenciales[str(voto.id_candidato)] = {
-                'id_candidato': voto.id_candidato,
-                'nombres': candidato['nombres'],
-                'apellidos': candidato['apellidos'],
-                'cantidad_votos': 0
-            }
-            storage._save_json(CANDIDATOS_PRESIDENCIALES_FILE, storage._candidatos_presidenciales)
-        else:
-            candidato = {
-                'nombres': candidato.get('nombres', f'Candidato {voto.id_candidato}'),
-                'apellidos': candidato.get('apellidos', 'Presidencial')
-            }
-        
-        # Registrar voto
-        storage.add_voto_presidencial(
-            voto.id_votantes,
-            voto.id_candidato,
-            candidato['nombres'],
-            candidato['apellidos']
-        )
-        
-        # Actualizar contador de votos
-        storage.update_candidato_presidencial_votos(voto.id_candidato, 1)
-        
-        # Actualizar fecha de voto del votante
-        storage.update_votante_fecha_voto(voto.id_votantes, datetime.now())
-        
-        return {
-            "message": "Voto presidencial registrado exitosamente (modo simulado)"
-        }
+        modo = _repositorio.emitir_votos(id_votantes, votos)
+    except VotoRechazado as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    _on_votos_confirmados(votos)
+    return modo
+
+@app.post("/api/votos/presidencial")
+@run_in_db_executor
+def create_voto_presidencial(voto: VotoPresidencialCreate):
+    """Registra un voto presidencial"""
+    modo = _emitir_votos(voto.id_votantes, {"presidencial": voto.id_candidato})
+    return {
+        "message": f"Voto presidencial registrado exitosamente{_sufijo_modo(modo)}"
+    }
 
 @app.post("/api/votos/regional")
-async def create_voto_regional(voto: VotoRegionalCreate):
+@run_in_db_executor
+def create_voto_regional(voto: VotoRegionalCreate):
     """Registra un voto regional"""
-    try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        try:
-            # Verificar que el votante existe
-            cursor.execute(
-                "SELECT ID_VOTANTES FROM VOTANTES WHERE ID_VOTANTES = ?",
-                (voto.id_votantes,)
-            )
-            votante = cursor.fetchone()
-            
-            if not votante:
-                raise HTTPException(status_code=404, detail="Votante no encontrado")
-
-            # Verificar si el votante ya emitió los tres tipos de voto
-            cursor.execute(
-                "SELECT COUNT(*) FROM VOTO_PRESIDENCIAL WHERE ID_VOTANTES = ?",
-                (voto.id_votantes,)
-            )
-            votos_presidenciales = cursor.fetchone()[0] or 0
-            cursor.execute(
-                "SELECT COUNT(*) FROM VOTO_REGIONAL WHERE ID_VOTANTES = ?",
-                (voto.id_votantes,)
-            )
-            votos_regionales = cursor.fetchone()[0] or 0
-            cursor.execute(
-                "SELECT COUNT(*) FROM VOTO_DISTRITAL WHERE ID_VOTANTES = ?",
-                (voto.id_votantes,)
-            )
-            votos_distritales = cursor.fetchone()[0] or 0
-            if votos_presidenciales >= 1 and votos_regionales >= 1 and votos_distritales >= 1:
-                raise HTTPException(
-                    status_code=400,
-                    detail="El votante ya ha ejercido todos sus votos (presidencial, regional y distrital)"
-                )
-
-            # Verificar si ya votó regional (solo se permite un voto regional)
-            if votos_regionales >= 1:
-                raise HTTPException(
-                    status_code=400,
-                    detail="El votante ya ha ejercido su voto regional"
-                )
-            
-            # Obtener datos del candidato
-            cursor.execute(
-                "SELECT NOMBRES, APELLIDOS FROM CANDIDATO_REGIONAL WHERE ID_CANDIDATO_REGIONAL = ?",
-                (voto.id_candidato_regional,)
-            )
-            candidato = cursor.fetchone()
-            
-            if not candidato:
-                raise HTTPException(status_code=404, detail="Candidato regional no encontrado")
-            
-            # Registrar el voto
-            cursor.execute(
-                """INSERT INTO VOTO_REGIONAL (ID_VOTANTES, ID_CANDIDATO_REGIONAL, NOMBRE, APELLIDO)
-                   VALUES (?, ?, ?, ?)""",
-                (voto.id_votantes, voto.id_candidato_regional, candidato[0], candidato[1])
-            )
-            
-            # Actualizar cantidad de votos del candidato
-            cursor.execute(
-                "UPDATE CANDIDATO_REGIONAL SET CANTIDAD_VOTOS = CANTIDAD_VOTOS + 1 WHERE ID_CANDIDATO_REGIONAL = ?",
-                (voto.id_candidato_regional,)
-            )
-            
-            conn.commit()
-            
-            return {
-                "message": "Voto regional registrado exitosamente"
-            }
-        except HTTPException:
-            raise
-        except Exception as e:
-            conn.rollback()
-            raise HTTPException(status_code=500, detail=str(e))
-        finally:
-            cursor.close()
-            conn.close()
-    except ConnectionError:
-        # Modo simulado
-        storage = get_simulated_storage()
-        from simulated_storage import VOTANTES_FILE, CANDIDATOS_REGIONALES_FILE
-        
-        votante = storage.get_votante(voto.id_votantes)
-        if not votante:
-            storage._votantes[str(voto.id_votantes)] = {
-                'id_votantes': voto.id_votantes,
-                'dni': f'DNI{voto.id_votantes}',
-                'fecha_voto': None
-            }
-            storage._save_json(VOTANTES_FILE, storage._votantes)
-        
-        votos_presidenciales = storage.count_votos_presidenciales(voto.id_votantes)
-        votos_regionales = storage.count_votos_regionales(voto.id_votantes)
-        votos_distritales = storage.count_votos_distritales(voto.id_votantes)
-        
-        if votos_presidenciales >= 1 and votos_regionales >= 1 and votos_distritales >= 1:
-            raise HTTPException(
-                status_code=400,
-                detail="El votante ya ha ejercido todos sus votos (presidencial, regional y distrital)"
-            )
-        
-        if votos_regionales >= 1:
-            raise HTTPException(
-                status_code=400,
-                detail="El votante ya ha ejercido su voto regional"
-            )
-        
-        candidato = storage.get_candidato_regional(voto.id_candidato_regional)
-        if not candidato:
-            candidato = {
-                'nombres': f'Candidato {voto.id_candidato_regional}',
-                'apellidos': 'Regional'
-            }
-            storage._candidatos_regionales[str(voto.id_candidato_regional)] = {
-                'id_candidato': voto.id_candidato_regional,
-                'nombres': candidato['nombres'],
-                'apellidos': candidato['apellidos'],
-                'cantidad_votos': 0
-            }
-            storage._save_json(CANDIDATOS_REGIONALES_FILE, storage._candidatos_regionales)
-        else:
-            candidato = {
-                'nombres': candidato.get('nombres', f'Candidato {voto.id_candidato_regional}'),
-                'apellidos': candidato.get('apellidos', 'Regional')
-            }
-        
-        storage.add_voto_regional(
-            voto.id_votantes,
-            voto.id_candidato_regional,
-            candidato['nombres'],
-            candidato['apellidos']
-        )
-        storage.update_candidato_regional_votos(voto.id_candidato_regional, 1)
-        
-        return {
-            "message": "Voto regional registrado exitosamente (modo simulado)"
-        }
+    modo = _emitir_votos(voto.id_votantes, {"regional": voto.id_candidato_regional})
+    return {
+        "message": f"Voto regional registrado exitosamente{_sufijo_modo(modo)}"
+    }
 
 @app.post("/api/votos/distrital")
-async def create_voto_distrital(voto: VotoDistritalCreate):
+@run_in_db_executor
+def create_voto_distrital(voto: VotoDistritalCreate):
     """Registra un voto distrital"""
-    try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        try:
-            # Verificar que el votante existe
-            cursor.execute(
-                "SELECT ID_VOTANTES FROM VOTANTES WHERE ID_VOTANTES = ?",
-                (voto.id_votantes,)
-            )
-            votante = cursor.fetchone()
-            
-            if not votante:
-                raise HTTPException(status_code=404, detail="Votante no encontrado")
-
-            # Verificar si el votante ya emitió los tres tipos de voto
-            cursor.execute(
-                "SELECT COUNT(*) FROM VOTO_PRESIDENCIAL WHERE ID_VOTANTES = ?",
-                (voto.id_votantes,)
-            )
-            votos_presidenciales = cursor.fetchone()[0] or 0
-            cursor.execute(
-                "SELECT COUNT(*) FROM VOTO_REGIONAL WHERE ID_VOTANTES = ?",
-                (voto.id_votantes,)
-            )
-            votos_regionales = cursor.fetchone()[0] or 0
-            cursor.execute(
-                "SELECT COUNT(*) FROM VOTO_DISTRITAL WHERE ID_VOTANTES = ?",
-                (voto.id_votantes,)
-            )
-            votos_distritales = cursor.fetchone()[0] or 0
-            if votos_presidenciales >= 1 and votos_regionales >= 1 and votos_distritales >= 1:
-                raise HTTPException(
-                    status_code=400,
-                    detail="El votante ya ha ejercido todos sus votos (presidencial, regional y distrital)"
-                )
-
-            # Verificar si ya votó distrital (solo se permite un voto distrital)
-            if votos_distritales >= 1:
-                raise HTTPException(
-                    status_code=400,
-                    detail="El votante ya ha ejercido su voto distrital"
-                )
-            
-            # Obtener datos del candidato
-            cursor.execute(
-                "SELECT NOMBRES, APELLIDOS FROM CANDIDATO_DISTRITAL WHERE ID_CANDIDATO_DISTRITAL = ?",
-                (voto.id_candidato_distrital,)
-            )
-            candidato = cursor.fetchone()
-            
-            if not candidato:
-                raise HTTPException(status_code=404, detail="Candidato distrital no encontrado")
-            
-            # Registrar el voto
-            cursor.execute(
-                """INSERT INTO VOTO_DISTRITAL (ID_VOTANTES, ID_CANDIDATO_DISTRITAL, NOMBRE, APELLIDO)
-                   VALUES (?, ?, ?, ?)""",
-                (voto.id_votantes, voto.id_candidato_distrital, candidato[0], candidato[1])
-            )
-            
-            # Actualizar cantidad de votos del candidato
-            cursor.execute(
-                "UPDATE CANDIDATO_DISTRITAL SET CANTIDAD_VOTOS = CANTIDAD_VOTOS + 1 WHERE ID_CANDIDATO_DISTRITAL = ?",
-                (voto.id_candidato_distrital,)
-            )
-            
-            conn.commit()
-            
-            return {
-                "message": "Voto distrital registrado exitosamente"
-            }
-        except HTTPException:
-            raise
-        except Exception as e:
-            conn.rollback()
-            raise HTTPException(status_code=500, detail=str(e))
-        finally:
-            cursor.close()
-            conn.close()
-    except ConnectionError:
-        # Modo simulado
-        storage = get_simulated_storage()
-        from simulated_storage import VOTANTES_FILE, CANDIDATOS_DISTRITALES_FILE
-        
-        votante = storage.get_votante(voto.id_votantes)
-        if not votante:
-            storage._votantes[str(voto.id_votantes)] = {
-                'id_votantes': voto.id_votantes,
-                'dni': f'DNI{voto.id_votantes}',
-                'fecha_voto': None
-            }
-            storage._save_json(VOTANTES_FILE, storage._votantes)
-        
-        votos_presidenciales = storage.count_votos_presidenciales(voto.id_votantes)
-        votos_regionales = storage.count_votos_regionales(voto.id_votantes)
-        votos_distritales = storage.count_votos_distritales(voto.id_votantes)
-        
-        if votos_presidenciales >= 1 and votos_regionales >= 1 and votos_distritales >= 1:
-            raise HTTPException(
-                status_code=400,
-                detail="El votante ya ha ejercido todos sus votos (presidencial, regional y distrital)"
-            )
-        
-        if votos_distritales >= 1:
-            raise HTTPException(
-                status_code=400,
-                detail="El votante ya ha ejercido su voto distrital"
-            )
-        
-        candidato = storage.get_candidato_distrital(voto.id_candidato_distrital)
-        if not candidato:
-            candidato = {
-                'nombres': f'Candidato {voto.id_candidato_distrital}',
-                'apellidos': 'Distrital'
-            }
-            storage._candidatos_distritales[str(voto.id_candidato_distrital)] = {
-                'id_candidato': voto.id_candidato_distrital,
-                'nombres': candidato['nombres'],
-                'apellidos': candidato['apellidos'],
-                'cantidad_votos': 0
-            }
-            storage._save_json(CANDIDATOS_DISTRITALES_FILE, storage._candidatos_distritales)
-        else:
-            candidato = {
-                'nombres': candidato.get('nombres', f'Candidato {voto.id_candidato_distrital}'),
-                'apellidos': candidato.get('apellidos', 'Distrital')
-            }
-        
-        storage.add_voto_distrital(
-            voto.id_votantes,
-            voto.id_candidato_distrital,
-            candidato['nombres'],
-            candidato['apellidos']
-        )
-        storage.update_candidato_distrital_votos(voto.id_candidato_distrital, 1)
-        
-        return {
-            "message": "Voto distrital registrado exitosamente (modo simulado)"
-        }
+    modo = _emitir_votos(voto.id_votantes, {"distrital": voto.id_candidato_distrital})
+    return {
+        "message": f"Voto distrital registrado exitosamente{_sufijo_modo(modo)}"
+    }
+
+@app.post("/api/votos/ballot")
+@run_in_db_executor
+def create_boleta(boleta: BoletaCreate):
+    """Registra los votos presidencial, regional y distrital de un votante en una sola transacción"""
+    modo = _emitir_votos(boleta.id_votantes, {
+        "presidencial": boleta.id_candidato,
+        "regional": boleta.id_candidato_regional,
+        "distrital": boleta.id_candidato_distrital
+    })
+    return {
+        "message": f"Votos presidencial, regional y distrital registrados exitosamente{_sufijo_modo(modo)}"
+    }
 
 @app.post("/api/votos/nulo")
-async def create_voto_nulo(voto: VotoNuloCreate):
+@run_in_db_executor
+def create_voto_nulo(voto: VotoNuloCreate):
     """Registra un voto nulo"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
     try:
-        cursor.execute(
-            "INSERT INTO VOTO_NULO (ID_VOTANTES, DNI) VALUES (?, ?)",
-            (voto.id_votantes, voto.dni)
-        )
-        
-        # Actualizar votante
-        cursor.execute(
-            "UPDATE VOTANTES SET FECHA_VOTO = ? WHERE ID_VOTANTES = ?",
-            (datetime.now(), voto.id_votantes)
-        )
-        
-        conn.commit()
-        
-        return {
-            "message": "Voto nulo registrado exitosamente"
-        }
+        modo = _repositorio.emitir_voto_nulo(voto.id_votantes, voto.dni)
+    except HTTPException:
+        raise
     except Exception as e:
-        conn.rollback()
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        cursor.close()
-        conn.close()
+    _results_cache.invalidate("summary")
+    _voting_flow.add(datetime.now())
+    
+    return {
+        "message": f"Voto nulo registrado exitosamente{_sufijo_modo(modo)}"
+    }
 
 # ============================================================================
 # ENDPOINTS DE RESULTADOS
 # ============================================================================
 
+def _consultar_resultados(categoria: str):
+    """Candidatos de la categoría ordenados por votos"""
+    try:
+        return _repositorio.resultados(categoria)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+def _query_resultados_presidencial():
+    """Consulta los resultados presidenciales"""
+    candidatos = _consultar_resultados("presidencial")
+    total_votos = sum(candidato["cantidad_votos"] for candidato in candidatos)
+    
+    resultados = []
+    for candidato in candidatos:
+        votos = candidato["cantidad_votos"]
+        porcentaje = (votos / total_votos * 100) if total_votos > 0 else 0
+        resultados.append({
+            "id": candidato["id"],
+            "nombre": f"{candidato['nombres']} {candidato['apellidos']}",
+            "votos": votos,
+            "porcentaje": round(porcentaje, 2)
+        })
+    
+    return {
+        "total_votos": total_votos,
+        "candidatos": resultados
+    }
+
 @app.get("/api/resultados/presidencial")
 async def get_resultados_presidencial():
     """Obtiene los resultados presidenciales"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    try:
-        cursor.execute(
-            """SELECT ID_CANDIDATO_PRESIDENCIAL, NOMBRES, APELLIDOS, CANTIDAD_VOTOS
-               FROM CANDIDATO_PRESIDENCIAL
-               ORDER BY CANTIDAD_VOTOS DESC"""
-        )
-        rows = cursor.fetchall()
-        
-        total_votos = sum(row[3] or 0 for row in rows)
-        
-        resultados = []
-        for row in rows:
-            votos = row[3] or 0
-            porcentaje = (votos / total_votos * 100) if total_votos > 0 else 0
-            resultados.append({
-                "id": row[0],
-                "nombre": f"{row[1]} {row[2]}",
-                "votos": votos,
-                "porcentaje": round(porcentaje, 2)
-            })
-        
-        return {
-            "total_votos": total_votos,
-            "candidatos": resultados
+    return await _load_cached_results("presidencial", _query_resultados_presidencial)
+
+def _query_resultados_regional():
+    """Consulta los resultados regionales"""
+    return [
+        {
+            "id": candidato["id"],
+            "nombre": f"{candidato['nombres']} {candidato['apellidos']}",
+            "votos": candidato["cantidad_votos"]
         }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        cursor.close()
-        conn.close()
+        for candidato in _consultar_resultados("regional")
+    ]
 
 @app.get("/api/resultados/regional")
 async def get_resultados_regional():
     """Obtiene los resultados regionales"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    try:
-        cursor.execute(
-            """SELECT ID_CANDIDATO_REGIONAL, NOMBRES, APELLIDOS, CANTIDAD_VOTOS
-               FROM CANDIDATO_REGIONAL
-               ORDER BY CANTIDAD_VOTOS DESC"""
-        )
-        rows = cursor.fetchall()
-        
-        resultados = []
-        for row in rows:
-            resultados.append({
-                "id": row[0],
-                "nombre": f"{row[1]} {row[2]}",
-                "votos": row[3] or 0
-            })
-        
-        return resultados
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        cursor.close()
-        conn.close()
+    return await _load_cached_results("regional", _query_resultados_regional)
+
+def _query_resultados_distrital():
+    """Consulta los resultados distritales"""
+    return [
+        {
+            "id": candidato["id"],
+            "nombre": f"{candidato['nombres']} {candidato['apellidos']}",
+            "votos": candidato["cantidad_votos"]
+        }
+        for candidato in _consultar_resultados("distrital")
+    ]
 
 @app.get("/api/resultados/distrital")
 async def get_resultados_distrital():
     """Obtiene los resultados distritales"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
+    return await _load_cached_results("distrital", _query_resultados_distrital)
+
+async def _resultados_por_area(categoria: str, area: Optional[str], top: Optional[int], loader):
+    """Votos por área desde los conteos en memoria, con los nombres de la caché de resultados"""
+    if top is not None and top < 1:
+        raise HTTPException(status_code=400, detail="top debe ser mayor que 0")
+    if not _area_results.loaded:
+        # No se pudo reconstruir al arrancar: se intenta ahora
+        try:
+            await _db_executor.run(lambda: _area_results.rebuild(_cargar_votos_por_area()))
+        except ExecutorSaturatedError as e:
+            raise HTTPException(status_code=503, detail=str(e))
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+    nombres = {candidato["id"]: candidato["nombre"] for candidato in await _load_cached_results(categoria, loader)}
+    campo = AREAS[categoria]
+    return {
+        "categoria": categoria,
+        "areas": [
+            {
+                campo: fila["area"] or None,
+                "total_votos": fila["total_votos"],
+                "candidatos": [
+                    {
+                        "id": id_candidato,
+                        "nombre": nombres.get(id_candidato, f"Candidato {id_candidato}"),
+                        "votos": votos,
+                        "porcentaje": round(votos * 100 / fila["total_votos"], 2) if fila["total_votos"] else 0
+                    }
+                    for id_candidato, votos in fila["candidatos"]
+                ]
+            }
+            for fila in _area_results.top(categoria, area, top)
+        ]
+    }
+
+@app.get("/api/resultados/regional/por-region")
+async def get_resultados_regional_por_region(region: Optional[str] = None, top: Optional[int] = None):
+    """Resultados regionales de cada región (o solo de `region`), con los `top` candidatos más votados"""
+    return await _resultados_por_area("regional", region, top, _query_resultados_regional)
+
+@app.get("/api/resultados/distrital/por-distrito")
+async def get_resultados_distrital_por_distrito(distrito: Optional[str] = None, top: Optional[int] = None):
+    """Resultados distritales de cada distrito (o solo de `distrito`), con los `top` candidatos más votados"""
+    return await _resultados_por_area("distrital", distrito, top, _query_resultados_distrital)
+
+@app.get("/api/resultados/stream")
+async def stream_resultados():
+    """Transmite los resultados en vivo (Server-Sent Events): snapshot inicial y deltas de votos"""
+    return StreamingResponse(
+        _results_broadcaster.stream(_load_results_snapshot),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+# ============================================================================
+# EXPORTACIÓN
+# ============================================================================
+
+async def _transmitir(trozos, lotes):
+    """Entrega los trozos de una exportación; cada uno se produce en el ejecutor de BD"""
     try:
-        cursor.execute(
-            """SELECT ID_CANDIDATO_DISTRITAL, NOMBRES, APELLIDOS, CANTIDAD_VOTOS
-               FROM CANDIDATO_DISTRITAL
-               ORDER BY CANTIDAD_VOTOS DESC"""
-        )
-        rows = cursor.fetchall()
-        
-        resultados = []
-        for row in rows:
-            resultados.append({
-                "id": row[0],
-                "nombre": f"{row[1]} {row[2]}",
-                "votos": row[3] or 0
-            })
-        
-        return resultados
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        while True:
+            # La respuesta ya empezó: con el ejecutor saturado se espera turno en lugar de cortarla
+            trozo = await _en_ejecutor_con_espera(next, trozos, None)
+            if trozo is None:
+                return
+            yield trozo
     finally:
-        cursor.close()
-        conn.close()
+        # Cliente desconectado a la mitad: la conexión vuelve al pool
+        lotes.close()
+
+async def _exportar(tabla: str, formato: str, gzip: bool, lote: int):
+    formato = formato.lower()
+    if formato not in FORMATOS:
+        raise HTTPException(status_code=400, detail=f"Formato inválido (opciones: {', '.join(FORMATOS)})")
+    try:
+        lotes = await _db_executor.run(_repositorio.exportar, tabla, max(1, min(lote, 50000)))
+    except (ConnectionError, ExecutorSaturatedError) as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    trozos = serializar(lotes, EXPORTACIONES[tabla]["columnas"], formato)
+    nombre = f"{tabla}.{formato}"
+    media_type = TIPOS_CONTENIDO[formato]
+    if gzip:
+        trozos = comprimir_gzip(trozos)
+        nombre += ".gz"
+        media_type = "application/gzip"
+    return StreamingResponse(
+        _transmitir(trozos, lotes),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{nombre}"'}
+    )
+
+@app.get("/api/export/votantes")
+async def export_votantes(formato: str = "csv", gzip: bool = False, lote: int = 5000):
+    """Descarga VOTANTES completa en CSV o NDJSON (gzip=true la comprime mientras se transmite)"""
+    return await _exportar("votantes", formato, gzip, lote)
+
+@app.get("/api/export/votos/{categoria}")
+async def export_votos(categoria: str, formato: str = "csv", gzip: bool = False, lote: int = 5000):
+    """Descarga los votos de una categoría (presidencial, regional, distrital o nulo)"""
+    if categoria not in EXPORTACIONES or categoria == "votantes":
+        raise HTTPException(status_code=404, detail="Categoría no encontrada")
+    return await _exportar(categoria, formato, gzip, lote)
 
 # ============================================================================
 # ENDPOINTS DE RESULTADOS (para el panel administrativo)
 # ============================================================================
 
 @app.get("/api/results/status")
-async def get_results_status():
+@run_in_db_executor
+def get_results_status():
     """Obtiene el estado de los datos (NULL/N/A)"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
     try:
-        # Contar votos con NULL
-        cursor.execute(
-            """SELECT COUNT(*) FROM VOTANTES 
-               WHERE FECHA_VOTO IS NULL"""
-        )
-        null_count = cursor.fetchone()[0] or 0
-        
-        # Contar total de votos
-        cursor.execute("SELECT COUNT(*) FROM VOTANTES WHERE FECHA_VOTO IS NOT NULL")
-        total_votes = cursor.fetchone()[0] or 0
-        
-        return {
-            "hasNullData": null_count > 0,
-            "nullCount": null_count,
-            "naCount": 0,
-            "totalVotes": total_votes,
-            "lastUpdated": datetime.now().isoformat()
-        }
+        votantes = _repositorio.contar_votantes()
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        cursor.close()
-        conn.close()
+    
+    # Votantes sin FECHA_VOTO y votantes que ya votaron
+    null_count = votantes["total"] - votantes["votaron"]
+    total_votes = votantes["votaron"]
+    
+    return {
+        "hasNullData": null_count > 0,
+        "nullCount": null_count,
+        "naCount": 0,
+        "totalVotes": total_votes,
+        "lastUpdated": datetime.now().isoformat()
+    }
 
-@app.get("/api/results/summary")
-async def get_results_summary():
-    """Obtiene el resumen de resultados electorales"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
+def _query_results_summary():
+    """Consulta el resumen de resultados"""
+    rows = _consultar_resultados("presidencial")
+    
+    total_votes = sum(row["cantidad_votos"] for row in rows)
+    
+    candidates = []
+    for row in rows:
+        votes = row["cantidad_votos"]
+        percentage = (votes / total_votes * 100) if total_votes > 0 else 0
+        candidates.append({
+            "id": row["id"],
+            "name": f"{row['nombres']} {row['apellidos']}",
+            "votes": votes,
+            "percentage": round(percentage, 2)
+        })
     
+    # Calcular tasa de participación (simplificado)
     try:
-        cursor.execute(
-            """SELECT ID_CANDIDATO_PRESIDENCIAL, NOMBRES, APELLIDOS, CANTIDAD_VOTOS
-               FROM CANDIDATO_PRESIDENCIAL
-               ORDER BY CANTIDAD_VOTOS DESC"""
-        )
-        rows = cursor.fetchall()
-        
-        total_votes = sum(row[3] or 0 for row in rows)
-        
-        candidates = []
-        for row in rows:
-            votes = row[3] or 0
-            percentage = (votes / total_votes * 100) if total_votes > 0 else 0
-            candidates.append({
-                "id": row[0],
-                "name": f"{row[1]} {row[2]}",
-                "votes": votes,
-                "percentage": round(percentage, 2)
-            })
-        
-        # Calcular tasa de participación (simplificado)
-        cursor.execute("SELECT COUNT(*) FROM VOTANTES")
-        total_votantes = cursor.fetchone()[0] or 1
-        participation_rate = round((total_votes / total_votantes * 100), 2) if total_votantes > 0 else 0
-        
-        return {
-            "totalVotes": total_votes,
-            "candidates": candidates,
-            "participationRate": participation_rate
-        }
+        total_votantes = _repositorio.contar_votantes()["total"] or 1
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        cursor.close()
-        conn.close()
+    participation_rate = round((total_votes / total_votantes * 100), 2) if total_votantes > 0 else 0
+    
+    return {
+        "totalVotes": total_votes,
+        "candidates": candidates,
+        "participationRate": participation_rate
+    }
+
+@app.get("/api/results/summary")
+async def get_results_summary():
+    """Obtiene el resumen de resultados electorales"""
+    return await _load_cached_results("summary", _query_results_summary)
 
 # ============================================================================
 # ENDPOINTS DE PROCESAMIENTO (simplificados)
 # ============================================================================
 
+# Perfil de calidad del padrón: cada análisis procesa solo los votantes nuevos
+_data_quality = DataQualityProfiler()
+
 @app.post("/api/processing/analyze-quality")
-async def analyze_quality():
-    """Analiza la calidad de los datos"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
+@run_in_db_executor
+def analyze_quality():
+    """Analiza la calidad de los datos (nulos y DNI duplicados), procesando solo los votantes nuevos"""
+    # El perfil es de un motor: con respaldo se analiza el que atiende ahora
+    destino = _repositorio.activo() if isinstance(_repositorio, RepositorioConRespaldo) else _repositorio
     try:
-        # Contar registros totales
-        cursor.execute("SELECT COUNT(*) FROM VOTANTES")
-        total_records = cursor.fetchone()[0] or 0
-        
-        # Contar NULLs
-        cursor.execute(
-            """SELECT 
-                SUM(CASE WHEN DNI IS NULL THEN 1 ELSE 0 END) as dni_nulls,
-                SUM(CASE WHEN NOMBRES IS NULL THEN 1 ELSE 0 END) as nombres_nulls,
-                SUM(CASE WHEN FECHA_NACIMIENTO IS NULL THEN 1 ELSE 0 END) as fecha_nulls
-               FROM VOTANTES"""
-        )
-        nulls = cursor.fetchone()
-        
-        # Contar duplicados (mismo DNI)
-        cursor.execute(
-            """SELECT COUNT(*) - COUNT(DISTINCT DNI) as duplicates
-               FROM VOTANTES WHERE DNI IS NOT NULL"""
-        )
-        duplicates = cursor.fetchone()[0] or 0
-        
-        return {
-            "totalRecords": total_records,
-            "nullCounts": {
-                "dni": nulls[0] or 0,
-                "nombres": nulls[1] or 0,
-                "fecha_nacimiento": nulls[2] or 0
-            },
-            "duplicateCount": duplicates,
-            "dataTypes": {
-                "dni": "varchar",
-                "nombres": "varchar",
-                "fecha_nacimiento": "date"
-            }
-        }
+        perfil = _data_quality.refresh(destino)
+    except ConnectionError as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        cursor.close()
-        conn.close()
+    return {
+        **perfil,
+        "dataTypes": {
+            "dni": "varchar",
+            "nombres": "varchar",
+            "fecha_nacimiento": "date"
+        }
+    }
 
 @app.get("/api/processing/status")
-async def get_processing_status():
+@run_in_db_executor
+def get_processing_status():
     """Obtiene el estado actual del procesamiento"""
     conn = get_db_connection()
     cursor = conn.cursor()
@@ -1444,102 +1185,104 @@ async def get_processing_status():
 # ENDPOINTS DE ANÁLISIS
 # ============================================================================
 
-@app.get("/api/analysis/stats")
-async def get_analysis_stats():
-    """Obtiene estadísticas generales de análisis"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
+# Minutos completos sobre los que se promedia el ritmo de votación de /api/analysis/stats
+VOTE_RATE_WINDOW = max(1, int(os.getenv("VOTE_RATE_WINDOW", "5")))
+
+async def _cargar_flujo_votacion():
+    """Si el flujo de votación no se pudo cargar al arrancar, se intenta ahora"""
+    if _voting_flow.loaded:
+        return
     try:
-        # Votantes activos (que han votado hoy)
-        today = datetime.now().date()
-        cursor.execute(
-            """SELECT COUNT(DISTINCT ID_VOTANTES) 
-               FROM VOTANTES 
-               WHERE CAST(FECHA_VOTO AS DATE) = ?""",
-            (today,)
-        )
-        active_voters = cursor.fetchone()[0] or 0
-        
-        # Total de votos
-        cursor.execute("SELECT COUNT(*) FROM VOTANTES WHERE FECHA_VOTO IS NOT NULL")
-        total_votes = cursor.fetchone()[0] or 0
-        
-        # Tasa de participación
-        cursor.execute("SELECT COUNT(*) FROM VOTANTES")
-        total_votantes = cursor.fetchone()[0] or 1
-        participation_rate = round((total_votes / total_votantes * 100), 2) if total_votantes > 0 else 0
-        
-        # Hora pico (simplificado)
-        peak_activity_time = "14:30"
-        
-        return {
-            "activeVoters": active_voters,
-            "participationRate": participation_rate,
-            "peakActivityTime": peak_activity_time,
-            "totalVotes": total_votes
-        }
+        await _db_executor.run(_voting_flow.load)
+    except ExecutorSaturatedError as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        cursor.close()
-        conn.close()
 
-@app.get("/api/analysis/voting-flow")
-async def get_voting_flow():
-    """Obtiene el flujo de votación por hora"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
+def _query_contar_votantes():
+    """Votantes registrados y cuántos ya votaron"""
     try:
-        # Obtener votos del día agrupados por hora
-        today = datetime.now().date()
-        cursor.execute(
-            """SELECT DATEPART(HOUR, FECHA_VOTO) as hora, COUNT(*) as votos
-               FROM VOTANTES
-               WHERE CAST(FECHA_VOTO AS DATE) = ?
-               GROUP BY DATEPART(HOUR, FECHA_VOTO)
-               ORDER BY hora""",
-            (today,)
-        )
-        rows = cursor.fetchall()
-        
-        flow_data = []
-        for row in rows:
-            hour = f"{int(row[0]):02d}:00"
-            flow_data.append({
-                "hour": hour,
-                "votes": row[1]
-            })
-        
-        # Si no hay datos, retornar datos de ejemplo
-        if not flow_data:
-            flow_data = [
-                {"hour": "08:00", "votes": 0},
-                {"hour": "09:00", "votes": 0},
-                {"hour": "10:00", "votes": 0},
-                {"hour": "11:00", "votes": 0},
-                {"hour": "12:00", "votes": 0},
-                {"hour": "13:00", "votes": 0},
-                {"hour": "14:00", "votes": 0},
-                {"hour": "15:00", "votes": 0},
-                {"hour": "16:00", "votes": 0},
-                {"hour": "17:00", "votes": 0}
-            ]
-        
-        return flow_data
+        return _repositorio.contar_votantes()
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        cursor.close()
-        conn.close()
+
+@app.get("/api/analysis/stats")
+async def get_analysis_stats():
+    """
+    Obtiene estadísticas generales de análisis desde el flujo de votación en memoria:
+    votantes de hoy, minuto pico del día y ritmo de los últimos VOTE_RATE_WINDOW minutos
+    """
+    await _cargar_flujo_votacion()
+    actividad = _voting_flow.activity(datetime.now(), VOTE_RATE_WINDOW)
+    # Solo cambia al registrar votantes: se lee de la caché de resultados
+    total_votantes = (await _load_cached_results("votantes", _query_contar_votantes))["total"]
+    total_votes = actividad["total"]
+    participation_rate = round((total_votes / total_votantes * 100), 2) if total_votantes > 0 else 0
+    pico = actividad["peak"]
+    
+    return {
+        "activeVoters": actividad["today"],
+        "participationRate": participation_rate,
+        "peakActivityTime": pico[0].strftime("%H:%M") if pico else None,
+        "peakActivityVotes": pico[1] if pico else 0,
+        "totalVotes": total_votes,
+        "votesPerMinute": round(actividad["window"] / VOTE_RATE_WINDOW, 2),
+        "votesCurrentMinute": actividad["currentMinute"],
+        "rateWindowMinutes": VOTE_RATE_WINDOW
+    }
+
+# Intervalos y días que puede cubrir una consulta del flujo de votación
+VOTING_FLOW_MAX_BUCKETS = 10000
+VOTING_FLOW_MAX_DAYS = 366
+
+def _hora_local(fecha: Optional[datetime]) -> Optional[datetime]:
+    """FECHA_VOTO se guarda en hora local sin zona: las fechas con zona se convierten a ella"""
+    if fecha is not None and fecha.tzinfo is not None:
+        return fecha.astimezone().replace(tzinfo=None)
+    return fecha
+
+@app.get("/api/analysis/voting-flow")
+async def get_voting_flow(desde: Optional[datetime] = None, hasta: Optional[datetime] = None, ancho: int = 60):
+    """
+    Obtiene el flujo de votación: votantes por intervalo de `ancho` minutos entre `desde` y `hasta`
+    (por defecto, hoy por hora hasta ahora), incluidos los intervalos sin votos
+    """
+    ahora = datetime.now()
+    desde, hasta = _hora_local(desde), _hora_local(hasta)
+    desde = desde or datetime.combine(ahora.date(), datetime.min.time())
+    hasta = hasta or ahora
+    if ancho < 1 or ancho > VOTING_FLOW_MAX_DAYS * 1440:
+        raise HTTPException(status_code=400, detail=f"ancho debe estar entre 1 y {VOTING_FLOW_MAX_DAYS * 1440} minutos")
+    if hasta <= desde:
+        raise HTTPException(status_code=400, detail="hasta debe ser posterior a desde")
+    if hasta - desde > timedelta(days=VOTING_FLOW_MAX_DAYS):
+        raise HTTPException(status_code=400, detail=f"El rango pedido supera {VOTING_FLOW_MAX_DAYS} días")
+    if (hasta - desde) / timedelta(minutes=ancho) > VOTING_FLOW_MAX_BUCKETS:
+        raise HTTPException(
+            status_code=400, detail=f"El rango pedido supera {VOTING_FLOW_MAX_BUCKETS} intervalos; aumente el ancho"
+        )
+    await _cargar_flujo_votacion()
+    try:
+        # Recorre el rango fuera del event loop
+        intervalos = await _db_executor.run(_voting_flow.histogram, desde, hasta, timedelta(minutes=ancho))
+    except ExecutorSaturatedError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except OverflowError:
+        raise HTTPException(status_code=400, detail="Rango de fechas fuera de lo admitido")
+    return [
+        {"hour": inicio.strftime("%H:%M"), "start": inicio.isoformat(), "votes": votos}
+        for inicio, votos in intervalos
+    ]
 
 # ============================================================================
 # ENDPOINTS DE ENTRENAMIENTO ML (simplificados)
 # ============================================================================
 
 @app.get("/api/training/stats")
-async def get_training_stats():
+@run_in_db_executor
+def get_training_stats():
     """Obtiene estadísticas de votos válidos para entrenamiento"""
     conn = get_db_connection()
     cursor = conn.cursor()
@@ -1573,6 +1316,139 @@ async def get_training_stats():
         cursor.close()
         conn.close()
 
+# ============================================================================
+# ENDPOINTS DE SISTEMA
+# ============================================================================
+
+@app.get("/api/system/db-pool")
+async def get_db_pool_metrics():
+    """Obtiene las métricas del pool de conexiones a SQL Server"""
+    return _db_pool.metrics()
+
+@app.get("/api/system/db-breaker")
+async def get_db_breaker_metrics():
+    """Obtiene el estado del circuit breaker de SQL Server"""
+    return _db_breaker.metrics()
+
+@app.get("/api/system/db-executor")
+async def get_db_executor_metrics():
+    """Obtiene la profundidad de cola y los tiempos de espera del ejecutor de BD"""
+    return _db_executor.metrics()
+
+@app.get("/api/system/ballot-state")
+async def get_ballot_state_metrics():
+    """Obtiene el tamaño y la tasa de aciertos del índice de estado de votación"""
+    return _ballot_state.metrics()
+
+@app.get("/api/system/results-cache")
+async def get_results_cache_metrics():
+    """Obtiene los aciertos y recargas de la caché de resultados"""
+    return _results_cache.metrics()
+
+@app.get("/api/system/area-results")
+async def get_area_results_metrics():
+    """Obtiene las áreas y reconstrucciones de los resultados por región y distrito"""
+    return {"refreshSeconds": AREA_RESULTS_REFRESH, **_area_results.metrics()}
+
+@app.get("/api/system/voting-flow")
+async def get_voting_flow_metrics():
+    """Obtiene los intervalos y sincronizaciones del flujo de votación"""
+    return {"syncSeconds": VOTING_FLOW_SYNC_INTERVAL, **_voting_flow.metrics()}
+
+@app.get("/api/system/data-quality")
+async def get_data_quality_metrics():
+    """Obtiene la marca procesada y los huecos pendientes del perfil de calidad"""
+    return _data_quality.metrics()
+
+@app.get("/api/system/candidate-catalog")
+async def get_candidate_catalog_metrics():
+    """Obtiene la versión del catálogo de candidatos y sus aciertos"""
+    return _candidate_catalog.metrics()
+
+@app.get("/api/system/results-stream")
+async def get_results_stream_metrics():
+    """Obtiene los suscriptores y eventos del stream de resultados"""
+    return _results_broadcaster.metrics()
+
+@app.get("/api/system/vote-counters")
+async def get_vote_counters_metrics():
+    """Obtiene el estado del agregador de contadores de votos"""
+    return {"mode": VOTE_COUNTERS_MODE, **_vote_counters.metrics()}
+
+@app.post("/api/system/vote-counters/reconcile")
+@run_in_db_executor
+def reconcile_vote_counters():
+    """Recalcula CANTIDAD_VOTOS de todos los candidatos a partir de VOTO_*"""
+    try:
+        _vote_counters.reconcile()
+    except ConnectionError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    _results_cache.invalidate("presidencial", "regional", "distrital", "summary")
+    return {"message": "Contadores de votos reconciliados"}
+
+@app.get("/api/system/simulated-storage")
+@run_in_db_executor
+def get_simulated_storage_metrics():
+    """Obtiene el tamaño del almacenamiento simulado y el estado de su escritor (group commit)"""
+    return get_simulated_storage().metrics()
+
+@app.post("/api/system/simulated-storage/snapshot")
+@run_in_db_executor
+def snapshot_simulated_storage():
+    """Guarda un snapshot del almacenamiento simulado y compacta sus diarios (con SQLite, checkpoint del WAL)"""
+    try:
+        return get_simulated_storage().snapshot()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+_replay_lock = threading.Lock()
+REPLAY_ESTADO_PATH = STORAGE_DIR / "replay_estado.json"
+
+@app.post("/api/system/simulated-storage/replay")
+@run_in_db_executor
+def replay_simulated_storage():
+    """Reenvía a SQL Server los votos registrados en modo simulado (retoma desde el último lote confirmado)"""
+    if not _replay_lock.acquire(blocking=False):
+        raise HTTPException(status_code=409, detail="Ya hay un reenvío en curso")
+    try:
+        resumen = ReplaySimulado(
+            get_db_connection, get_simulated_storage(), REPLAY_ESTADO_PATH,
+            contadores=_vote_counters if _write_behind_counters else None
+        ).run()
+    except ConnectionError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        _replay_lock.release()
+    # Los votos reenviados no pasaron por la caché de resultados ni por las estructuras en memoria.
+    # La caché se invalida primero: una reconstrucción que falla no la deja sirviendo datos viejos
+    _results_cache.invalidate("presidencial", "regional", "distrital", "summary", "votantes")
+    fallidas = {}
+    for nombre, reconstruir in (
+        ("estadoVotacion", _cargar_estado_votacion),
+        ("resultadosPorArea", lambda: _area_results.rebuild(_cargar_votos_por_area())),
+        ("flujoVotacion", _voting_flow.rebuild),
+    ):
+        try:
+            reconstruir()
+        except Exception as e:
+            print(f"Reenvío confirmado, pero no se pudo reconstruir {nombre}: {e}")
+            fallidas[nombre] = str(e)
+    if fallidas:
+        resumen["reconstruccionesFallidas"] = fallidas
+    return resumen
+
+@app.get("/api/system/simulated-storage/replay")
+@run_in_db_executor
+def get_replay_status():
+    """Avance del reenvío: posición por colección y resumen de la última ejecución"""
+    return {"running": _replay_lock.locked(), **leer_estado(REPLAY_ESTADO_PATH)}
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
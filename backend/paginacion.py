@@ -0,0 +1,35 @@
+"""
+Paginación por clave (keyset) de GET /api/votantes
+
+En lugar de OFFSET, cada página pide los votantes con ID_VOTANTES menor que el último
+de la página anterior: la consulta entra por el índice en esa posición y cuesta lo mismo
+en la página 1 que en la 1000. El cliente recibe la posición como un token opaco que
+además fija los filtros con los que se generó.
+"""
+import base64
+import json
+from typing import Optional
+
+
+class CursorInvalido(ValueError):
+    """El token no es de esta API o se generó con otros filtros"""
+
+
+def codificar_cursor(ultimo_id: int, region: Optional[str], distrito: Optional[str]) -> str:
+    """Token de continuación tras el votante `ultimo_id`"""
+    datos = json.dumps({"id": ultimo_id, "r": region, "d": distrito}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(datos.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decodificar_cursor(token: str, region: Optional[str], distrito: Optional[str]) -> int:
+    """ID_VOTANTES desde el que sigue la página; lanza CursorInvalido si el token no corresponde"""
+    try:
+        datos = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+        ultimo_id = datos["id"]
+    except (ValueError, TypeError, KeyError):
+        raise CursorInvalido("Cursor de paginación inválido")
+    if not isinstance(ultimo_id, int) or isinstance(ultimo_id, bool):
+        raise CursorInvalido("Cursor de paginación inválido")
+    if datos.get("r") != region or datos.get("d") != distrito:
+        raise CursorInvalido("El cursor se generó con otros filtros de región o distrito")
+    return ultimo_id
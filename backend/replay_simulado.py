@@ -0,0 +1,386 @@
+"""
+Reenvío a SQL Server de lo registrado en modo simulado durante una caída
+
+Lee el almacenamiento simulado (snapshot + diarios JSONL, o la base SQLite según
+SIMULATED_ENGINE) por páginas del tamaño del lote, sin copiarlo entero en memoria,
+e inserta en VOTANTES, VOTO_* y VOTO_NULO con fast_executemany. No duplica lo que ya está en la base: un votante que ya tiene
+voto en una categoría no recibe otro. Al final recalcula CANDIDATO_*.CANTIDAD_VOTOS
+con un UPDATE por tabla.
+
+El avance se guarda en `data_simulated/replay_estado.json` después de cada lote:
+si el proceso se corta, la siguiente ejecución sigue desde ahí, y una ejecución
+posterior a otra caída solo reenvía lo nuevo.
+
+Uso:
+    python replay_simulado.py [--lote N] [--reiniciar]
+"""
+import json
+import os
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+from votos_sql import CATEGORIAS
+from vote_counters import recalcular_contadores
+
+# Valores para las columnas que el votante creado al votar en modo simulado no tiene
+# (los mismos que devuelve GET /api/votantes/{dni} en modo simulado)
+_VOTANTE_POR_DEFECTO = {
+    "nombres": "Votante",
+    "apellidos": "Simulado",
+    "fecha_nacimiento": "2000-01-01",
+    "region": "Lima",
+    "distrito": "Lima",
+}
+
+# Colección del almacenamiento simulado -> categoría de voto
+_COLECCIONES_VOTOS = {
+    "votos_presidenciales": "presidencial",
+    "votos_regionales": "regional",
+    "votos_distritales": "distrital",
+}
+
+# Parámetros por consulta IN (SQL Server admite hasta 2100)
+_MAX_PARAMETROS = 1000
+
+
+def _fecha(valor: Optional[str]) -> Optional[datetime]:
+    if not valor:
+        return None
+    try:
+        return datetime.fromisoformat(valor)
+    except ValueError:
+        return None
+
+
+def leer_estado(path: Path) -> Dict[str, Any]:
+    """Punto de control del reenvío: posición y cursor por colección y resumen de la última ejecución"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {"posiciones": {}, "cursores": {}}
+
+
+def _progreso_por_consola(fase: str, procesados: int, total: int, filas_por_segundo: float):
+    print(f"  {fase:<22} {procesados:>9}/{total:<9} {filas_por_segundo:10.0f} filas/s")
+
+
+class ReplaySimulado:
+    """
+    Un reenvío completo. `conectar` devuelve una conexión pyodbc (o del pool) a SQL Server
+    y `storage` es el almacenamiento simulado (SimulatedStorage o SQLiteStorage).
+
+    Con `contadores` (el VoteCounterAggregator del servidor, en modo write_behind) el recálculo
+    de CANTIDAD_VOTOS lo hace su reconcile(), que frena los votos del proceso y descarta sus
+    incrementos pendientes; recalcular por fuera los sumaría dos veces en el próximo volcado.
+    """
+
+    def __init__(
+        self,
+        conectar: Callable[[], Any],
+        storage,
+        estado_path: Path,
+        lote: int = 5000,
+        progreso: Callable[[str, int, int, float], None] = _progreso_por_consola,
+        contadores=None,
+    ):
+        self._conectar = conectar
+        self._contadores = contadores
+        self._storage = storage
+        self.estado_path = estado_path
+        self.lote = max(1, lote)
+        self._progreso = progreso
+        self.estado = leer_estado(estado_path)
+
+    # ========== PUNTO DE CONTROL ==========
+    def _guardar_estado(self):
+        tmp = self.estado_path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.estado, f, ensure_ascii=False, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.estado_path)
+
+    def reiniciar(self):
+        """Vuelve a recorrer todo desde el principio (lo ya insertado se detecta como duplicado)"""
+        self.estado = {"posiciones": {}, "cursores": {}}
+        self._guardar_estado()
+
+    # ========== EJECUCIÓN ==========
+    def run(self) -> Dict[str, Any]:
+        inicio = time.monotonic()
+        # Los votos se cuentan antes de recorrer los votantes: cada voto contado ya tiene su votante.
+        # Lo que se registre después queda para la próxima ejecución
+        with self._storage.lectura():
+            totales = {nombre: self._storage.count_votos(nombre) for nombre in (*_COLECCIONES_VOTOS, "votos_nulos")}
+            total_votantes = self._storage.count_votantes()
+
+        conn = self._conectar()
+        cursor = conn.cursor()
+        cursor.fast_executemany = True
+        resumen: Dict[str, Any] = {"insertados": {}, "duplicados": {}, "rechazados": {}}
+        try:
+            dni_a_id, ids_existentes = self._cargar_votantes_sql(cursor)
+            ids = self._mapear_votantes(conn, cursor, total_votantes, dni_a_id, ids_existentes, resumen)
+
+            for nombre, categoria in _COLECCIONES_VOTOS.items():
+                self._reenviar_votos(conn, cursor, nombre, categoria, totales[nombre], ids, resumen)
+            self._reenviar_nulos(conn, cursor, totales["votos_nulos"], ids, resumen)
+            self._actualizar_fechas_voto(conn, cursor, total_votantes, ids)
+
+            # Contadores en una pasada por tabla, con los votos recién insertados incluidos
+            t0 = time.monotonic()
+            if self._contadores is None:
+                recalcular_contadores(cursor)
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+            conn.close()
+        if self._contadores is not None:
+            try:
+                self._contadores.reconcile()
+            except Exception as e:
+                # Los votos ya están confirmados: los contadores se corrigen con otra reconciliación
+                print(f"Reenvío confirmado, pero no se pudieron reconciliar los contadores: {e}")
+                resumen["contadoresError"] = str(e)
+        resumen["contadoresMs"] = round((time.monotonic() - t0) * 1000, 3)
+
+        segundos = time.monotonic() - inicio
+        filas = sum(resumen["insertados"].values())
+        resumen["segundos"] = round(segundos, 3)
+        resumen["filasPorSegundo"] = round(filas / segundos, 1) if segundos > 0 else 0.0
+        self.estado["ultimaEjecucion"] = {"fecha": datetime.now().isoformat(), **resumen}
+        self._guardar_estado()
+        return resumen
+
+    def _cargar_votantes_sql(self, cursor) -> Tuple[Dict[str, int], Set[int]]:
+        dni_a_id: Dict[str, int] = {}
+        ids: Set[int] = set()
+        cursor.execute("SELECT ID_VOTANTES, DNI FROM VOTANTES")
+        while True:
+            filas = cursor.fetchmany(self.lote)
+            if not filas:
+                break
+            for id_votantes, dni in filas:
+                ids.add(id_votantes)
+                if dni is not None:
+                    dni_a_id.setdefault(dni.strip(), id_votantes)
+        return dni_a_id, ids
+
+    def _ids_existentes(self, cursor, sql: str) -> Set:
+        cursor.execute(sql)
+        existentes = set()
+        while True:
+            filas = cursor.fetchmany(self.lote)
+            if not filas:
+                return existentes
+            existentes.update(fila[0] for fila in filas)
+
+    def _paginas_votantes(self) -> Iterator[List[Dict]]:
+        """Votantes del almacenamiento simulado por ID, en páginas de `lote`"""
+        desde = 0
+        while True:
+            with self._storage.lectura():
+                pagina = self._storage.get_votantes_desde(desde, self.lote)
+            if pagina:
+                yield pagina
+            if len(pagina) < self.lote:
+                return
+            desde = pagina[-1]["id_votantes"]
+
+    def _mapear_votantes(self, conn, cursor, total: int, dni_a_id: Dict[str, int],
+                         ids_existentes: Set[int], resumen: Dict[str, Any]) -> Dict[int, int]:
+        """
+        ID simulado -> ID en SQL Server. Un votante simulado corresponde a uno existente si
+        coincide el DNI, o si su DNI es el de relleno (`DNI<id>`, creado al votar) y ese ID
+        ya existe. Los demás se insertan.
+        """
+        ids: Dict[int, int] = {}
+        insertados = procesados = 0
+        t0 = time.monotonic()
+        for pagina in self._paginas_votantes():
+            # DNI -> votantes simulados sin equivalente (se inserta una sola fila por DNI)
+            nuevos: Dict[str, List[Dict]] = {}
+            for votante in pagina:
+                id_simulado = votante["id_votantes"]
+                dni = str(votante.get("dni") or f"DNI{id_simulado}")
+                if dni in dni_a_id:
+                    ids[id_simulado] = dni_a_id[dni]
+                elif dni == f"DNI{id_simulado}" and id_simulado in ids_existentes:
+                    ids[id_simulado] = id_simulado
+                else:
+                    nuevos.setdefault(dni, []).append(votante)
+
+            if nuevos:
+                filas = []
+                for dni, (votante, *_) in nuevos.items():
+                    datos = {**_VOTANTE_POR_DEFECTO, **{k: v for k, v in votante.items() if v is not None}}
+                    filas.append((
+                        dni, datos["nombres"], datos["apellidos"],
+                        str(datos["fecha_nacimiento"]), datos["region"], datos["distrito"]
+                    ))
+                cursor.executemany(
+                    """INSERT INTO VOTANTES (DNI, NOMBRES, APELLIDOS, FECHA_NACIMIENTO, REGION, DISTRITO)
+                       VALUES (?, ?, ?, ?, ?, ?)""",
+                    filas
+                )
+                # executemany no devuelve las identidades: se leen por DNI
+                dnis = list(nuevos)
+                for i in range(0, len(dnis), _MAX_PARAMETROS):
+                    parte = dnis[i:i + _MAX_PARAMETROS]
+                    cursor.execute(
+                        f"SELECT ID_VOTANTES, DNI FROM VOTANTES WHERE DNI IN ({', '.join('?' for _ in parte)})",
+                        parte
+                    )
+                    for id_votantes, dni in cursor.fetchall():
+                        dni_a_id.setdefault(dni.strip(), id_votantes)
+                conn.commit()
+                for dni, simulados in nuevos.items():
+                    for votante in simulados:
+                        ids[votante["id_votantes"]] = dni_a_id[dni]
+                insertados += len(nuevos)
+            procesados += len(pagina)
+            self._progreso("votantes", procesados, max(total, procesados), procesados / max(time.monotonic() - t0, 1e-9))
+        resumen["insertados"]["votantes"] = insertados
+        resumen["duplicados"]["votantes"] = procesados - insertados
+        return ids
+
+    def _posicion(self, nombre: str, total: int) -> Tuple[int, int]:
+        """Registros ya recorridos de la colección y cursor del almacenamiento para seguir"""
+        posicion = self.estado["posiciones"].get(nombre, 0)
+        # Almacenamiento simulado borrado y vuelto a crear: se recorre de nuevo (sin duplicar)
+        if posicion > total:
+            return 0, 0
+        # Puntos de control anteriores al cursor: los votos no se borran, así que en ambos motores
+        # el cursor del registro n coincide con n (posición en JSON, ID_VOTO_* en SQLite)
+        return posicion, self.estado.setdefault("cursores", {}).get(nombre, posicion)
+
+    def _reenviar_en_lotes(self, conn, cursor, nombre: str, total: int, convertir, sql: str,
+                           resumen: Dict[str, Any]):
+        """
+        Recorre los primeros `total` registros de la colección desde el punto de control, una
+        página por lote; `convertir` devuelve la fila a insertar o un motivo de descarte
+        """
+        posicion, desde = self._posicion(nombre, total)
+        insertados = duplicados = rechazados = 0
+        t0 = time.monotonic()
+        while posicion < total:
+            with self._storage.lectura():
+                bloque, desde = self._storage.get_votos_desde(nombre, desde, min(self.lote, total - posicion))
+            if not bloque:
+                break
+            filas = []
+            for registro in bloque:
+                fila = convertir(registro)
+                if fila == "duplicado":
+                    duplicados += 1
+                elif fila is None:
+                    rechazados += 1
+                else:
+                    filas.append(fila)
+            if filas:
+                cursor.executemany(sql, filas)
+            conn.commit()
+            insertados += len(filas)
+            posicion += len(bloque)
+            self.estado["posiciones"][nombre] = posicion
+            self.estado["cursores"][nombre] = desde
+            self._guardar_estado()
+            self._progreso(nombre, posicion, total, len(filas) / max(time.monotonic() - t0, 1e-9))
+            t0 = time.monotonic()
+        resumen["insertados"][nombre] = insertados
+        resumen["duplicados"][nombre] = duplicados
+        resumen["rechazados"][nombre] = rechazados
+
+    def _reenviar_votos(self, conn, cursor, nombre: str, categoria: str, total: int,
+                        ids: Dict[int, int], resumen: Dict[str, Any]):
+        cfg = CATEGORIAS[categoria]
+        ya_votaron = self._ids_existentes(cursor, f"SELECT DISTINCT ID_VOTANTES FROM {cfg['tabla_voto']}")
+        candidatos = self._ids_existentes(cursor, f"SELECT {cfg['id_candidato']} FROM {cfg['tabla_candidato']}")
+        clave_candidato = "id_candidato" if categoria == "presidencial" else f"id_candidato_{categoria}"
+
+        def convertir(voto: Dict):
+            id_votantes = ids.get(voto["id_votantes"])
+            id_candidato = voto.get(clave_candidato)
+            # Votante o candidato que no existen en SQL Server
+            if id_votantes is None or id_candidato not in candidatos:
+                return None
+            if id_votantes in ya_votaron:
+                return "duplicado"
+            ya_votaron.add(id_votantes)
+            return (id_votantes, id_candidato, voto.get("nombre") or "", voto.get("apellido") or "")
+
+        self._reenviar_en_lotes(
+            conn, cursor, nombre, total, convertir,
+            f"""INSERT INTO {cfg['tabla_voto']} (ID_VOTANTES, {cfg['columna_candidato']}, NOMBRE, APELLIDO)
+                VALUES (?, ?, ?, ?)""",
+            resumen
+        )
+
+    def _reenviar_nulos(self, conn, cursor, total: int, ids: Dict[int, int], resumen: Dict[str, Any]):
+        ya_anulados = self._ids_existentes(cursor, "SELECT DISTINCT ID_VOTANTES FROM VOTO_NULO")
+
+        def convertir(voto: Dict):
+            id_votantes = ids.get(voto["id_votantes"])
+            if id_votantes is None:
+                return None
+            if id_votantes in ya_anulados:
+                return "duplicado"
+            ya_anulados.add(id_votantes)
+            return (id_votantes, voto.get("dni") or "")
+
+        self._reenviar_en_lotes(
+            conn, cursor, "votos_nulos", total, convertir,
+            "INSERT INTO VOTO_NULO (ID_VOTANTES, DNI) VALUES (?, ?)", resumen
+        )
+
+    def _actualizar_fechas_voto(self, conn, cursor, total: int, ids: Dict[int, int]):
+        """
+        FECHA_VOTO de los votantes que votaron en modo simulado (sin pisar una fecha ya registrada).
+        Se toma solo la del votante simulado, que se marcó con la misma regla que en SQL Server
+        (votos_sql.marca_fecha_voto): un voto regional o distrital suelto no la pone
+        """
+        procesados = 0
+        t0 = time.monotonic()
+        for pagina in self._paginas_votantes():
+            filas = []
+            for votante in pagina:
+                fecha = _fecha(votante.get("fecha_voto"))
+                if fecha and votante["id_votantes"] in ids:
+                    filas.append((fecha, ids[votante["id_votantes"]]))
+            if filas:
+                cursor.executemany(
+                    "UPDATE VOTANTES SET FECHA_VOTO = ? WHERE ID_VOTANTES = ? AND FECHA_VOTO IS NULL", filas
+                )
+                conn.commit()
+            procesados += len(pagina)
+            self._progreso("fecha_voto", procesados, max(total, procesados), procesados / max(time.monotonic() - t0, 1e-9))
+
+
+def main():
+    # Importar main carga config.env
+    from main import _try_db_connection
+    from simulated_storage import STORAGE_DIR, close_simulated_storage, get_simulated_storage
+
+    args = sys.argv[1:]
+    lote = int(args[args.index("--lote") + 1]) if "--lote" in args else 5000
+    replay = ReplaySimulado(
+        _try_db_connection, get_simulated_storage(), STORAGE_DIR / "replay_estado.json", lote=lote
+    )
+    if "--reiniciar" in args:
+        replay.reiniciar()
+    try:
+        resumen = replay.run()
+    finally:
+        close_simulated_storage()
+    print(json.dumps(resumen, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
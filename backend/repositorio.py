@@ -0,0 +1,830 @@
+"""
+Repositorio de datos electorales: una sola interfaz para votantes, candidatos, votos y resultados
+Los endpoints solo hablan con el repositorio; qué motor hay detrás se decide al arrancar:
+
+- RepositorioSQLServer: SQL Server por el pool de conexiones (lotes de votos_sql.py)
+- RepositorioLocal: almacenamiento simulado (diarios JSONL o SQLite, según SIMULATED_ENGINE)
+- RepositorioConRespaldo: SQL Server y, si no responde (ConnectionError), el local
+"""
+import random
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from area_results import AREAS, AreaResults
+from exportar_datos import EXPORTACIONES, CursorPorLotes
+from ballot_state import (
+    BallotStateIndex, VOTO_DISTRITAL, VOTO_PRESIDENCIAL, VOTO_REGIONAL
+)
+from votos_sql import (
+    CATEGORIAS, VOTOS_COMPLETOS, YA_VOTO, VotoRechazado, emitir_boleta, emitir_voto, error_voto, marca_fecha_voto
+)
+
+# Motores seleccionables con STORAGE_BACKEND
+BACKEND_AUTO = "auto"
+BACKEND_SQLSERVER = "sqlserver"
+BACKEND_LOCAL = "local"
+BACKENDS = (BACKEND_AUTO, BACKEND_SQLSERVER, BACKEND_LOCAL)
+
+# Motor que atendió una operación (los mensajes de respuesta lo indican)
+MODO_SQLSERVER = "sqlserver"
+MODO_SIMULADO = "simulado"
+
+_MASCARAS = {"presidencial": VOTO_PRESIDENCIAL, "regional": VOTO_REGIONAL, "distrital": VOTO_DISTRITAL}
+
+# Sufijo de los métodos de colección del almacenamiento simulado (get_all_candidatos_presidenciales, ...)
+_PLURAL = {"presidencial": "presidenciales", "regional": "regionales", "distrital": "distritales"}
+
+
+class DniDuplicado(Exception):
+    """Ya hay un votante registrado con ese DNI"""
+
+
+class Repositorio(ABC):
+    """Operaciones que usan los endpoints; las categorías son las claves de votos_sql.CATEGORIAS"""
+
+    modo: str
+    # Los votantes nuevos siempre reciben un ID mayor que los ya registrados (IDENTITY)
+    ids_crecientes: bool = True
+
+    @abstractmethod
+    def obtener_votante_por_dni(self, dni: str) -> Optional[Dict[str, Any]]:
+        """Datos del votante con ese DNI, o None"""
+
+    @abstractmethod
+    def estado_votante(self, dni: str, verificar: bool = False) -> int:
+        """Máscara de categorías votadas (0 si el votante no existe)"""
+
+    @abstractmethod
+    def registrar_votante(self, votante: Dict[str, Any]) -> int:
+        """Registra un votante y devuelve su ID; lanza DniDuplicado si el DNI ya existe"""
+
+    @abstractmethod
+    def dnis_votantes(self) -> Iterable[str]:
+        """DNI de todos los votantes registrados (importación masiva)"""
+
+    @abstractmethod
+    def insertar_votantes(self, filas: List[Tuple]) -> None:
+        """
+        Inserta un lote de votantes ya validados y sin duplicados, en una transacción.
+        Cada fila es (dni, nombres, apellidos, fecha_nacimiento, region, distrito)
+        """
+
+    @abstractmethod
+    def listar_votantes(self, limit: int, despues_de: Optional[int] = None, region: Optional[str] = None,
+                        distrito: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Hasta `limit` votantes del más reciente al más antiguo, con ID_VOTANTES menor que
+        `despues_de` (paginación por clave) y, opcionalmente, de una región y distrito
+        """
+
+    @abstractmethod
+    def votantes_desde(self, despues_de: int, limit: int) -> List[Tuple]:
+        """
+        Hasta `limit` votantes con ID_VOTANTES mayor que `despues_de`, por ID ascendente:
+        filas (id, dni, nombres, apellidos, fecha_nacimiento, region, distrito) para el perfil de calidad
+        """
+
+    @abstractmethod
+    def votantes_en_rangos(self, rangos: List[Tuple[int, int]]) -> List[Tuple]:
+        """
+        Votantes con ID_VOTANTES dentro de alguno de los rangos (desde, hasta), ambos incluidos,
+        por ID ascendente y con las mismas filas que votantes_desde
+        """
+
+    @abstractmethod
+    def exportar(self, tabla: str, lote: int) -> Iterator[List[Sequence]]:
+        """
+        Filas de una tabla de exportar_datos.EXPORTACIONES en lotes de hasta `lote`, con las
+        columnas en el orden de su definición. close() suelta la conexión si no se recorre completo
+        """
+
+    @abstractmethod
+    def contar_votantes(self) -> Dict[str, int]:
+        """Votantes registrados (`total`) y cuántos ya votaron (`votaron`)"""
+
+    @abstractmethod
+    def listar_candidatos(self, categoria: str) -> List[Dict[str, Any]]:
+        """Candidatos de la categoría: id, nombres, apellidos y cantidad_votos"""
+
+    @abstractmethod
+    def crear_candidato(self, categoria: str, nombres: str, apellidos: str) -> int:
+        """Crea un candidato y devuelve su ID"""
+
+    @abstractmethod
+    def emitir_votos(self, id_votantes: int, votos: Dict[str, int]) -> str:
+        """
+        Registra uno o los tres votos de un votante (categoría -> ID de candidato), todos o ninguno.
+        Lanza VotoRechazado si no pasan las validaciones; devuelve el modo que los registró
+        """
+
+    @abstractmethod
+    def emitir_voto_nulo(self, id_votantes: int, dni: str) -> str:
+        """Registra un voto nulo; devuelve el modo que lo registró"""
+
+    @abstractmethod
+    def votos_por_area(self, categoria: str) -> List[Tuple[Optional[str], int, int]]:
+        """
+        Votos de una categoría de area_results.AREAS agrupados por el área del votante
+        (región o distrito) y candidato: filas (área, id_candidato, votos)
+        """
+
+    @abstractmethod
+    def votos_por_minuto(self, desde: Optional[datetime] = None) -> List[Tuple[datetime, int]]:
+        """Votantes por minuto de FECHA_VOTO (truncada al minuto), desde `desde` o desde el principio"""
+
+    def resultados(self, categoria: str) -> List[Dict[str, Any]]:
+        """Candidatos de la categoría ordenados por votos, de mayor a menor"""
+        return sorted(self.listar_candidatos(categoria), key=lambda c: c["cantidad_votos"], reverse=True)
+
+
+class RepositorioSQLServer(Repositorio):
+    """
+    SQL Server. `conectar` presta una conexión del pool y lanza ConnectionError si el
+    servidor no responde. Mantiene el índice de estado de votación y, con contadores
+    write-behind, le pasa los votos al agregador en lugar de actualizar CANTIDAD_VOTOS.
+    Con `areas`, suma cada voto confirmado en la región o distrito del votante.
+    """
+
+    modo = MODO_SQLSERVER
+
+    def __init__(self, conectar: Callable[[], Any], ballot_state: BallotStateIndex, contadores=None,
+                 areas: Optional[AreaResults] = None):
+        self._conectar = conectar
+        self._ballot_state = ballot_state
+        self._contadores = contadores
+        self._areas = areas
+        # None hasta el primer intento de conexión
+        self.disponible: Optional[bool] = None
+
+    def _conexion(self):
+        try:
+            conn = self._conectar()
+        except ConnectionError:
+            self.disponible = False
+            raise
+        self.disponible = True
+        return conn
+
+    def _consultar(self, sql: str, parametros=(), todas: bool = True):
+        conn = self._conexion()
+        cursor = conn.cursor()
+        try:
+            cursor.execute(sql, parametros)
+            return cursor.fetchall() if todas else cursor.fetchone()
+        finally:
+            cursor.close()
+            conn.close()
+
+    def obtener_votante_por_dni(self, dni: str) -> Optional[Dict[str, Any]]:
+        row = self._consultar(
+            """SELECT ID_VOTANTES, DNI, NOMBRES, APELLIDOS, FECHA_NACIMIENTO, REGION, DISTRITO, FECHA_VOTO
+               FROM VOTANTES WHERE DNI = ?""",
+            (dni,), todas=False
+        )
+        if not row:
+            return None
+        return {
+            "id_votantes": row[0],
+            "dni": row[1],
+            "nombres": row[2],
+            "apellidos": row[3],
+            "fecha_nacimiento": str(row[4]),
+            "region": row[5],
+            "distrito": row[6],
+            "fecha_voto": str(row[7]) if row[7] else None
+        }
+
+    def estado_votante(self, dni: str, verificar: bool = False) -> int:
+        # El índice refleja SQL Server: no se usa si el servidor está caído
+        if not verificar and self.disponible is not False:
+            mascara = self._ballot_state.get_mascara(dni)
+            if mascara is not None:
+                return mascara
+
+        # Buscar votante por DNI y contar sus votos por categoría en una sola consulta
+        row = self._consultar(
+            """SELECT v.ID_VOTANTES,
+                      (SELECT COUNT(*) FROM VOTO_PRESIDENCIAL p WHERE p.ID_VOTANTES = v.ID_VOTANTES),
+                      (SELECT COUNT(*) FROM VOTO_REGIONAL r WHERE r.ID_VOTANTES = v.ID_VOTANTES),
+                      (SELECT COUNT(*) FROM VOTO_DISTRITAL d WHERE d.ID_VOTANTES = v.ID_VOTANTES)
+               FROM VOTANTES v WHERE v.DNI = ?""",
+            (dni,), todas=False
+        )
+        if not row:
+            return 0
+        id_votantes, votos_presidenciales, votos_regionales, votos_distritales = row
+        mascara = (
+            (VOTO_PRESIDENCIAL if votos_presidenciales else 0) |
+            (VOTO_REGIONAL if votos_regionales else 0) |
+            (VOTO_DISTRITAL if votos_distritales else 0)
+        )
+        self._ballot_state.register_votante(dni, id_votantes, mascara)
+        return mascara
+
+    def registrar_votante(self, votante: Dict[str, Any]) -> int:
+        conn = self._conexion()
+        cursor = conn.cursor()
+        try:
+            cursor.execute("SELECT ID_VOTANTES FROM VOTANTES WHERE DNI = ?", (votante["dni"],))
+            if cursor.fetchone():
+                raise DniDuplicado(votante["dni"])
+            cursor.execute(
+                """INSERT INTO VOTANTES (DNI, NOMBRES, APELLIDOS, FECHA_NACIMIENTO, REGION, DISTRITO)
+                   OUTPUT INSERTED.ID_VOTANTES VALUES (?, ?, ?, ?, ?, ?)""",
+                (votante["dni"], votante["nombres"], votante["apellidos"], votante["fecha_nacimiento"],
+                 votante["region"], votante["distrito"])
+            )
+            id_votantes = cursor.fetchone()[0]
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+            conn.close()
+        self._ballot_state.register_votante(votante["dni"], id_votantes)
+        return id_votantes
+
+    def dnis_votantes(self) -> Iterable[str]:
+        conn = self._conexion()
+        cursor = conn.cursor()
+        dnis = set()
+        try:
+            cursor.execute("SELECT DNI FROM VOTANTES")
+            while True:
+                rows = cursor.fetchmany(5000)
+                if not rows:
+                    return dnis
+                dnis.update(row[0].strip() for row in rows if row[0] is not None)
+        finally:
+            cursor.close()
+            conn.close()
+
+    def insertar_votantes(self, filas: List[Tuple]) -> None:
+        conn = self._conexion()
+        cursor = conn.cursor()
+        # Parámetros en un solo arreglo por lote en lugar de un viaje por fila
+        cursor.fast_executemany = True
+        try:
+            cursor.executemany(
+                """INSERT INTO VOTANTES (DNI, NOMBRES, APELLIDOS, FECHA_NACIMIENTO, REGION, DISTRITO)
+                   VALUES (?, ?, ?, ?, ?, ?)""",
+                filas
+            )
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+            conn.close()
+
+    def listar_votantes(self, limit: int, despues_de: Optional[int] = None, region: Optional[str] = None,
+                        distrito: Optional[str] = None) -> List[Dict[str, Any]]:
+        # Búsqueda por índice desde el último ID visto: cada página cuesta lo mismo que la primera
+        condiciones, parametros = [], [limit]
+        for condicion, valor in (("ID_VOTANTES < ?", despues_de), ("REGION = ?", region), ("DISTRITO = ?", distrito)):
+            if valor is not None:
+                condiciones.append(condicion)
+                parametros.append(valor)
+        where = f"WHERE {' AND '.join(condiciones)}" if condiciones else ""
+        rows = self._consultar(
+            f"""SELECT TOP (?) ID_VOTANTES, DNI, NOMBRES, APELLIDOS, FECHA_NACIMIENTO, REGION, DISTRITO
+                FROM VOTANTES {where} ORDER BY ID_VOTANTES DESC""",
+            parametros
+        )
+        return [
+            {
+                "id_votantes": row[0],
+                "dni": row[1],
+                "nombres": row[2],
+                "apellidos": row[3],
+                "fecha_nacimiento": str(row[4]),
+                "region": row[5],
+                "distrito": row[6]
+            }
+            for row in rows
+        ]
+
+    def votantes_desde(self, despues_de: int, limit: int) -> List[Tuple]:
+        rows = self._consultar(
+            """SELECT TOP (?) ID_VOTANTES, DNI, NOMBRES, APELLIDOS, FECHA_NACIMIENTO, REGION, DISTRITO
+               FROM VOTANTES WHERE ID_VOTANTES > ? ORDER BY ID_VOTANTES""",
+            (limit, despues_de)
+        )
+        return [tuple(row) for row in rows]
+
+    def votantes_en_rangos(self, rangos: List[Tuple[int, int]]) -> List[Tuple]:
+        filas = []
+        # Dos parámetros por rango: cada consulta queda bajo el límite de 2100 de SQL Server
+        for inicio in range(0, len(rangos), 500):
+            grupo = rangos[inicio:inicio + 500]
+            rows = self._consultar(
+                "SELECT ID_VOTANTES, DNI, NOMBRES, APELLIDOS, FECHA_NACIMIENTO, REGION, DISTRITO "
+                "FROM VOTANTES WHERE " + " OR ".join("ID_VOTANTES BETWEEN ? AND ?" for _ in grupo)
+                + " ORDER BY ID_VOTANTES",
+                [limite for rango in grupo for limite in rango]
+            )
+            filas.extend(tuple(row) for row in rows)
+        return filas
+
+    def exportar(self, tabla: str, lote: int) -> Iterator[List[Sequence]]:
+        # La consulta se ejecuta aquí (un servidor caído falla antes de empezar a responder)
+        # y las filas se traen con fetchmany a medida que se consumen
+        conn = self._conexion()
+        cursor = conn.cursor()
+        try:
+            cursor.execute(EXPORTACIONES[tabla]["sql"])
+        except BaseException:
+            cursor.close()
+            conn.close()
+            raise
+        return CursorPorLotes(conn, cursor, lote)
+
+    def contar_votantes(self) -> Dict[str, int]:
+        total, votaron = self._consultar(
+            "SELECT COUNT(*), COUNT(FECHA_VOTO) FROM VOTANTES", todas=False
+        )
+        return {"total": total or 0, "votaron": votaron or 0}
+
+    def listar_candidatos(self, categoria: str) -> List[Dict[str, Any]]:
+        cfg = CATEGORIAS[categoria]
+        rows = self._consultar(
+            f"SELECT {cfg['id_candidato']}, NOMBRES, APELLIDOS, CANTIDAD_VOTOS FROM {cfg['tabla_candidato']}"
+        )
+        return [
+            {"id": row[0], "nombres": row[1], "apellidos": row[2], "cantidad_votos": row[3] or 0}
+            for row in rows
+        ]
+
+    def resultados(self, categoria: str) -> List[Dict[str, Any]]:
+        cfg = CATEGORIAS[categoria]
+        rows = self._consultar(
+            f"""SELECT {cfg['id_candidato']}, NOMBRES, APELLIDOS, CANTIDAD_VOTOS
+                FROM {cfg['tabla_candidato']}
+                ORDER BY CANTIDAD_VOTOS DESC"""
+        )
+        return [
+            {"id": row[0], "nombres": row[1], "apellidos": row[2], "cantidad_votos": row[3] or 0}
+            for row in rows
+        ]
+
+    def crear_candidato(self, categoria: str, nombres: str, apellidos: str) -> int:
+        cfg = CATEGORIAS[categoria]
+        conn = self._conexion()
+        cursor = conn.cursor()
+        try:
+            cursor.execute(
+                f"""INSERT INTO {cfg['tabla_candidato']} (NOMBRES, APELLIDOS)
+                    OUTPUT INSERTED.{cfg['id_candidato']} VALUES (?, ?)""",
+                (nombres, apellidos)
+            )
+            id_candidato = cursor.fetchone()[0]
+            conn.commit()
+            return id_candidato
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+            conn.close()
+
+    def emitir_votos(self, id_votantes: int, votos: Dict[str, int]) -> str:
+        if self._contadores is None:
+            return self._emitir_votos(id_votantes, votos)
+        # Desde el INSERT hasta el add(), para que una reconciliación no cuente el voto dos veces
+        with self._contadores.confirmando():
+            return self._emitir_votos(id_votantes, votos)
+
+    def _emitir_votos(self, id_votantes: int, votos: Dict[str, int]) -> str:
+        actualizar_contadores = self._contadores is None
+        conn = self._conexion()
+        cursor = conn.cursor()
+        try:
+            # Validar, registrar y contabilizar en un solo viaje a la BD
+            if len(votos) == 1:
+                [(categoria, id_candidato)] = votos.items()
+                region, distrito = emitir_voto(
+                    cursor, categoria, id_votantes, id_candidato, actualizar_contador=actualizar_contadores
+                )
+            else:
+                region, distrito = emitir_boleta(
+                    cursor, id_votantes, votos["presidencial"], votos["regional"], votos["distrital"],
+                    actualizar_contadores=actualizar_contadores
+                )
+            conn.commit()
+        except VotoRechazado as e:
+            conn.rollback()
+            self._ballot_state.mark_rechazo(id_votantes, e)
+            raise
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+            conn.close()
+        for categoria, id_candidato in votos.items():
+            self._ballot_state.mark_voto(id_votantes, categoria)
+            if self._contadores is not None:
+                self._contadores.add(categoria, id_candidato)
+        if self._areas is not None:
+            _sumar_por_area(self._areas, votos, {"region": region, "distrito": distrito})
+        return self.modo
+
+    def votos_por_area(self, categoria: str) -> List[Tuple[Optional[str], int, int]]:
+        cfg = CATEGORIAS[categoria]
+        columna_area = AREAS[categoria].upper()
+        rows = self._consultar(
+            f"""SELECT v.{columna_area}, t.{cfg['columna_candidato']}, COUNT(*)
+                FROM {cfg['tabla_voto']} t JOIN VOTANTES v ON v.ID_VOTANTES = t.ID_VOTANTES
+                GROUP BY v.{columna_area}, t.{cfg['columna_candidato']}"""
+        )
+        return [(row[0], row[1], row[2]) for row in rows]
+
+    def votos_por_minuto(self, desde: Optional[datetime] = None) -> List[Tuple[datetime, int]]:
+        filtro, parametros = ("FECHA_VOTO >= ?", (desde,)) if desde is not None else ("FECHA_VOTO IS NOT NULL", ())
+        rows = self._consultar(
+            f"""SELECT DATEADD(MINUTE, DATEDIFF(MINUTE, 0, FECHA_VOTO), 0), COUNT(*)
+                FROM VOTANTES WHERE {filtro}
+                GROUP BY DATEADD(MINUTE, DATEDIFF(MINUTE, 0, FECHA_VOTO), 0)""",
+            parametros
+        )
+        return [(row[0], row[1]) for row in rows]
+
+    def emitir_voto_nulo(self, id_votantes: int, dni: str) -> str:
+        conn = self._conexion()
+        cursor = conn.cursor()
+        try:
+            cursor.execute("INSERT INTO VOTO_NULO (ID_VOTANTES, DNI) VALUES (?, ?)", (id_votantes, dni))
+            cursor.execute(
+                "UPDATE VOTANTES SET FECHA_VOTO = ? WHERE ID_VOTANTES = ?", (datetime.now(), id_votantes)
+            )
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+            conn.close()
+        return self.modo
+
+
+class RepositorioLocal(Repositorio):
+    """
+    Almacenamiento simulado (SimulatedStorage o SQLiteStorage, misma interfaz).
+    Conserva las reglas del modo simulado: los votantes y candidatos que no existen
+    se crean al votar. Cada operación que escribe es una transacción del almacenamiento;
+    las que solo leen usan lectura(), que en SQLite no toma el lock de escritura.
+    """
+
+    modo = MODO_SIMULADO
+    # Los votantes simulados reciben IDs al azar y los marcadores que crea un voto, el ID votado
+    ids_crecientes = False
+
+    def __init__(self, obtener_storage: Callable[[], Any], areas: Optional[AreaResults] = None):
+        # El almacenamiento se abre recién cuando se usa por primera vez
+        self._obtener_storage = obtener_storage
+        self._areas = areas
+
+    def obtener_votante_por_dni(self, dni: str) -> Optional[Dict[str, Any]]:
+        storage = self._obtener_storage()
+        with storage.transaction():
+            votante = storage.get_votante_by_dni(dni)
+            if not votante:
+                # Crear votante simulado si no existe
+                votante = {
+                    'id_votantes': random.randint(1000, 9999),
+                    'dni': dni,
+                    'nombres': 'Votante',
+                    'apellidos': 'Simulado',
+                    'fecha_nacimiento': '2000-01-01',
+                    'region': 'Lima',
+                    'distrito': 'Lima',
+                    'fecha_voto': None
+                }
+                storage.add_votante(votante)
+        return {
+            "id_votantes": votante.get('id_votantes'),
+            "dni": votante.get('dni', dni),
+            "nombres": votante.get('nombres', 'Votante'),
+            "apellidos": votante.get('apellidos', 'Simulado'),
+            "fecha_nacimiento": votante.get('fecha_nacimiento', '2000-01-01'),
+            "region": votante.get('region', 'Lima'),
+            "distrito": votante.get('distrito', 'Lima'),
+            "fecha_voto": votante.get('fecha_voto')
+        }
+
+    def _mascara(self, storage, id_votantes: int) -> int:
+        mascara = 0
+        for categoria, bit in _MASCARAS.items():
+            if getattr(storage, f"count_votos_{_PLURAL[categoria]}")(id_votantes):
+                mascara |= bit
+        return mascara
+
+    def estado_votante(self, dni: str, verificar: bool = False) -> int:
+        storage = self._obtener_storage()
+        with storage.lectura():
+            votante = storage.get_votante_by_dni(dni)
+            return self._mascara(storage, votante['id_votantes']) if votante else 0
+
+    def registrar_votante(self, votante: Dict[str, Any]) -> int:
+        storage = self._obtener_storage()
+        with storage.transaction():
+            if storage.get_votante_by_dni(votante["dni"]):
+                raise DniDuplicado(votante["dni"])
+            id_votantes = storage.max_id_votantes() + 1
+            storage.add_votante({
+                'id_votantes': id_votantes,
+                'dni': votante["dni"],
+                'nombres': votante["nombres"],
+                'apellidos': votante["apellidos"],
+                'fecha_nacimiento': str(votante["fecha_nacimiento"]),
+                'region': votante["region"],
+                'distrito': votante["distrito"],
+                'fecha_voto': None
+            })
+        return id_votantes
+
+    def dnis_votantes(self) -> Iterable[str]:
+        storage = self._obtener_storage()
+        with storage.lectura():
+            votantes = storage.get_all_votantes()
+        return {v['dni'] for v in votantes if v.get('dni')}
+
+    def insertar_votantes(self, filas: List[Tuple]) -> None:
+        storage = self._obtener_storage()
+        with storage.transaction():
+            id_votantes = storage.max_id_votantes()
+            for dni, nombres, apellidos, fecha_nacimiento, region, distrito in filas:
+                id_votantes += 1
+                storage.add_votante({
+                    'id_votantes': id_votantes,
+                    'dni': dni,
+                    'nombres': nombres,
+                    'apellidos': apellidos,
+                    'fecha_nacimiento': str(fecha_nacimiento),
+                    'region': region,
+                    'distrito': distrito,
+                    'fecha_voto': None
+                })
+
+    def listar_votantes(self, limit: int, despues_de: Optional[int] = None, region: Optional[str] = None,
+                        distrito: Optional[str] = None) -> List[Dict[str, Any]]:
+        storage = self._obtener_storage()
+        with storage.lectura():
+            votantes = storage.get_votantes_pagina(limit, despues_de, region, distrito)
+        return [
+            {
+                "id_votantes": v['id_votantes'],
+                "dni": v.get('dni'),
+                "nombres": v.get('nombres'),
+                "apellidos": v.get('apellidos'),
+                "fecha_nacimiento": v.get('fecha_nacimiento'),
+                "region": v.get('region'),
+                "distrito": v.get('distrito')
+            }
+            for v in votantes
+        ]
+
+    def votantes_desde(self, despues_de: int, limit: int) -> List[Tuple]:
+        storage = self._obtener_storage()
+        with storage.lectura():
+            votantes = storage.get_votantes_desde(despues_de, limit)
+        return [self._fila_perfil(v) for v in votantes]
+
+    def votantes_en_rangos(self, rangos: List[Tuple[int, int]]) -> List[Tuple]:
+        storage = self._obtener_storage()
+        with storage.lectura():
+            votantes = [storage.get_votante(id_votantes)
+                        for desde, hasta in sorted(rangos) for id_votantes in range(desde, hasta + 1)]
+        return [self._fila_perfil(v) for v in votantes if v]
+
+    def _fila_perfil(self, v: Dict[str, Any]) -> Tuple:
+        return (v['id_votantes'], v.get('dni'), v.get('nombres'), v.get('apellidos'), v.get('fecha_nacimiento'),
+                v.get('region'), v.get('distrito'))
+
+    def exportar(self, tabla: str, lote: int) -> Iterator[List[Sequence]]:
+        exportacion = EXPORTACIONES[tabla]
+        storage = self._obtener_storage()
+        with storage.lectura():
+            registros = getattr(storage, f"get_all_{exportacion['coleccion']}")()
+        if tabla == "votantes":
+            registros.sort(key=lambda v: v['id_votantes'])
+        campos = exportacion["campos"]
+        return (
+            [tuple(registro.get(campo) for campo in campos) for registro in registros[inicio:inicio + lote]]
+            for inicio in range(0, len(registros), lote)
+        )
+
+    def contar_votantes(self) -> Dict[str, int]:
+        storage = self._obtener_storage()
+        with storage.lectura():
+            votantes = storage.get_all_votantes()
+        return {"total": len(votantes), "votaron": sum(1 for v in votantes if v.get('fecha_voto'))}
+
+    def listar_candidatos(self, categoria: str) -> List[Dict[str, Any]]:
+        storage = self._obtener_storage()
+        with storage.lectura():
+            candidatos = getattr(storage, f"get_all_candidatos_{_PLURAL[categoria]}")()
+        return [
+            {
+                "id": c['id_candidato'],
+                "nombres": c.get('nombres'),
+                "apellidos": c.get('apellidos'),
+                "cantidad_votos": c.get('cantidad_votos') or 0
+            }
+            for c in candidatos
+        ]
+
+    def crear_candidato(self, categoria: str, nombres: str, apellidos: str) -> int:
+        storage = self._obtener_storage()
+        with storage.transaction():
+            existentes = getattr(storage, f"get_all_candidatos_{_PLURAL[categoria]}")()
+            id_candidato = max((c['id_candidato'] for c in existentes), default=0) + 1
+            getattr(storage, f"add_candidato_{categoria}")(id_candidato, nombres, apellidos)
+        return id_candidato
+
+    def _asegurar_votante(self, storage, id_votantes: int):
+        """En modo simulado el votante se crea si no existe"""
+        if not storage.get_votante(id_votantes):
+            storage.add_votante({
+                'id_votantes': id_votantes,
+                'dni': f'DNI{id_votantes}',
+                'fecha_voto': None
+            })
+
+    def emitir_votos(self, id_votantes: int, votos: Dict[str, int]) -> str:
+        storage = self._obtener_storage()
+        with storage.transaction():
+            self._asegurar_votante(storage, id_votantes)
+
+            mascara = self._mascara(storage, id_votantes)
+            if mascara == VOTO_PRESIDENCIAL | VOTO_REGIONAL | VOTO_DISTRITAL:
+                raise error_voto(next(iter(votos)), VOTOS_COMPLETOS)
+            for categoria in votos:
+                if mascara & _MASCARAS[categoria]:
+                    raise error_voto(categoria, YA_VOTO)
+
+            for categoria, id_candidato in votos.items():
+                # Candidato simulado si no existe
+                candidato = getattr(storage, f"get_candidato_{categoria}")(id_candidato)
+                if not candidato:
+                    candidato = getattr(storage, f"add_candidato_{categoria}")(
+                        id_candidato, f'Candidato {id_candidato}', categoria.capitalize()
+                    )
+                getattr(storage, f"add_voto_{categoria}")(
+                    id_votantes,
+                    id_candidato,
+                    candidato.get('nombres', f'Candidato {id_candidato}'),
+                    candidato.get('apellidos', categoria.capitalize())
+                )
+                getattr(storage, f"update_candidato_{categoria}_votos")(id_candidato, 1)
+
+            # Igual que en SQL Server: la boleta y el voto presidencial marcan la fecha de voto
+            if marca_fecha_voto(votos):
+                storage.update_votante_fecha_voto(id_votantes, datetime.now())
+            votante = storage.get_votante(id_votantes)
+        if self._areas is not None:
+            _sumar_por_area(self._areas, votos, votante)
+        return self.modo
+
+    def votos_por_area(self, categoria: str) -> List[Tuple[Optional[str], int, int]]:
+        storage = self._obtener_storage()
+        campo_candidato = CATEGORIAS[categoria]["columna_candidato"].lower()
+        with storage.lectura():
+            votantes = {v['id_votantes']: v for v in storage.get_all_votantes()}
+            votos = getattr(storage, f"get_all_votos_{_PLURAL[categoria]}")()
+        conteos: Dict[Tuple[Optional[str], int], int] = {}
+        for voto in votos:
+            area = votantes.get(voto.get('id_votantes'), {}).get(AREAS[categoria])
+            clave = (area, voto.get(campo_candidato))
+            conteos[clave] = conteos.get(clave, 0) + 1
+        return [(area, id_candidato, n) for (area, id_candidato), n in conteos.items()]
+
+    def votos_por_minuto(self, desde: Optional[datetime] = None) -> List[Tuple[datetime, int]]:
+        storage = self._obtener_storage()
+        with storage.lectura():
+            fechas = [v.get('fecha_voto') for v in storage.get_all_votantes()]
+        conteos: Dict[datetime, int] = {}
+        for fecha in fechas:
+            if not fecha:
+                continue
+            try:
+                fecha = datetime.fromisoformat(fecha)
+            except (TypeError, ValueError):
+                continue
+            if desde is not None and fecha < desde:
+                continue
+            minuto = fecha.replace(second=0, microsecond=0)
+            conteos[minuto] = conteos.get(minuto, 0) + 1
+        return list(conteos.items())
+
+    def emitir_voto_nulo(self, id_votantes: int, dni: str) -> str:
+        storage = self._obtener_storage()
+        with storage.transaction():
+            # Con SQLite el voto nulo referencia al votante (clave foránea)
+            self._asegurar_votante(storage, id_votantes)
+            storage.add_voto_nulo(id_votantes, dni)
+            storage.update_votante_fecha_voto(id_votantes, datetime.now())
+        return self.modo
+
+
+class RepositorioConRespaldo(Repositorio):
+    """Usa `principal` (SQL Server) y, si lanza ConnectionError, repite la operación en `respaldo`"""
+
+    def __init__(self, principal: Repositorio, respaldo: Repositorio):
+        self.principal = principal
+        self.respaldo = respaldo
+
+    @property
+    def modo(self) -> str:
+        return self.principal.modo
+
+    @property
+    def ids_crecientes(self) -> bool:
+        return self.principal.ids_crecientes
+
+    def activo(self) -> Repositorio:
+        """
+        Repositorio que atiende ahora: el principal salvo que su último intento de conexión
+        haya fallado. Las operaciones de varios pasos (importación masiva) lo fijan al empezar
+        para no repartir los datos entre los dos motores.
+        """
+        return self.respaldo if self.principal.disponible is False else self.principal
+
+    def _llamar(self, operacion: str, *args):
+        try:
+            return getattr(self.principal, operacion)(*args)
+        except ConnectionError:
+            return getattr(self.respaldo, operacion)(*args)
+
+    def obtener_votante_por_dni(self, dni: str) -> Optional[Dict[str, Any]]:
+        return self._llamar("obtener_votante_por_dni", dni)
+
+    def estado_votante(self, dni: str, verificar: bool = False) -> int:
+        return self._llamar("estado_votante", dni, verificar)
+
+    def registrar_votante(self, votante: Dict[str, Any]) -> int:
+        return self._llamar("registrar_votante", votante)
+
+    def dnis_votantes(self) -> Iterable[str]:
+        return self._llamar("dnis_votantes")
+
+    def insertar_votantes(self, filas: List[Tuple]) -> None:
+        return self._llamar("insertar_votantes", filas)
+
+    def listar_votantes(self, limit: int, despues_de: Optional[int] = None, region: Optional[str] = None,
+                        distrito: Optional[str] = None) -> List[Dict[str, Any]]:
+        return self._llamar("listar_votantes", limit, despues_de, region, distrito)
+
+    def votantes_desde(self, despues_de: int, limit: int) -> List[Tuple]:
+        return self._llamar("votantes_desde", despues_de, limit)
+
+    def votantes_en_rangos(self, rangos: List[Tuple[int, int]]) -> List[Tuple]:
+        return self._llamar("votantes_en_rangos", rangos)
+
+    def exportar(self, tabla: str, lote: int) -> Iterator[List[Sequence]]:
+        return self._llamar("exportar", tabla, lote)
+
+    def contar_votantes(self) -> Dict[str, int]:
+        return self._llamar("contar_votantes")
+
+    def listar_candidatos(self, categoria: str) -> List[Dict[str, Any]]:
+        return self._llamar("listar_candidatos", categoria)
+
+    def resultados(self, categoria: str) -> List[Dict[str, Any]]:
+        return self._llamar("resultados", categoria)
+
+    def crear_candidato(self, categoria: str, nombres: str, apellidos: str) -> int:
+        return self._llamar("crear_candidato", categoria, nombres, apellidos)
+
+    def emitir_votos(self, id_votantes: int, votos: Dict[str, int]) -> str:
+        return self._llamar("emitir_votos", id_votantes, votos)
+
+    def emitir_voto_nulo(self, id_votantes: int, dni: str) -> str:
+        return self._llamar("emitir_voto_nulo", id_votantes, dni)
+
+    def votos_por_area(self, categoria: str) -> List[Tuple[Optional[str], int, int]]:
+        return self._llamar("votos_por_area", categoria)
+
+    def votos_por_minuto(self, desde: Optional[datetime] = None) -> List[Tuple[datetime, int]]:
+        return self._llamar("votos_por_minuto", desde)
+
+
+def _sumar_por_area(areas: AreaResults, votos: Dict[str, int], votante: Dict[str, Any]):
+    """Suma los votos confirmados en el área del votante (región para el regional, distrito para el distrital)"""
+    for categoria, id_candidato in votos.items():
+        if categoria in AREAS:
+            areas.add(categoria, votante.get(AREAS[categoria]), id_candidato)
+
+
+def crear_repositorio(backend: str, sqlserver: Repositorio, local: Repositorio) -> Repositorio:
+    """Repositorio según STORAGE_BACKEND: auto (SQL Server con respaldo local), sqlserver o local"""
+    if backend == BACKEND_AUTO:
+        return RepositorioConRespaldo(sqlserver, local)
+    if backend == BACKEND_SQLSERVER:
+        return sqlserver
+    if backend == BACKEND_LOCAL:
+        return local
+    raise ValueError(f"STORAGE_BACKEND inválido: {backend} (opciones: {', '.join(BACKENDS)})")
@@ -0,0 +1,124 @@
+"""
+Caché de resultados electorales con invalidación por voto y coalescencia de consultas
+Miles de paneles consultando a la vez cuestan como máximo una consulta por intervalo de refresco
+"""
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+
+class _Entry:
+    __slots__ = ("value", "fetched_at", "version")
+
+    def __init__(self, value: Any, fetched_at: float, version: int):
+        self.value = value
+        self.fetched_at = fetched_at
+        self.version = version
+
+
+class _Flight:
+    """Carga en curso de una clave; las demás peticiones esperan su resultado"""
+
+    __slots__ = ("done", "value", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error: Optional[BaseException] = None
+
+
+class ResultsCache:
+    """
+    Una entrada sin votos nuevos desde que se leyó vale hasta `ttl` segundos.
+    Cuando un voto la invalida, se sigue sirviendo hasta que cumple `max_staleness`
+    segundos y entonces la próxima petición la recarga (una sola vez, aunque lleguen miles).
+    Mientras se recarga, las demás peticiones reciben el valor anterior.
+    """
+
+    def __init__(self, max_staleness: float = 2.0, ttl: float = 30.0):
+        self.max_staleness = max_staleness
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: Dict[str, _Entry] = {}
+        self._versions: Dict[str, int] = {}
+        self._flights: Dict[str, _Flight] = {}
+        self._hits = 0
+        self._stale_hits = 0
+        self._loads = 0
+        self._coalesced = 0
+
+    def _is_fresh(self, key: str, entry: _Entry, now: float) -> bool:
+        age = now - entry.fetched_at
+        if entry.version == self._versions.get(key, 0):
+            return age < self.ttl
+        return age < self.max_staleness
+
+    def get_fresh(self, key: str) -> Optional[Any]:
+        """Devuelve el valor si sigue vigente, sin bloquear ni cargar"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._is_fresh(key, entry, time.monotonic()):
+                self._hits += 1
+                return entry.value
+        return None
+
+    def get(self, key: str, loader: Callable[[], Any]) -> Any:
+        """Devuelve el valor vigente o lo carga con `loader`, compartiendo la carga entre peticiones"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._is_fresh(key, entry, time.monotonic()):
+                self._hits += 1
+                return entry.value
+            flight = self._flights.get(key)
+            if flight is not None:
+                self._coalesced += 1
+                if entry is not None:
+                    self._stale_hits += 1
+                    return entry.value
+                leader = False
+            else:
+                flight = _Flight()
+                self._flights[key] = flight
+                version = self._versions.get(key, 0)
+                leader = True
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            value = loader()
+            flight.value = value
+            with self._lock:
+                self._loads += 1
+                # Se guarda la versión previa a la carga: un voto durante la consulta la deja invalidada
+                self._entries[key] = _Entry(value, time.monotonic(), version)
+            return value
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.done.set()
+
+    def invalidate(self, *keys: str):
+        """Marca las claves como desactualizadas tras confirmar un voto"""
+        with self._lock:
+            for key in keys:
+                self._versions[key] = self._versions.get(key, 0) + 1
+
+    def metrics(self) -> Dict[str, Any]:
+        """Aciertos, cargas reales y peticiones coalescidas"""
+        with self._lock:
+            return {
+                "maxStalenessSeconds": self.max_staleness,
+                "ttlSeconds": self.ttl,
+                "keys": sorted(self._entries),
+                "hits": self._hits,
+                "staleHits": self._stale_hits,
+                "loads": self._loads,
+                "coalesced": self._coalesced,
+            }
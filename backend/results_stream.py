@@ -0,0 +1,134 @@
+"""
+Difusión de resultados en vivo por Server-Sent Events
+Cada evento se serializa una sola vez y los mismos bytes se envían a todos los suscriptores
+"""
+import asyncio
+import json
+import threading
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional, Set
+
+# Marcador en la cola de un cliente lento: debe recibir un snapshot completo
+_RESYNC = object()
+
+
+class _Subscriber:
+    __slots__ = ("queue", "dropped")
+
+    def __init__(self, queue_size: int):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.dropped = 0
+
+    def offer(self, payload: Any):
+        """Encola sin bloquear; si el cliente no da abasto se descarta su cola y se le resincroniza"""
+        try:
+            self.queue.put_nowait(payload)
+        except asyncio.QueueFull:
+            while not self.queue.empty():
+                self.queue.get_nowait()
+                self.dropped += 1
+            self.queue.put_nowait(_RESYNC)
+
+
+class ResultsBroadcaster:
+    """
+    Emite eventos `votos` (deltas de votos confirmados en este proceso) y eventos
+    `snapshot` (resultados completos, periódicos) a todos los clientes conectados
+    """
+
+    def __init__(self, queue_size: int = 256, keepalive: float = 15.0):
+        self.queue_size = queue_size
+        self.keepalive = keepalive
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._subscribers: Set[_Subscriber] = set()
+        self._seq = 0
+        self._seq_lock = threading.Lock()
+        self._last_snapshot: Optional[bytes] = None
+        self._snapshot_source: tuple = ()
+        self._published = 0
+        self._resyncs = 0
+        self._dropped = 0
+
+    def attach(self, loop: asyncio.AbstractEventLoop):
+        """Asocia el event loop del servidor; publish() puede llamarse desde cualquier hilo"""
+        self._loop = loop
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def _encode(self, event: str, data: Any) -> bytes:
+        with self._seq_lock:
+            self._seq += 1
+            seq = self._seq
+        body = json.dumps(data, ensure_ascii=False, separators=(",", ":"), default=str)
+        return f"id: {seq}\nevent: {event}\ndata: {body}\n\n".encode("utf-8")
+
+    def _encode_snapshot(self, data: Dict[str, Any]) -> bytes:
+        """Serializa un snapshot; si la caché devolvió los mismos objetos reutiliza los bytes ya generados"""
+        source = tuple(data.values())
+        if (
+            self._last_snapshot is None
+            or len(source) != len(self._snapshot_source)
+            or any(a is not b for a, b in zip(source, self._snapshot_source))
+        ):
+            self._last_snapshot = self._encode("snapshot", data)
+            self._snapshot_source = source
+        return self._last_snapshot
+
+    def publish(self, event: str, data: Any):
+        """Serializa el evento una vez y lo reparte a todos los suscriptores (seguro entre hilos)"""
+        if self._loop is None or (not self._subscribers and event != "snapshot"):
+            return
+        payload = self._encode_snapshot(data) if event == "snapshot" else self._encode(event, data)
+        try:
+            self._loop.call_soon_threadsafe(self._fanout, payload)
+        except RuntimeError:
+            # El loop ya se cerró (apagado del servidor)
+            pass
+
+    def _fanout(self, payload: bytes):
+        self._published += 1
+        for subscriber in self._subscribers:
+            subscriber.offer(payload)
+
+    async def stream(self, load_snapshot: Callable[[], Awaitable[Dict[str, Any]]]) -> AsyncIterator[bytes]:
+        """Generador para StreamingResponse: snapshot inicial, luego deltas y snapshots periódicos"""
+        subscriber = _Subscriber(self.queue_size)
+        self._subscribers.add(subscriber)
+        try:
+            yield self._encode_snapshot(await load_snapshot())
+            while True:
+                try:
+                    payload = await asyncio.wait_for(subscriber.queue.get(), timeout=self.keepalive)
+                except asyncio.TimeoutError:
+                    yield b": ping\n\n"
+                    continue
+                if payload is _RESYNC:
+                    self._resyncs += 1
+                    yield self._encode_snapshot(await load_snapshot())
+                    continue
+                yield payload
+        finally:
+            self._subscribers.discard(subscriber)
+            self._dropped += subscriber.dropped
+
+    async def run_snapshots(self, interval: float, load_snapshot: Callable[[], Awaitable[Dict[str, Any]]]):
+        """Publica un snapshot completo cada `interval` segundos mientras haya suscriptores"""
+        while True:
+            await asyncio.sleep(interval)
+            if not self._subscribers:
+                continue
+            try:
+                self.publish("snapshot", await load_snapshot())
+            except Exception as e:
+                print(f"Error publicando snapshot de resultados: {e}")
+
+    def metrics(self) -> Dict[str, Any]:
+        """Suscriptores conectados y eventos emitidos"""
+        return {
+            "subscribers": len(self._subscribers),
+            "published": self._published,
+            "lastEventId": self._seq,
+            "resyncs": self._resyncs,
+            "dropped": self._dropped + sum(s.dropped for s in list(self._subscribers)),
+        }
@@ -0,0 +1,356 @@
+"""
+Diario de solo anexado (JSONL) para el almacenamiento simulado
+Cada mutación se escribe como una línea nueva; el estado se reconstruye reproduciendo el archivo
+"""
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# Modos de durabilidad del escritor
+DURABILIDAD_POR_VOTO = "per_vote"
+DURABILIDAD_EN_LOTE = "batched"
+DURABILIDAD_ASINCRONA = "async"
+MODOS_DURABILIDAD = (DURABILIDAD_POR_VOTO, DURABILIDAD_EN_LOTE, DURABILIDAD_ASINCRONA)
+
+
+def encode_registro(registro: Dict[str, Any]) -> bytes:
+    """Serializa un registro como una línea JSON compacta"""
+    return (json.dumps(registro, ensure_ascii=False, separators=(",", ":"), default=str) + "\n").encode("utf-8")
+
+
+class FileLock:
+    """
+    Lock exclusivo entre procesos sobre un archivo (flock en POSIX, msvcrt en Windows).
+    No protege entre hilos del mismo proceso: quien lo usa debe tener su propio lock.
+    El archivo guarda además un contador de versión que cada proceso incrementa al
+    escribir, para que los demás sepan sin recorrer los diarios si hay algo nuevo,
+    y la generación de diarios vigente (cambia con cada snapshot).
+    """
+
+    # Fuera del byte que bloquea msvcrt
+    _VERSION_OFFSET = 8
+    _GENERATION_OFFSET = 16
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._file = None
+        self.acquisitions = 0
+        self.wait_seconds = 0.0
+
+    def acquire(self):
+        if self._file is None:
+            open(self.path, "ab").close()
+            self._file = open(self.path, "r+b")
+        started = time.monotonic()
+        if fcntl is not None:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+        else:
+            self._file.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(self._file.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    # LK_LOCK se rinde tras ~10 s; se sigue esperando
+                    continue
+        self.acquisitions += 1
+        self.wait_seconds += time.monotonic() - started
+
+    def release(self):
+        if fcntl is not None:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+        else:
+            self._file.seek(0)
+            msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+
+    def _read_u64(self, offset: int) -> int:
+        self._file.seek(offset)
+        data = self._file.read(8)
+        return int.from_bytes(data, "little") if len(data) == 8 else 0
+
+    def _write_u64(self, offset: int, value: int):
+        self._file.seek(offset)
+        self._file.write(value.to_bytes(8, "little"))
+        self._file.flush()
+
+    def read_version(self) -> int:
+        """Lee el contador de versión (con el lock tomado)"""
+        return self._read_u64(self._VERSION_OFFSET)
+
+    def write_version(self, version: int):
+        """Publica un nuevo contador de versión (con el lock tomado)"""
+        self._write_u64(self._VERSION_OFFSET, version)
+
+    def read_generation(self) -> int:
+        """Lee la generación de diarios vigente (con el lock tomado)"""
+        return self._read_u64(self._GENERATION_OFFSET)
+
+    def write_generation(self, generation: int):
+        """Publica una nueva generación de diarios (con el lock tomado)"""
+        self._write_u64(self._GENERATION_OFFSET, generation)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class Journal:
+    """
+    Un archivo .jsonl por colección. Escribir un voto cuesta lo mismo con 10 votos
+    que con un millón, porque solo se agrega la línea nueva al final del archivo.
+    `offset` es hasta dónde este proceso ya aplicó el archivo: lo que haya después
+    lo escribió otro proceso y se aplica con replay().
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.offset = 0
+        self._file = None
+        self.records = 0
+
+    def replay(self, apply: Callable[[Dict[str, Any]], None]) -> int:
+        """
+        Aplica en orden los registros posteriores a `offset`. Si un proceso murió a mitad
+        de una escritura, la última línea queda incompleta: se descarta y se recorta del
+        archivo (quien llama debe tener el lock entre procesos, o ser el único proceso).
+        """
+        try:
+            tamano = os.path.getsize(self.path)
+        except FileNotFoundError:
+            return 0
+        if tamano <= self.offset:
+            return 0
+        aplicados = 0
+        fin_valido = self.offset
+        with open(self.path, "rb") as f:
+            f.seek(self.offset)
+            for linea in f:
+                if not linea.endswith(b"\n"):
+                    break
+                try:
+                    registro = json.loads(linea)
+                except ValueError:
+                    print(f"Registro corrupto en {self.path} (byte {fin_valido}); se descarta el resto")
+                    break
+                apply(registro)
+                aplicados += 1
+                fin_valido += len(linea)
+        if os.path.getsize(self.path) > fin_valido:
+            with open(self.path, "r+b") as f:
+                f.truncate(fin_valido)
+        self.offset = fin_valido
+        self.records += aplicados
+        return aplicados
+
+    def write(self, data: bytes, registros: int = 1):
+        """Agrega una o varias líneas ya serializadas (sin fsync); visibles al instante para otros procesos"""
+        if self._file is None:
+            self._file = open(self.path, "ab")
+        self._file.write(data)
+        self._file.flush()
+        self.offset += len(data)
+        self.records += registros
+
+    def sync(self):
+        """Fuerza a disco lo escrito"""
+        if self._file is not None:
+            os.fsync(self._file.fileno())
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class GroupCommitWriter:
+    """
+    Escritor compartido por los diarios de un almacenamiento. Las mutaciones de una
+    transacción se escriben juntas al cerrarla (una escritura por archivo, todavía con
+    el lock tomado, para que otros procesos las vean antes de validar su próximo voto).
+    El fsync, que es lo caro, se agrupa entre transacciones:
+
+    - per_vote: cada petición fuerza el fsync al terminar (sin ventana de espera)
+    - batched: si hay otras transacciones en curso, la primera petición espera `window`
+      segundos a que terminen y hace un solo fsync para todas; todas reciben la
+      confirmación a la vez. Sin concurrencia no hay espera
+    - async: las peticiones no esperan; un hilo sincroniza cada `window` segundos
+      (una caída del equipo puede perder los últimos `window` segundos)
+    """
+
+    def __init__(self, mode: str = DURABILIDAD_EN_LOTE, window: float = 0.002):
+        if mode not in MODOS_DURABILIDAD:
+            raise ValueError(f"Modo de durabilidad inválido: {mode} (opciones: {', '.join(MODOS_DURABILIDAD)})")
+        self.mode = mode
+        self.window = window
+        self._cond = threading.Condition()
+        # Solo se toca con el lock del almacenamiento tomado
+        self._pending: List[Tuple[Journal, bytes]] = []
+        self._dirty: Set[Journal] = set()
+        self._seq = 0
+        self._durable_seq = 0
+        # Último registro de un lote cuyo fsync falló (sus diarios vuelven a quedar pendientes)
+        self._failed_seq = 0
+        self._syncing = False
+        self._active = 0
+        self._error: Optional[BaseException] = None
+        self._closed = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        if mode == DURABILIDAD_ASINCRONA:
+            self._thread = threading.Thread(target=self._run, name="simulated-journal", daemon=True)
+            self._thread.start()
+
+        # Métricas
+        self._batches = 0
+        self._records = 0
+        self._fsyncs = 0
+        self._sync_seconds = 0.0
+        self._max_batch = 0
+        self._batch_records = 0
+
+    def begin(self):
+        """Registra una transacción en curso (el líder de un lote solo espera si hay otras)"""
+        with self._cond:
+            self._active += 1
+
+    def end(self):
+        with self._cond:
+            self._active -= 1
+
+    def append(self, journal: Journal, registro: Dict[str, Any]):
+        """Encola un registro de la transacción en curso"""
+        self._pending.append((journal, encode_registro(registro)))
+
+    def pending(self) -> int:
+        """Registros encolados por la transacción en curso"""
+        return len(self._pending)
+
+    def write_pending(self) -> int:
+        """Escribe lo encolado por la transacción; devuelve la secuencia a esperar con wait()"""
+        if not self._pending:
+            return 0
+        lote = self._pending
+        self._pending = []
+        por_diario: Dict[Journal, List[bytes]] = {}
+        for journal, data in lote:
+            por_diario.setdefault(journal, []).append(data)
+        for journal, lineas in por_diario.items():
+            journal.write(b"".join(lineas), len(lineas))
+        with self._cond:
+            self._dirty.update(por_diario)
+            self._seq += len(lote)
+            self._records += len(lote)
+            return self._seq
+
+    def wait(self, seq: int):
+        """Bloquea hasta que el registro `seq` esté en disco (salvo en modo async)"""
+        if self.mode == DURABILIDAD_ASINCRONA or seq == 0:
+            return
+        with self._cond:
+            while self._durable_seq < seq:
+                if self._failed_seq >= seq:
+                    # Un lote que incluía este registro falló: no se confirma como durable
+                    raise self._error_de_sync()
+                if self._syncing:
+                    self._cond.wait()
+                    continue
+                # Esta petición lidera el próximo lote
+                self._syncing = True
+                break
+            else:
+                return
+        try:
+            if self.mode == DURABILIDAD_EN_LOTE and self.window > 0 and self._active > 1:
+                time.sleep(self.window)
+            self._sync()
+        finally:
+            with self._cond:
+                self._syncing = False
+                self._cond.notify_all()
+        with self._cond:
+            if self._durable_seq < seq:
+                raise self._error_de_sync()
+
+    def _error_de_sync(self) -> OSError:
+        return OSError(f"No se pudo sincronizar el diario del almacenamiento simulado: {self._error}")
+
+    def flush(self):
+        """Sincroniza todo lo escrito"""
+        with self._cond:
+            while self._syncing:
+                self._cond.wait()
+            self._syncing = True
+        try:
+            self._sync()
+        finally:
+            with self._cond:
+                self._syncing = False
+                self._cond.notify_all()
+
+    def _sync(self):
+        with self._cond:
+            diarios = self._dirty
+            hasta = self._seq
+            self._dirty = set()
+            registros = hasta - self._durable_seq
+        if not diarios:
+            return
+        started = time.monotonic()
+        error = None
+        try:
+            for journal in diarios:
+                journal.sync()
+        except Exception as e:
+            error = e
+            print(f"Error sincronizando el diario del almacenamiento simulado: {e}")
+        elapsed = time.monotonic() - started
+        with self._cond:
+            self._error = error
+            if error is None:
+                self._durable_seq = max(self._durable_seq, hasta)
+            else:
+                # Los diarios se vuelven a sincronizar en el próximo lote; quienes esperan
+                # registros de este lote reciben el error
+                self._dirty.update(diarios)
+                self._failed_seq = max(self._failed_seq, hasta)
+            self._batches += 1
+            self._batch_records += registros
+            self._fsyncs += len(diarios)
+            self._sync_seconds += elapsed
+            self._max_batch = max(self._max_batch, registros)
+
+    def _run(self):
+        while not self._closed.wait(self.window):
+            self.flush()
+
+    def close(self):
+        """Sincroniza lo pendiente y detiene el hilo de fondo"""
+        self._closed.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        self.flush()
+
+    def metrics(self) -> Dict[str, Any]:
+        """Lotes sincronizados, tamaño de lote y tiempo de fsync"""
+        with self._cond:
+            return {
+                "mode": self.mode,
+                "windowMs": self.window * 1000,
+                "unsyncedRecords": self._seq - self._durable_seq,
+                "records": self._records,
+                "batches": self._batches,
+                "avgBatchSize": round(self._batch_records / self._batches, 2) if self._batches else 0.0,
+                "maxBatchSize": self._max_batch,
+                "fsyncs": self._fsyncs,
+                "avgFsyncMs": round(self._sync_seconds / self._batches * 1000, 3) if self._batches else 0.0,
+                "lastError": str(self._error) if self._error is not None else None,
+            }
@@ -1,13 +1,21 @@
 """
 Sistema de almacenamiento simulado para votos cuando SQL Server no está disponible
-Usa archivos JSON para persistencia
+Usa archivos JSON para persistencia: cada mutación se agrega a un diario JSONL por colección
 """
+import bisect
+import functools
 import json
 import os
+import pickle
+import threading
+import time
+from contextlib import contextmanager
 from datetime import datetime
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Tuple
 from pathlib import Path
 
+from simulated_journal import DURABILIDAD_EN_LOTE, FileLock, GroupCommitWriter, Journal
+
 # Directorio para almacenar los datos simulados
 # Usar ruta absoluta o relativa al directorio actual
 STORAGE_DIR = Path(__file__).parent / "data_simulated"
@@ -23,18 +31,140 @@ CANDIDATOS_PRESIDENCIALES_FILE = STORAGE_DIR / "candidatos_presidenciales.json"
 CANDIDATOS_REGIONALES_FILE = STORAGE_DIR / "candidatos_regionales.json"
 CANDIDATOS_DISTRITALES_FILE = STORAGE_DIR / "candidatos_distritales.json"
 
+# Colección -> archivo JSON base (formato anterior, solo lectura hasta el primer snapshot).
+# Los diarios llevan el nombre de la colección (ver SimulatedStorage._ruta_diario)
+COLECCIONES = {
+    "votos_presidenciales": VOTOS_PRESIDENCIALES_FILE,
+    "votos_regionales": VOTOS_REGIONALES_FILE,
+    "votos_distritales": VOTOS_DISTRITALES_FILE,
+    "votos_nulos": VOTOS_NULOS_FILE,
+    "votantes": VOTANTES_FILE,
+    "candidatos_presidenciales": CANDIDATOS_PRESIDENCIALES_FILE,
+    "candidatos_regionales": CANDIDATOS_REGIONALES_FILE,
+    "candidatos_distritales": CANDIDATOS_DISTRITALES_FILE,
+}
+
+# Snapshot binario del estado completo: snapshot.<generación>.bin (ver SimulatedStorage.snapshot)
+_SNAPSHOT_FORMATO = 1
+
+def _sincronizar_directorio(directorio: Path):
+    """Asegura en disco el reemplazo atómico de un archivo (sin efecto en Windows)"""
+    if os.name == 'nt':
+        return
+    fd = os.open(directorio, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+# Colecciones con conteo de votos por votante
+_COLECCIONES_CONTADAS = ("votos_presidenciales", "votos_regionales", "votos_distritales")
+
 class SimulatedStorage:
-    """Almacenamiento simulado en memoria con persistencia JSON"""
-    
-    def __init__(self):
-        self._votos_presidenciales = self._load_json(VOTOS_PRESIDENCIALES_FILE, [])
-        self._votos_regionales = self._load_json(VOTOS_REGIONALES_FILE, [])
-        self._votos_distritales = self._load_json(VOTOS_DISTRITALES_FILE, [])
-        self._votos_nulos = self._load_json(VOTOS_NULOS_FILE, [])
-        self._votantes = self._load_json(VOTANTES_FILE, {})
-        self._candidatos_presidenciales = self._load_json(CANDIDATOS_PRESIDENCIALES_FILE, {})
-        self._candidatos_regionales = self._load_json(CANDIDATOS_REGIONALES_FILE, {})
-        self._candidatos_distritales = self._load_json(CANDIDATOS_DISTRITALES_FILE, {})
+    """
+    Almacenamiento simulado en memoria con persistencia JSON.
+    Varios procesos (uvicorn --workers N) pueden compartir el mismo directorio: cada uno
+    tiene su copia en memoria, y toda transacción toma un lock de archivo y aplica primero
+    lo que los demás agregaron a los diarios, así nunca valida contra datos viejos.
+    Cada tanto el estado completo se guarda en un snapshot binario y los diarios empiezan
+    de cero (una nueva generación), así el arranque solo reproduce lo posterior al snapshot.
+    """
+    
+    def __init__(self, durabilidad: str = DURABILIDAD_EN_LOTE, ventana_commit: float = 0.002,
+                 directorio: Path = STORAGE_DIR, snapshot_cada: int = 50000,
+                 snapshot_intervalo: float = 300.0):
+        # Serializa las secuencias verificar-y-escribir de los endpoints que corren en hilos
+        self.lock = threading.RLock()
+        self._tx_depth = 0
+        self._writer = GroupCommitWriter(durabilidad, ventana_commit)
+        self._directorio = directorio
+        self._journals: Dict[str, Journal] = {}
+        self._external_records = 0
+        directorio.mkdir(parents=True, exist_ok=True)
+        
+        # Snapshots
+        self.snapshot_cada = snapshot_cada
+        self.snapshot_intervalo = snapshot_intervalo
+        self._records_since_snapshot = 0
+        self._snapshots = 0
+        self._last_snapshot_ms = 0.0
+        self._last_snapshot_locked_ms = 0.0
+        self._last_snapshot_bytes = 0
+        self._last_load_ms = 0.0
+        self._replayed_on_load = 0
+        self._snapshot_lock = threading.Lock()
+        self._snapshot_wakeup = threading.Event()
+        self._closed = threading.Event()
+        
+        # Serializa las transacciones entre procesos
+        self._file_lock = FileLock(directorio / ".lock")
+        self._file_lock.acquire()
+        try:
+            self._cargar()
+        finally:
+            self._file_lock.release()
+        # Un arranque que tuvo que reproducir muchos diarios adelanta el próximo snapshot
+        self._contar_para_snapshot(self._replayed_on_load)
+        
+        self._snapshot_thread: Optional[threading.Thread] = None
+        if snapshot_cada > 0 or snapshot_intervalo > 0:
+            self._snapshot_thread = threading.Thread(
+                target=self._run_snapshots, name="simulated-snapshot", daemon=True
+            )
+            self._snapshot_thread.start()
+    
+    def _ruta_diario(self, nombre: str, generacion: int) -> Path:
+        """La generación 0 conserva el nombre original del diario (<colección>.jsonl)"""
+        if generacion == 0:
+            return self._directorio / f"{nombre}.jsonl"
+        return self._directorio / f"{nombre}.{generacion}.jsonl"
+    
+    def _cargar(self):
+        """
+        Reconstruye el estado (con el lock de archivo tomado): snapshot, o los JSON base si
+        aún no hay snapshot, y luego los diarios de su generación en adelante
+        """
+        inicio = time.monotonic()
+        for journal in self._journals.values():
+            journal.close()
+        
+        snapshot = self._leer_snapshot()
+        if snapshot is not None:
+            base = snapshot['generation']
+            for nombre in COLECCIONES:
+                setattr(self, f"_{nombre}", snapshot['colecciones'][nombre])
+            self._votante_por_dni = snapshot['indices']['votante_por_dni']
+            self._conteo_votos = snapshot['indices']['conteo_votos']
+            if 'ids_votantes' in snapshot['indices']:
+                self._ids_votantes = snapshot['indices']['ids_votantes']
+                self._ids_por_region = snapshot['indices']['ids_por_region']
+                self._ids_por_distrito = snapshot['indices']['ids_por_distrito']
+            else:
+                # Snapshot anterior a los índices por ID
+                self._reconstruir_orden_votantes()
+        else:
+            base = 0
+            for nombre, archivo in COLECCIONES.items():
+                # Las colecciones de votos son listas; votantes y candidatos, diccionarios por ID
+                datos = self._load_json(self._directorio / archivo.name, [] if nombre.startswith("votos_") else {})
+                setattr(self, f"_{nombre}", datos)
+            self._reconstruir_indices()
+        
+        # Un snapshot interrumpido puede dejar una generación nueva sin snapshot: se reproducen todas
+        generacion = max(base, self._file_lock.read_generation())
+        reproducidos = 0
+        for g in range(base, generacion + 1):
+            for nombre in COLECCIONES:
+                journal = Journal(self._ruta_diario(nombre, g))
+                reproducidos += journal.replay(functools.partial(self._aplicar_con_indices, nombre))
+                self._journals[nombre] = journal
+        self._borrar_diarios_anteriores(base)
+        
+        self._generation = generacion
+        self._version = self._file_lock.read_version()
+        self._records_since_snapshot = 0
+        self._replayed_on_load = reproducidos
+        self._last_load_ms = (time.monotonic() - inicio) * 1000
     
     def _load_json(self, filepath: Path, default: Any) -> Any:
         """Carga datos desde un archivo JSON"""
@@ -46,13 +176,375 @@ class SimulatedStorage:
             print(f"Error cargando {filepath}: {e}")
         return default if not isinstance(default, dict) else default.copy()
     
-    def _save_json(self, filepath: Path, data: Any):
-        """Guarda datos en un archivo JSON"""
+    @staticmethod
+    def _aplicar(datos: Any, registro: Dict):
+        """Aplica un registro del diario: en listas es el elemento agregado, en diccionarios una operación"""
+        if isinstance(datos, list):
+            datos.append(registro)
+            return
+        op = registro['op']
+        if op == 'put':
+            datos[registro['key']] = registro['value']
+        elif op == 'set':
+            if registro['key'] in datos:
+                datos[registro['key']][registro['field']] = registro['value']
+        elif op == 'incr':
+            if registro['key'] in datos:
+                item = datos[registro['key']]
+                item[registro['field']] = item.get(registro['field'], 0) + registro['n']
+    
+    # ========== ÍNDICES ==========
+    # DNI -> clave del votante, y por categoría: id_votantes -> cantidad de votos.
+    # Reemplazan los recorridos lineales de get_votante_by_dni y count_votos_*.
+    # IDs de votante ordenados (todos, por región y por distrito): las páginas de
+    # get_votantes_pagina y get_votantes_desde se ubican con bisect.
+    def _reconstruir_indices(self):
+        """Reconstruye los índices desde los datos cargados"""
+        self._votante_por_dni: Dict[str, str] = {}
+        for clave, votante in self._votantes.items():
+            self._votante_por_dni.setdefault(votante.get('dni'), clave)
+        self._reconstruir_orden_votantes()
+        self._conteo_votos: Dict[str, Dict[Any, int]] = {}
+        for nombre in _COLECCIONES_CONTADAS:
+            conteo: Dict[Any, int] = {}
+            for voto in getattr(self, f"_{nombre}"):
+                id_votantes = voto.get('id_votantes')
+                conteo[id_votantes] = conteo.get(id_votantes, 0) + 1
+            self._conteo_votos[nombre] = conteo
+    
+    def _reconstruir_orden_votantes(self):
+        self._ids_votantes: List[int] = sorted(int(clave) for clave in self._votantes)
+        self._ids_por_region: Dict[Any, List[int]] = {}
+        self._ids_por_distrito: Dict[Any, List[int]] = {}
+        for id_votantes in self._ids_votantes:
+            votante = self._votantes[str(id_votantes)]
+            self._ids_por_region.setdefault(votante.get('region'), []).append(id_votantes)
+            self._ids_por_distrito.setdefault(votante.get('distrito'), []).append(id_votantes)
+    
+    def _listas_por_id(self, votante: Dict) -> Tuple[List[int], ...]:
+        return (
+            self._ids_votantes,
+            self._ids_por_region.setdefault(votante.get('region'), []),
+            self._ids_por_distrito.setdefault(votante.get('distrito'), []),
+        )
+    
+    @staticmethod
+    def _insertar_id(ids: List[int], id_votantes: int):
+        # Los IDs nuevos casi siempre son los mayores: se agregan al final
+        if not ids or ids[-1] < id_votantes:
+            ids.append(id_votantes)
+            return
+        i = bisect.bisect_left(ids, id_votantes)
+        if i == len(ids) or ids[i] != id_votantes:
+            ids.insert(i, id_votantes)
+    
+    @staticmethod
+    def _quitar_id(ids: List[int], id_votantes: int):
+        i = bisect.bisect_left(ids, id_votantes)
+        if i < len(ids) and ids[i] == id_votantes:
+            del ids[i]
+    
+    def _indexar(self, nombre: str, registro: Dict):
+        """Actualiza los índices con una mutación, antes de aplicarla"""
+        if nombre in _COLECCIONES_CONTADAS:
+            conteo = self._conteo_votos[nombre]
+            id_votantes = registro.get('id_votantes')
+            conteo[id_votantes] = conteo.get(id_votantes, 0) + 1
+        elif nombre == 'votantes' and registro['op'] == 'put':
+            clave = registro['key']
+            anterior = self._votantes.get(clave)
+            if anterior is not None and self._votante_por_dni.get(anterior.get('dni')) == clave:
+                del self._votante_por_dni[anterior.get('dni')]
+            self._votante_por_dni.setdefault(registro['value'].get('dni'), clave)
+            id_votantes = int(clave)
+            if anterior is not None:
+                for ids in self._listas_por_id(anterior):
+                    self._quitar_id(ids, id_votantes)
+            for ids in self._listas_por_id(registro['value']):
+                self._insertar_id(ids, id_votantes)
+    
+    def _aplicar_con_indices(self, nombre: str, registro: Dict):
+        self._indexar(nombre, registro)
+        self._aplicar(getattr(self, f"_{nombre}"), registro)
+    
+    def _registrar(self, nombre: str, registro: Dict):
+        """Aplica la mutación en memoria y la encola para el diario de la colección"""
+        if not self._tx_depth:
+            with self.transaction():
+                self._registrar(nombre, registro)
+            return
+        self._aplicar_con_indices(nombre, registro)
+        self._writer.append(self._journals[nombre], registro)
+    
+    # ========== TRANSACCIONES Y DURABILIDAD ==========
+    @contextmanager
+    def transaction(self):
+        """
+        Bloque verificar-y-escribir: toma el lock del proceso y el de archivo, aplica lo
+        que otros procesos escribieron y, al salir, escribe lo propio antes de soltar los
+        locks. Después espera a que esté en disco según el modo de durabilidad; esa espera
+        ocurre ya sin locks, para que las peticiones concurrentes compartan el mismo fsync.
+        Las transacciones anidadas forman parte de la exterior.
+        """
+        self._writer.begin()
         try:
-            with open(filepath, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=2, ensure_ascii=False, default=str)
-        except Exception as e:
-            print(f"Error guardando {filepath}: {e}")
+            with self.lock:
+                if self._tx_depth:
+                    self._tx_depth += 1
+                    try:
+                        yield self
+                    finally:
+                        self._tx_depth -= 1
+                    return
+                self._file_lock.acquire()
+                self._tx_depth = 1
+                try:
+                    self._sincronizar()
+                    yield self
+                finally:
+                    try:
+                        # También tras un error: lo ya aplicado en memoria debe quedar en el diario
+                        registros = self._writer.pending()
+                        seq = self._writer.write_pending()
+                        if seq:
+                            self._version += 1
+                            self._file_lock.write_version(self._version)
+                            self._contar_para_snapshot(registros)
+                    finally:
+                        self._tx_depth = 0
+                        self._file_lock.release()
+            self._writer.wait(seq)
+        finally:
+            self._writer.end()
+    
+    @contextmanager
+    def lectura(self):
+        """
+        Bloque de solo lectura: toma el lock del proceso y aplica lo que otros procesos
+        escribieron, igual que transaction(), pero suelta el lock de archivo tras sincronizar
+        y no escribe ni espera al disco. Los datos viven en memoria del proceso: una lectura
+        espera a las transacciones del mismo proceso que estén en curso
+        """
+        with self.lock:
+            if self._tx_depth:
+                yield self
+                return
+            self._file_lock.acquire()
+            try:
+                self._sincronizar()
+            finally:
+                self._file_lock.release()
+            yield self
+    
+    def _sincronizar(self):
+        """
+        Aplica lo que otros procesos escribieron (con el lock de archivo tomado). Si otro
+        proceso hizo un snapshot, sus diarios anteriores ya no existen: se recarga todo.
+        """
+        version = self._file_lock.read_version()
+        if version == self._version:
+            return
+        if self._file_lock.read_generation() != self._generation:
+            self._cargar()
+        else:
+            externos = 0
+            for nombre, journal in self._journals.items():
+                externos += journal.replay(functools.partial(self._aplicar_con_indices, nombre))
+            # No cuentan para el snapshot: cada proceso cuenta solo lo que escribe. Si todos
+            # contaran todo, llegarían al umbral a la vez y cada snapshot haría recargar a los demás
+            self._external_records += externos
+        self._version = version
+    
+    # ========== SNAPSHOTS ==========
+    def _rutas_snapshot(self) -> List[Tuple[int, Path]]:
+        """Snapshots completos en el directorio, (generación, ruta), del más nuevo al más viejo"""
+        rutas = []
+        for ruta in self._directorio.glob("snapshot.*.bin"):
+            try:
+                rutas.append((int(ruta.name.split(".")[1]), ruta))
+            except ValueError:
+                continue
+        return sorted(rutas, reverse=True)
+    
+    def _leer_snapshot(self) -> Optional[Dict]:
+        rutas = self._rutas_snapshot()
+        if not rutas:
+            return None
+        with open(rutas[0][1], 'rb') as f:
+            snapshot = pickle.load(f)
+        if snapshot.get('formato') != _SNAPSHOT_FORMATO:
+            raise ValueError(f"Formato de snapshot no soportado en {rutas[0][1]}: {snapshot.get('formato')}")
+        return snapshot
+    
+    def _borrar_diarios_anteriores(self, generacion: int):
+        """Elimina los diarios y snapshots que el snapshot de `generacion` ya incluye"""
+        for g in range(generacion):
+            for nombre in COLECCIONES:
+                try:
+                    self._ruta_diario(nombre, g).unlink()
+                except FileNotFoundError:
+                    pass
+        for g, ruta in self._rutas_snapshot():
+            if g < generacion:
+                try:
+                    ruta.unlink()
+                except FileNotFoundError:
+                    pass
+    
+    def _contar_para_snapshot(self, registros: int):
+        self._records_since_snapshot += registros
+        if self.snapshot_cada > 0 and self._records_since_snapshot >= self.snapshot_cada:
+            self._snapshot_wakeup.set()
+    
+    def snapshot(self, generacion_vista: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """
+        Guarda el estado completo en un snapshot binario y empieza una nueva generación de
+        diarios. Con los locks tomados solo se abre la generación nueva y se copia el estado
+        (copia superficial: los votos no cambian una vez registrados); la serialización y
+        el fsync ocurren sin bloquear los votos. Pensado para caídas a mitad de camino:
+        mientras el snapshot nuevo no exista, el arranque usa el anterior y reproduce todas
+        las generaciones de diarios desde la suya; los diarios viejos se borran al final.
+        Con `generacion_vista`, no hace nada (devuelve None) si otro proceso ya empezó una
+        generación nueva desde entonces: su snapshot ya incluye lo de este proceso.
+        """
+        with self._snapshot_lock:
+            inicio = time.monotonic()
+            with self.lock:
+                if self._tx_depth:
+                    raise RuntimeError("No se puede hacer un snapshot dentro de una transacción")
+                self._file_lock.acquire()
+                try:
+                    self._sincronizar()
+                    if generacion_vista is not None and self._generation != generacion_vista:
+                        return None
+                    # Lo escrito en la generación que se cierra queda en disco antes de cambiarla
+                    self._writer.flush()
+                    generacion = self._generation + 1
+                    self._file_lock.write_generation(generacion)
+                    self._version += 1
+                    self._file_lock.write_version(self._version)
+                    for journal in self._journals.values():
+                        journal.close()
+                    self._journals = {
+                        nombre: Journal(self._ruta_diario(nombre, generacion)) for nombre in COLECCIONES
+                    }
+                    self._generation = generacion
+                    self._records_since_snapshot = 0
+                    estado = self._copiar_estado()
+                finally:
+                    self._file_lock.release()
+                self._last_snapshot_locked_ms = (time.monotonic() - inicio) * 1000
+            
+            contenido = pickle.dumps({
+                'formato': _SNAPSHOT_FORMATO,
+                'generation': generacion,
+                'creado': datetime.now().isoformat(),
+                **estado,
+            }, protocol=pickle.HIGHEST_PROTOCOL)
+            ruta = self._directorio / f"snapshot.{generacion}.bin"
+            temporal = ruta.with_suffix('.tmp')
+            with open(temporal, 'wb') as f:
+                f.write(contenido)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temporal, ruta)
+            _sincronizar_directorio(self._directorio)
+            
+            with self.lock:
+                self._file_lock.acquire()
+                try:
+                    # Si otro proceso ya guardó uno más nuevo, el borrado se limita a lo que este incluye
+                    self._borrar_diarios_anteriores(generacion)
+                finally:
+                    self._file_lock.release()
+            
+            self._snapshots += 1
+            self._last_snapshot_ms = (time.monotonic() - inicio) * 1000
+            self._last_snapshot_bytes = len(contenido)
+            return {
+                "generation": generacion,
+                "bytes": len(contenido),
+                "ms": round(self._last_snapshot_ms, 3),
+                "lockedMs": round(self._last_snapshot_locked_ms, 3),
+            }
+    
+    def _copiar_estado(self) -> Dict[str, Any]:
+        """Copia del estado que no cambia aunque sigan llegando votos"""
+        colecciones = {}
+        for nombre in COLECCIONES:
+            datos = getattr(self, f"_{nombre}")
+            if isinstance(datos, list):
+                colecciones[nombre] = list(datos)
+            else:
+                # Votantes y candidatos se modifican en el lugar (fecha_voto, cantidad_votos)
+                colecciones[nombre] = {clave: dict(valor) for clave, valor in datos.items()}
+        return {
+            'colecciones': colecciones,
+            'indices': {
+                'votante_por_dni': dict(self._votante_por_dni),
+                'conteo_votos': {nombre: dict(conteo) for nombre, conteo in self._conteo_votos.items()},
+                'ids_votantes': list(self._ids_votantes),
+                'ids_por_region': {region: list(ids) for region, ids in self._ids_por_region.items()},
+                'ids_por_distrito': {distrito: list(ids) for distrito, ids in self._ids_por_distrito.items()},
+            },
+        }
+    
+    def _run_snapshots(self):
+        """Hace un snapshot cada `snapshot_intervalo` segundos o al acumular `snapshot_cada` registros"""
+        espera = self.snapshot_intervalo if self.snapshot_intervalo > 0 else None
+        while not self._closed.is_set():
+            self._snapshot_wakeup.wait(espera)
+            self._snapshot_wakeup.clear()
+            generacion = self._generation
+            if self._closed.is_set() or not self._records_since_snapshot:
+                continue
+            try:
+                self.snapshot(generacion)
+            except Exception as e:
+                print(f"Error guardando snapshot del almacenamiento simulado: {e}")
+    
+    def flush(self):
+        """Escribe y sincroniza todas las mutaciones pendientes"""
+        self._writer.flush()
+    
+    def close(self):
+        """Vuelca lo pendiente y cierra los diarios"""
+        self._closed.set()
+        self._snapshot_wakeup.set()
+        if self._snapshot_thread is not None:
+            self._snapshot_thread.join(timeout=30)
+        self._writer.close()
+        for journal in self._journals.values():
+            journal.close()
+        self._file_lock.close()
+    
+    def metrics(self) -> Dict[str, Any]:
+        """Tamaño de las colecciones y estado del escritor"""
+        with self.lock:
+            return {
+                "engine": "json",
+                "votantes": len(self._votantes),
+                "votos": {nombre: len(getattr(self, f"_{nombre}")) for nombre in COLECCIONES if nombre.startswith("votos_")},
+                "journalRecords": {nombre: journal.records for nombre, journal in self._journals.items()},
+                "externalRecords": self._external_records,
+                "processLock": {
+                    "acquisitions": self._file_lock.acquisitions,
+                    "avgWaitMs": round(
+                        self._file_lock.wait_seconds / self._file_lock.acquisitions * 1000, 3
+                    ) if self._file_lock.acquisitions else 0.0,
+                },
+                "writer": self._writer.metrics(),
+                "snapshots": {
+                    "generation": self._generation,
+                    "taken": self._snapshots,
+                    "recordsSinceSnapshot": self._records_since_snapshot,
+                    "lastSnapshotMs": round(self._last_snapshot_ms, 3),
+                    "lastSnapshotLockedMs": round(self._last_snapshot_locked_ms, 3),
+                    "lastSnapshotBytes": self._last_snapshot_bytes,
+                    "lastLoadMs": round(self._last_load_ms, 3),
+                    "replayedOnLoad": self._replayed_on_load,
+                },
+            }
     
     # ========== VOTANTES ==========
     def get_votante(self, id_votantes: int) -> Optional[Dict]:
@@ -61,63 +553,100 @@ class SimulatedStorage:
     
     def get_votante_by_dni(self, dni: str) -> Optional[Dict]:
         """Obtiene un votante por DNI"""
-        for votante in self._votantes.values():
-            if votante.get('dni') == dni:
-                return votante
-        return None
+        clave = self._votante_por_dni.get(dni)
+        return self._votantes.get(clave) if clave is not None else None
+    
+    def add_votante(self, votante: Dict) -> Dict:
+        """Agrega (o reemplaza) un votante"""
+        self._registrar('votantes', {'op': 'put', 'key': str(votante['id_votantes']), 'value': votante})
+        return votante
     
     def update_votante_fecha_voto(self, id_votantes: int, fecha_voto: datetime):
         """Actualiza la fecha de voto de un votante"""
         if str(id_votantes) in self._votantes:
-            self._votantes[str(id_votantes)]['fecha_voto'] = fecha_voto.isoformat()
-            self._save_json(VOTANTES_FILE, self._votantes)
+            self._registrar('votantes', {
+                'op': 'set', 'key': str(id_votantes), 'field': 'fecha_voto', 'value': fecha_voto.isoformat()
+            })
     
     # ========== CANDIDATOS ==========
     def get_candidato_presidencial(self, id_candidato: int) -> Optional[Dict]:
         """Obtiene un candidato presidencial"""
         return self._candidatos_presidenciales.get(str(id_candidato))
     
+    def add_candidato_presidencial(self, id_candidato: int, nombres: str, apellidos: str) -> Dict:
+        """Agrega un candidato presidencial sin votos"""
+        candidato = {
+            'id_candidato': id_candidato,
+            'nombres': nombres,
+            'apellidos': apellidos,
+            'cantidad_votos': 0
+        }
+        self._registrar('candidatos_presidenciales', {'op': 'put', 'key': str(id_candidato), 'value': candidato})
+        return candidato
+    
     def get_candidato_regional(self, id_candidato: int) -> Optional[Dict]:
         """Obtiene un candidato regional"""
         return self._candidatos_regionales.get(str(id_candidato))
     
+    def add_candidato_regional(self, id_candidato: int, nombres: str, apellidos: str) -> Dict:
+        """Agrega un candidato regional sin votos"""
+        candidato = {
+            'id_candidato': id_candidato,
+            'nombres': nombres,
+            'apellidos': apellidos,
+            'cantidad_votos': 0
+        }
+        self._registrar('candidatos_regionales', {'op': 'put', 'key': str(id_candidato), 'value': candidato})
+        return candidato
+    
     def get_candidato_distrital(self, id_candidato: int) -> Optional[Dict]:
         """Obtiene un candidato distrital"""
         return self._candidatos_distritales.get(str(id_candidato))
     
+    def add_candidato_distrital(self, id_candidato: int, nombres: str, apellidos: str) -> Dict:
+        """Agrega un candidato distrital sin votos"""
+        candidato = {
+            'id_candidato': id_candidato,
+            'nombres': nombres,
+            'apellidos': apellidos,
+            'cantidad_votos': 0
+        }
+        self._registrar('candidatos_distritales', {'op': 'put', 'key': str(id_candidato), 'value': candidato})
+        return candidato
+    
     def update_candidato_presidencial_votos(self, id_candidato: int, increment: int = 1):
         """Incrementa los votos de un candidato presidencial"""
         if str(id_candidato) in self._candidatos_presidenciales:
-            self._candidatos_presidenciales[str(id_candidato)]['cantidad_votos'] = \
-                self._candidatos_presidenciales[str(id_candidato)].get('cantidad_votos', 0) + increment
-            self._save_json(CANDIDATOS_PRESIDENCIALES_FILE, self._candidatos_presidenciales)
+            self._registrar('candidatos_presidenciales', {
+                'op': 'incr', 'key': str(id_candidato), 'field': 'cantidad_votos', 'n': increment
+            })
     
     def update_candidato_regional_votos(self, id_candidato: int, increment: int = 1):
         """Incrementa los votos de un candidato regional"""
         if str(id_candidato) in self._candidatos_regionales:
-            self._candidatos_regionales[str(id_candidato)]['cantidad_votos'] = \
-                self._candidatos_regionales[str(id_candidato)].get('cantidad_votos', 0) + increment
-            self._save_json(CANDIDATOS_REGIONALES_FILE, self._candidatos_regionales)
+            self._registrar('candidatos_regionales', {
+                'op': 'incr', 'key': str(id_candidato), 'field': 'cantidad_votos', 'n': increment
+            })
     
     def update_candidato_distrital_votos(self, id_candidato: int, increment: int = 1):
         """Incrementa los votos de un candidato distrital"""
         if str(id_candidato) in self._candidatos_distritales:
-            self._candidatos_distritales[str(id_candidato)]['cantidad_votos'] = \
-                self._candidatos_distritales[str(id_candidato)].get('cantidad_votos', 0) + increment
-            self._save_json(CANDIDATOS_DISTRITALES_FILE, self._candidatos_distritales)
+            self._registrar('candidatos_distritales', {
+                'op': 'incr', 'key': str(id_candidato), 'field': 'cantidad_votos', 'n': increment
+            })
     
     # ========== VOTOS ==========
     def count_votos_presidenciales(self, id_votantes: int) -> int:
         """Cuenta los votos presidenciales de un votante"""
-        return sum(1 for v in self._votos_presidenciales if v.get('id_votantes') == id_votantes)
+        return self._conteo_votos['votos_presidenciales'].get(id_votantes, 0)
     
     def count_votos_regionales(self, id_votantes: int) -> int:
         """Cuenta los votos regionales de un votante"""
-        return sum(1 for v in self._votos_regionales if v.get('id_votantes') == id_votantes)
+        return self._conteo_votos['votos_regionales'].get(id_votantes, 0)
     
     def count_votos_distritales(self, id_votantes: int) -> int:
         """Cuenta los votos distritales de un votante"""
-        return sum(1 for v in self._votos_distritales if v.get('id_votantes') == id_votantes)
+        return self._conteo_votos['votos_distritales'].get(id_votantes, 0)
     
     def add_voto_presidencial(self, id_votantes: int, id_candidato: int, nombre: str, apellido: str):
         """Agrega un voto presidencial"""
@@ -128,8 +657,7 @@ class SimulatedStorage:
             'apellido': apellido,
             'fecha': datetime.now().isoformat()
         }
-        self._votos_presidenciales.append(voto)
-        self._save_json(VOTOS_PRESIDENCIALES_FILE, self._votos_presidenciales)
+        self._registrar('votos_presidenciales', voto)
     
     def add_voto_regional(self, id_votantes: int, id_candidato_regional: int, nombre: str, apellido: str):
         """Agrega un voto regional"""
@@ -140,8 +668,7 @@ class SimulatedStorage:
             'apellido': apellido,
             'fecha': datetime.now().isoformat()
         }
-        self._votos_regionales.append(voto)
-        self._save_json(VOTOS_REGIONALES_FILE, self._votos_regionales)
+        self._registrar('votos_regionales', voto)
     
     def add_voto_distrital(self, id_votantes: int, id_candidato_distrital: int, nombre: str, apellido: str):
         """Agrega un voto distrital"""
@@ -152,8 +679,7 @@ class SimulatedStorage:
             'apellido': apellido,
             'fecha': datetime.now().isoformat()
         }
-        self._votos_distritales.append(voto)
-        self._save_json(VOTOS_DISTRITALES_FILE, self._votos_distritales)
+        self._registrar('votos_distritales', voto)
     
     def add_voto_nulo(self, id_votantes: int, dni: str):
         """Agrega un voto nulo"""
@@ -162,10 +688,41 @@ class SimulatedStorage:
             'dni': dni,
             'fecha': datetime.now().isoformat()
         }
-        self._votos_nulos.append(voto)
-        self._save_json(VOTOS_NULOS_FILE, self._votos_nulos)
+        self._registrar('votos_nulos', voto)
     
     # ========== LISTADOS ==========
+    def get_all_votantes(self) -> List[Dict]:
+        """Obtiene todos los votantes"""
+        return list(self._votantes.values())
+    
+    def get_votantes_pagina(self, limit: int, despues_de: Optional[int] = None, region: Optional[str] = None,
+                            distrito: Optional[str] = None) -> List[Dict]:
+        """Hasta `limit` votantes con ID menor que `despues_de`, del más reciente al más antiguo"""
+        if distrito is not None:
+            ids = self._ids_por_distrito.get(distrito, [])
+        elif region is not None:
+            ids = self._ids_por_region.get(region, [])
+        else:
+            ids = self._ids_votantes
+        fin = len(ids) if despues_de is None else bisect.bisect_left(ids, despues_de)
+        pagina = []
+        # Con región y distrito se recorre el distrito: casi todos sus votantes son de esa región
+        while fin > 0 and len(pagina) < limit:
+            fin -= 1
+            votante = self._votantes[str(ids[fin])]
+            if region is None or votante.get('region') == region:
+                pagina.append(votante)
+        return pagina
+    
+    def get_votantes_desde(self, despues_de: int, limit: int) -> List[Dict]:
+        """Hasta `limit` votantes con ID mayor que `despues_de`, del más antiguo al más reciente"""
+        inicio = bisect.bisect_right(self._ids_votantes, despues_de)
+        return [self._votantes[str(id_votantes)] for id_votantes in self._ids_votantes[inicio:inicio + limit]]
+    
+    def max_id_votantes(self) -> int:
+        """Mayor ID de votante registrado (0 si no hay ninguno)"""
+        return self._ids_votantes[-1] if self._ids_votantes else 0
+    
     def get_all_candidatos_presidenciales(self) -> List[Dict]:
         """Obtiene todos los candidatos presidenciales"""
         return list(self._candidatos_presidenciales.values())
@@ -189,14 +746,71 @@ class SimulatedStorage:
     def get_all_votos_distritales(self) -> List[Dict]:
         """Obtiene todos los votos distritales"""
         return self._votos_distritales.copy()
+    
+    def get_all_votos_nulos(self) -> List[Dict]:
+        """Obtiene todos los votos nulos"""
+        return self._votos_nulos.copy()
+    
+    def count_votantes(self) -> int:
+        """Cantidad de votantes registrados"""
+        return len(self._votantes)
+    
+    def count_votos(self, nombre: str) -> int:
+        """Cantidad de votos de una colección (votos_presidenciales, ..., votos_nulos)"""
+        return len(self._coleccion_votos(nombre))
+    
+    def get_votos_desde(self, nombre: str, desde: int, limit: int) -> Tuple[List[Dict], int]:
+        """
+        Hasta `limit` votos de una colección registrados después del cursor `desde`, en orden de
+        registro, y el cursor para la página siguiente (aquí, la posición en la colección)
+        """
+        votos = self._coleccion_votos(nombre)[desde:desde + limit]
+        return votos, desde + len(votos)
+    
+    def _coleccion_votos(self, nombre: str) -> List[Dict]:
+        if not nombre.startswith("votos_") or nombre not in COLECCIONES:
+            raise KeyError(nombre)
+        return getattr(self, f"_{nombre}")
+
+# Motores disponibles para el modo simulado
+MOTOR_JSON = "json"
+MOTOR_SQLITE = "sqlite"
 
 # Instancia global del almacenamiento simulado
 _simulated_storage = None
 
+_simulated_storage_lock = threading.Lock()
+
 def get_simulated_storage() -> SimulatedStorage:
-    """Obtiene la instancia del almacenamiento simulado"""
+    """
+    Obtiene la instancia del almacenamiento simulado.
+    SIMULATED_ENGINE elige el motor: `json` (diarios JSONL, por defecto) o `sqlite` (ver sqlite_storage.py)
+    """
     global _simulated_storage
     if _simulated_storage is None:
-        _simulated_storage = SimulatedStorage()
+        with _simulated_storage_lock:
+            if _simulated_storage is None:
+                motor = os.getenv("SIMULATED_ENGINE", MOTOR_JSON).strip().lower()
+                durabilidad = os.getenv("SIMULATED_DURABILITY", DURABILIDAD_EN_LOTE)
+                if motor == MOTOR_SQLITE:
+                    from sqlite_storage import SQLiteStorage
+                    _simulated_storage = SQLiteStorage(
+                        Path(os.getenv("SIMULATED_SQLITE_PATH", str(STORAGE_DIR / "sistema_electoral.db"))),
+                        durabilidad=durabilidad
+                    )
+                elif motor == MOTOR_JSON:
+                    _simulated_storage = SimulatedStorage(
+                        durabilidad=durabilidad,
+                        ventana_commit=float(os.getenv("SIMULATED_COMMIT_WINDOW_MS", "2")) / 1000,
+                        snapshot_cada=int(os.getenv("SIMULATED_SNAPSHOT_EVERY", "50000")),
+                        snapshot_intervalo=float(os.getenv("SIMULATED_SNAPSHOT_INTERVAL", "300"))
+                    )
+                else:
+                    raise ValueError(f"Motor simulado inválido: {motor} (opciones: {MOTOR_JSON}, {MOTOR_SQLITE})")
     return _simulated_storage
 
+def close_simulated_storage():
+    """Vuelca y cierra el almacenamiento simulado si llegó a usarse"""
+    if _simulated_storage is not None:
+        _simulated_storage.close()
+
@@ -0,0 +1,556 @@
+"""
+Motor local alternativo para el modo simulado: SQLite en modo WAL
+Mismas tablas que SQLQuery2.sql (VOTANTES, VOTO_*, CANDIDATO_*) con índices y sentencias
+preparadas; expone la misma interfaz que SimulatedStorage, así los endpoints no cambian
+"""
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from simulated_journal import DURABILIDAD_ASINCRONA, DURABILIDAD_EN_LOTE, MODOS_DURABILIDAD
+
+# Esquema de SQLQuery2.sql. Las columnas que el modo simulado no conoce (p. ej. el votante
+# que se crea al votar solo tiene ID y DNI) admiten NULL; el resto de tipos y claves se conserva.
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS VOTANTES (
+    ID_VOTANTES INTEGER PRIMARY KEY,
+    DNI VARCHAR(20) NOT NULL,
+    NOMBRES VARCHAR(100),
+    APELLIDOS VARCHAR(100),
+    FECHA_NACIMIENTO DATE,
+    REGION VARCHAR(100),
+    DISTRITO VARCHAR(100),
+    SEXO CHAR(1),
+    CANDIDATO_VOTADO VARCHAR(100),
+    FECHA_VOTO DATETIME
+);
+CREATE TABLE IF NOT EXISTS VOTO_NULO (
+    ID_VOTO_NULO INTEGER PRIMARY KEY,
+    ID_VOTANTES INT NOT NULL,
+    DNI VARCHAR(20) NOT NULL,
+    FECHA DATETIME,
+    FOREIGN KEY (ID_VOTANTES) REFERENCES VOTANTES(ID_VOTANTES)
+);
+CREATE TABLE IF NOT EXISTS CANDIDATO_PRESIDENCIAL (
+    ID_CANDIDATO_PRESIDENCIAL INTEGER PRIMARY KEY,
+    NOMBRES VARCHAR(100) NOT NULL,
+    APELLIDOS VARCHAR(100) NOT NULL,
+    CANTIDAD_VOTOS INT DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS CANDIDATO_REGIONAL (
+    ID_CANDIDATO_REGIONAL INTEGER PRIMARY KEY,
+    NOMBRES VARCHAR(100) NOT NULL,
+    APELLIDOS VARCHAR(100) NOT NULL,
+    CANTIDAD_VOTOS INT DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS CANDIDATO_DISTRITAL (
+    ID_CANDIDATO_DISTRITAL INTEGER PRIMARY KEY,
+    NOMBRES VARCHAR(100) NOT NULL,
+    APELLIDOS VARCHAR(100) NOT NULL,
+    CANTIDAD_VOTOS INT DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS VOTO_PRESIDENCIAL (
+    ID_VOTO_PRESIDENCIAL INTEGER PRIMARY KEY,
+    ID_VOTANTES INT NOT NULL,
+    ID_CANDIDATO INT NOT NULL,
+    NOMBRE VARCHAR(100) NOT NULL,
+    APELLIDO VARCHAR(100) NOT NULL,
+    FECHA DATETIME,
+    FOREIGN KEY (ID_VOTANTES) REFERENCES VOTANTES(ID_VOTANTES),
+    FOREIGN KEY (ID_CANDIDATO) REFERENCES CANDIDATO_PRESIDENCIAL(ID_CANDIDATO_PRESIDENCIAL)
+);
+CREATE TABLE IF NOT EXISTS VOTO_REGIONAL (
+    ID_VOTO_REGIONAL INTEGER PRIMARY KEY,
+    ID_VOTANTES INT NOT NULL,
+    ID_CANDIDATO_REGIONAL INT NOT NULL,
+    NOMBRE VARCHAR(100) NOT NULL,
+    APELLIDO VARCHAR(100) NOT NULL,
+    REGION VARCHAR(100),
+    FECHA DATETIME,
+    FOREIGN KEY (ID_VOTANTES) REFERENCES VOTANTES(ID_VOTANTES),
+    FOREIGN KEY (ID_CANDIDATO_REGIONAL) REFERENCES CANDIDATO_REGIONAL(ID_CANDIDATO_REGIONAL)
+);
+CREATE TABLE IF NOT EXISTS VOTO_DISTRITAL (
+    ID_VOTO_DISTRITAL INTEGER PRIMARY KEY,
+    ID_VOTANTES INT NOT NULL,
+    ID_CANDIDATO_DISTRITAL INT NOT NULL,
+    NOMBRE VARCHAR(100) NOT NULL,
+    APELLIDO VARCHAR(100) NOT NULL,
+    DISTRITO VARCHAR(100),
+    FECHA DATETIME,
+    FOREIGN KEY (ID_VOTANTES) REFERENCES VOTANTES(ID_VOTANTES),
+    FOREIGN KEY (ID_CANDIDATO_DISTRITAL) REFERENCES CANDIDATO_DISTRITAL(ID_CANDIDATO_DISTRITAL)
+);
+CREATE INDEX IF NOT EXISTS IX_VOTANTES_DNI ON VOTANTES (DNI);
+CREATE INDEX IF NOT EXISTS IX_VOTANTES_REGION_DISTRITO ON VOTANTES (REGION, DISTRITO, ID_VOTANTES);
+CREATE INDEX IF NOT EXISTS IX_VOTANTES_DISTRITO ON VOTANTES (DISTRITO, ID_VOTANTES);
+CREATE INDEX IF NOT EXISTS IX_VOTO_NULO_VOTANTE ON VOTO_NULO (ID_VOTANTES);
+CREATE INDEX IF NOT EXISTS IX_VOTO_PRESIDENCIAL_VOTANTE ON VOTO_PRESIDENCIAL (ID_VOTANTES);
+CREATE INDEX IF NOT EXISTS IX_VOTO_PRESIDENCIAL_CANDIDATO ON VOTO_PRESIDENCIAL (ID_CANDIDATO);
+CREATE INDEX IF NOT EXISTS IX_VOTO_REGIONAL_VOTANTE ON VOTO_REGIONAL (ID_VOTANTES);
+CREATE INDEX IF NOT EXISTS IX_VOTO_REGIONAL_CANDIDATO ON VOTO_REGIONAL (ID_CANDIDATO_REGIONAL);
+CREATE INDEX IF NOT EXISTS IX_VOTO_DISTRITAL_VOTANTE ON VOTO_DISTRITAL (ID_VOTANTES);
+CREATE INDEX IF NOT EXISTS IX_VOTO_DISTRITAL_CANDIDATO ON VOTO_DISTRITAL (ID_CANDIDATO_DISTRITAL);
+"""
+
+# Tabla y columnas de cada categoría (nombres como en SimulatedStorage)
+_CATEGORIAS = {
+    "presidencial": {
+        "tabla_voto": "VOTO_PRESIDENCIAL",
+        "columna_candidato": "ID_CANDIDATO",
+        "clave_candidato": "id_candidato",
+        "tabla_candidato": "CANDIDATO_PRESIDENCIAL",
+        "id_candidato": "ID_CANDIDATO_PRESIDENCIAL",
+    },
+    "regional": {
+        "tabla_voto": "VOTO_REGIONAL",
+        "columna_candidato": "ID_CANDIDATO_REGIONAL",
+        "clave_candidato": "id_candidato_regional",
+        "tabla_candidato": "CANDIDATO_REGIONAL",
+        "id_candidato": "ID_CANDIDATO_REGIONAL",
+    },
+    "distrital": {
+        "tabla_voto": "VOTO_DISTRITAL",
+        "columna_candidato": "ID_CANDIDATO_DISTRITAL",
+        "clave_candidato": "id_candidato_distrital",
+        "tabla_candidato": "CANDIDATO_DISTRITAL",
+        "id_candidato": "ID_CANDIDATO_DISTRITAL",
+    },
+}
+
+# Colección del motor JSON -> tabla de votos
+_TABLAS_VOTOS = {
+    "votos_presidenciales": "VOTO_PRESIDENCIAL",
+    "votos_regionales": "VOTO_REGIONAL",
+    "votos_distritales": "VOTO_DISTRITAL",
+    "votos_nulos": "VOTO_NULO",
+}
+
+_COLUMNAS_VOTANTE = (
+    ("id_votantes", "ID_VOTANTES"),
+    ("dni", "DNI"),
+    ("nombres", "NOMBRES"),
+    ("apellidos", "APELLIDOS"),
+    ("fecha_nacimiento", "FECHA_NACIMIENTO"),
+    ("region", "REGION"),
+    ("distrito", "DISTRITO"),
+    ("fecha_voto", "FECHA_VOTO"),
+)
+_SELECT_VOTANTE = f"SELECT {', '.join(columna for _, columna in _COLUMNAS_VOTANTE)} FROM VOTANTES"
+_UPSERT_VOTANTE = (
+    f"INSERT OR REPLACE INTO VOTANTES ({', '.join(columna for _, columna in _COLUMNAS_VOTANTE)}) "
+    f"VALUES ({', '.join('?' for _ in _COLUMNAS_VOTANTE)})"
+)
+
+
+def _votante_dict(row) -> Dict:
+    """Mismo formato que SimulatedStorage: las columnas desconocidas no aparecen (salvo fecha_voto)"""
+    votante = {}
+    for (clave, _), valor in zip(_COLUMNAS_VOTANTE, row):
+        if valor is not None or clave == "fecha_voto":
+            votante[clave] = valor
+    return votante
+
+
+class SQLiteStorage:
+    """
+    Una conexión por hilo, en modo WAL: las lecturas no bloquean a las escrituras.
+    transaction() abre BEGIN IMMEDIATE, que toma el lock de escritura de la base (también
+    entre procesos), así la secuencia verificar-y-escribir es atómica con varios workers.
+    lectura() abre un BEGIN diferido: ve una sola versión de la base y no espera a nadie.
+    """
+
+    def __init__(self, ruta: Path, durabilidad: str = DURABILIDAD_EN_LOTE, busy_timeout: float = 30.0):
+        if durabilidad not in MODOS_DURABILIDAD:
+            raise ValueError(f"Modo de durabilidad inválido: {durabilidad} (opciones: {', '.join(MODOS_DURABILIDAD)})")
+        self.ruta = ruta
+        self.durabilidad = durabilidad
+        self.busy_timeout = busy_timeout
+        # Compatibilidad con el código que toma storage.lock directamente
+        self.lock = threading.RLock()
+        self._local = threading.local()
+        self._conexiones: List[sqlite3.Connection] = []
+        self._conexiones_lock = threading.Lock()
+        self._metrics_lock = threading.Lock()
+        self._transactions = 0
+        self._rollbacks = 0
+        self._transaction_seconds = 0.0
+
+        ruta.parent.mkdir(parents=True, exist_ok=True)
+        conn = self._conexion()
+        conn.executescript(ESQUEMA)
+
+    def _conexion(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # isolation_level=None: las transacciones se abren explícitamente en transaction()
+            conn = sqlite3.connect(
+                str(self.ruta), timeout=self.busy_timeout, isolation_level=None,
+                check_same_thread=False, cached_statements=256
+            )
+            conn.execute("PRAGMA journal_mode=WAL")
+            # WAL + NORMAL no corrompe la base ante una caída, pero puede perder los últimos commits
+            conn.execute(
+                "PRAGMA synchronous=NORMAL" if self.durabilidad == DURABILIDAD_ASINCRONA else "PRAGMA synchronous=FULL"
+            )
+            conn.execute("PRAGMA foreign_keys=ON")
+            self._local.conn = conn
+            self._local.depth = 0
+            self._local.lectura = 0
+            with self._conexiones_lock:
+                self._conexiones.append(conn)
+        return conn
+
+    # ========== TRANSACCIONES ==========
+    @contextmanager
+    def transaction(self):
+        """Bloque verificar-y-escribir atómico; las transacciones anidadas forman parte de la exterior"""
+        conn = self._conexion()
+        if self._local.lectura and not self._local.depth:
+            # Subir una lectura a escritura puede chocar con otro escritor (SQLITE_BUSY sin espera)
+            raise RuntimeError("transaction() no puede abrirse dentro de lectura()")
+        if self._local.depth:
+            self._local.depth += 1
+            try:
+                yield self
+            finally:
+                self._local.depth -= 1
+            return
+        started = time.monotonic()
+        conn.execute("BEGIN IMMEDIATE")
+        self._local.depth = 1
+        try:
+            yield self
+        except BaseException:
+            conn.rollback()
+            with self._metrics_lock:
+                self._rollbacks += 1
+            raise
+        else:
+            conn.commit()
+        finally:
+            self._local.depth = 0
+            with self._metrics_lock:
+                self._transactions += 1
+                self._transaction_seconds += time.monotonic() - started
+
+    @contextmanager
+    def lectura(self):
+        """
+        Bloque de solo lectura: las consultas ven la misma versión de la base. Con WAL no toma
+        el lock de escritura, así que no espera a las transacciones en curso ni las demora.
+        Dentro de transaction() forma parte de ella
+        """
+        conn = self._conexion()
+        if self._local.depth or self._local.lectura:
+            self._local.lectura += 1
+            try:
+                yield self
+            finally:
+                self._local.lectura -= 1
+            return
+        conn.execute("BEGIN")
+        self._local.lectura = 1
+        try:
+            yield self
+        finally:
+            self._local.lectura = 0
+            conn.commit()
+
+    def _ejecutar(self, sql: str, parametros=()) -> sqlite3.Cursor:
+        return self._conexion().execute(sql, parametros)
+
+    def flush(self):
+        """Cada commit ya queda en el WAL; no hay nada pendiente"""
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Equivalente a la compactación del motor JSON: vuelca el WAL a la base y lo trunca"""
+        started = time.monotonic()
+        ocupado, paginas_wal, paginas_copiadas = self._ejecutar("PRAGMA wal_checkpoint(TRUNCATE)").fetchone()
+        return {
+            "checkpoint": "busy" if ocupado else "ok",
+            "walPages": paginas_wal,
+            "checkpointedPages": paginas_copiadas,
+            "ms": round((time.monotonic() - started) * 1000, 3),
+        }
+
+    def close(self):
+        with self._conexiones_lock:
+            for conn in self._conexiones:
+                try:
+                    conn.close()
+                except sqlite3.ProgrammingError:
+                    pass
+            self._conexiones.clear()
+        self._local = threading.local()
+
+    def metrics(self) -> Dict[str, Any]:
+        """Tamaño de las tablas y transacciones realizadas"""
+        votos = {nombre: self.count_votos(nombre) for nombre in _TABLAS_VOTOS}
+        with self._metrics_lock:
+            return {
+                "engine": "sqlite",
+                "path": str(self.ruta),
+                "synchronous": "NORMAL" if self.durabilidad == DURABILIDAD_ASINCRONA else "FULL",
+                "votantes": self.count_votantes(),
+                "votos": votos,
+                "transactions": self._transactions,
+                "rollbacks": self._rollbacks,
+                "avgTransactionMs": round(
+                    self._transaction_seconds / self._transactions * 1000, 3
+                ) if self._transactions else 0.0,
+                "connections": len(self._conexiones),
+            }
+
+    # ========== VOTANTES ==========
+    def get_votante(self, id_votantes: int) -> Optional[Dict]:
+        """Obtiene un votante por ID"""
+        row = self._ejecutar(f"{_SELECT_VOTANTE} WHERE ID_VOTANTES = ?", (id_votantes,)).fetchone()
+        return _votante_dict(row) if row else None
+
+    def get_votante_by_dni(self, dni: str) -> Optional[Dict]:
+        """Obtiene un votante por DNI"""
+        row = self._ejecutar(
+            f"{_SELECT_VOTANTE} WHERE DNI = ? ORDER BY ID_VOTANTES LIMIT 1", (dni,)
+        ).fetchone()
+        return _votante_dict(row) if row else None
+
+    def add_votante(self, votante: Dict) -> Dict:
+        """Agrega (o reemplaza) un votante"""
+        with self.transaction():
+            self._ejecutar(_UPSERT_VOTANTE, tuple(votante.get(clave) for clave, _ in _COLUMNAS_VOTANTE))
+        return votante
+
+    def update_votante_fecha_voto(self, id_votantes: int, fecha_voto: datetime):
+        """Actualiza la fecha de voto de un votante"""
+        with self.transaction():
+            self._ejecutar(
+                "UPDATE VOTANTES SET FECHA_VOTO = ? WHERE ID_VOTANTES = ?", (fecha_voto.isoformat(), id_votantes)
+            )
+
+    # ========== CANDIDATOS ==========
+    def _get_candidato(self, categoria: str, id_candidato: int) -> Optional[Dict]:
+        cfg = _CATEGORIAS[categoria]
+        row = self._ejecutar(
+            f"SELECT {cfg['id_candidato']}, NOMBRES, APELLIDOS, CANTIDAD_VOTOS "
+            f"FROM {cfg['tabla_candidato']} WHERE {cfg['id_candidato']} = ?",
+            (id_candidato,)
+        ).fetchone()
+        if not row:
+            return None
+        return {"id_candidato": row[0], "nombres": row[1], "apellidos": row[2], "cantidad_votos": row[3] or 0}
+
+    def _add_candidato(self, categoria: str, id_candidato: int, nombres: str, apellidos: str) -> Dict:
+        cfg = _CATEGORIAS[categoria]
+        with self.transaction():
+            self._ejecutar(
+                f"INSERT OR REPLACE INTO {cfg['tabla_candidato']} "
+                f"({cfg['id_candidato']}, NOMBRES, APELLIDOS, CANTIDAD_VOTOS) VALUES (?, ?, ?, 0)",
+                (id_candidato, nombres, apellidos)
+            )
+        return {"id_candidato": id_candidato, "nombres": nombres, "apellidos": apellidos, "cantidad_votos": 0}
+
+    def _update_candidato_votos(self, categoria: str, id_candidato: int, increment: int):
+        cfg = _CATEGORIAS[categoria]
+        with self.transaction():
+            self._ejecutar(
+                f"UPDATE {cfg['tabla_candidato']} SET CANTIDAD_VOTOS = COALESCE(CANTIDAD_VOTOS, 0) + ? "
+                f"WHERE {cfg['id_candidato']} = ?",
+                (increment, id_candidato)
+            )
+
+    def _get_all_candidatos(self, categoria: str) -> List[Dict]:
+        cfg = _CATEGORIAS[categoria]
+        return [
+            {"id_candidato": row[0], "nombres": row[1], "apellidos": row[2], "cantidad_votos": row[3] or 0}
+            for row in self._ejecutar(
+                f"SELECT {cfg['id_candidato']}, NOMBRES, APELLIDOS, CANTIDAD_VOTOS FROM {cfg['tabla_candidato']}"
+            )
+        ]
+
+    def get_candidato_presidencial(self, id_candidato: int) -> Optional[Dict]:
+        """Obtiene un candidato presidencial"""
+        return self._get_candidato("presidencial", id_candidato)
+
+    def add_candidato_presidencial(self, id_candidato: int, nombres: str, apellidos: str) -> Dict:
+        """Agrega un candidato presidencial sin votos"""
+        return self._add_candidato("presidencial", id_candidato, nombres, apellidos)
+
+    def get_candidato_regional(self, id_candidato: int) -> Optional[Dict]:
+        """Obtiene un candidato regional"""
+        return self._get_candidato("regional", id_candidato)
+
+    def add_candidato_regional(self, id_candidato: int, nombres: str, apellidos: str) -> Dict:
+        """Agrega un candidato regional sin votos"""
+        return self._add_candidato("regional", id_candidato, nombres, apellidos)
+
+    def get_candidato_distrital(self, id_candidato: int) -> Optional[Dict]:
+        """Obtiene un candidato distrital"""
+        return self._get_candidato("distrital", id_candidato)
+
+    def add_candidato_distrital(self, id_candidato: int, nombres: str, apellidos: str) -> Dict:
+        """Agrega un candidato distrital sin votos"""
+        return self._add_candidato("distrital", id_candidato, nombres, apellidos)
+
+    def update_candidato_presidencial_votos(self, id_candidato: int, increment: int = 1):
+        """Incrementa los votos de un candidato presidencial"""
+        self._update_candidato_votos("presidencial", id_candidato, increment)
+
+    def update_candidato_regional_votos(self, id_candidato: int, increment: int = 1):
+        """Incrementa los votos de un candidato regional"""
+        self._update_candidato_votos("regional", id_candidato, increment)
+
+    def update_candidato_distrital_votos(self, id_candidato: int, increment: int = 1):
+        """Incrementa los votos de un candidato distrital"""
+        self._update_candidato_votos("distrital", id_candidato, increment)
+
+    # ========== VOTOS ==========
+    def _count_votos(self, categoria: str, id_votantes: int) -> int:
+        return self._ejecutar(
+            f"SELECT COUNT(*) FROM {_CATEGORIAS[categoria]['tabla_voto']} WHERE ID_VOTANTES = ?", (id_votantes,)
+        ).fetchone()[0]
+
+    def _add_voto(self, categoria: str, id_votantes: int, id_candidato: int, nombre: str, apellido: str):
+        cfg = _CATEGORIAS[categoria]
+        with self.transaction():
+            self._ejecutar(
+                f"INSERT INTO {cfg['tabla_voto']} (ID_VOTANTES, {cfg['columna_candidato']}, NOMBRE, APELLIDO, FECHA) "
+                f"VALUES (?, ?, ?, ?, ?)",
+                (id_votantes, id_candidato, nombre, apellido, datetime.now().isoformat())
+            )
+
+    def _filas_votos(self, nombre: str, filtro: str = "", limite: str = "", parametros=()) -> List[tuple]:
+        """Filas (ID_VOTO_*, votos en el formato del motor JSON) de una colección en orden de registro"""
+        tabla = _TABLAS_VOTOS[nombre]
+        id_voto = tabla.replace("VOTO_", "ID_VOTO_")
+        consulta = f"{filtro.format(id_voto=id_voto)} ORDER BY {id_voto}{limite}"
+        if nombre == "votos_nulos":
+            return [
+                (row[0], {"id_votantes": row[1], "dni": row[2], "fecha": row[3]})
+                for row in self._ejecutar(
+                    f"SELECT {id_voto}, ID_VOTANTES, DNI, FECHA FROM VOTO_NULO {consulta}", parametros
+                )
+            ]
+        cfg = next(cfg for cfg in _CATEGORIAS.values() if cfg["tabla_voto"] == tabla)
+        return [
+            (row[0], {"id_votantes": row[1], cfg["clave_candidato"]: row[2], "nombre": row[3],
+                      "apellido": row[4], "fecha": row[5]})
+            for row in self._ejecutar(
+                f"SELECT {id_voto}, ID_VOTANTES, {cfg['columna_candidato']}, NOMBRE, APELLIDO, FECHA "
+                f"FROM {tabla} {consulta}",
+                parametros
+            )
+        ]
+
+    def _get_votos(self, nombre: str) -> List[Dict]:
+        """Votos de una colección en orden de registro, con el mismo formato que el motor JSON"""
+        return [voto for _, voto in self._filas_votos(nombre)]
+
+    def count_votos_presidenciales(self, id_votantes: int) -> int:
+        """Cuenta los votos presidenciales de un votante"""
+        return self._count_votos("presidencial", id_votantes)
+
+    def count_votos_regionales(self, id_votantes: int) -> int:
+        """Cuenta los votos regionales de un votante"""
+        return self._count_votos("regional", id_votantes)
+
+    def count_votos_distritales(self, id_votantes: int) -> int:
+        """Cuenta los votos distritales de un votante"""
+        return self._count_votos("distrital", id_votantes)
+
+    def add_voto_presidencial(self, id_votantes: int, id_candidato: int, nombre: str, apellido: str):
+        """Agrega un voto presidencial"""
+        self._add_voto("presidencial", id_votantes, id_candidato, nombre, apellido)
+
+    def add_voto_regional(self, id_votantes: int, id_candidato_regional: int, nombre: str, apellido: str):
+        """Agrega un voto regional"""
+        self._add_voto("regional", id_votantes, id_candidato_regional, nombre, apellido)
+
+    def add_voto_distrital(self, id_votantes: int, id_candidato_distrital: int, nombre: str, apellido: str):
+        """Agrega un voto distrital"""
+        self._add_voto("distrital", id_votantes, id_candidato_distrital, nombre, apellido)
+
+    def add_voto_nulo(self, id_votantes: int, dni: str):
+        """Agrega un voto nulo"""
+        with self.transaction():
+            self._ejecutar(
+                "INSERT INTO VOTO_NULO (ID_VOTANTES, DNI, FECHA) VALUES (?, ?, ?)",
+                (id_votantes, dni, datetime.now().isoformat())
+            )
+
+    # ========== LISTADOS ==========
+    def get_all_votantes(self) -> List[Dict]:
+        """Obtiene todos los votantes"""
+        return [_votante_dict(row) for row in self._ejecutar(f"{_SELECT_VOTANTE} ORDER BY ID_VOTANTES")]
+
+    def get_votantes_pagina(self, limit: int, despues_de: Optional[int] = None, region: Optional[str] = None,
+                            distrito: Optional[str] = None) -> List[Dict]:
+        """Hasta `limit` votantes con ID menor que `despues_de`, del más reciente al más antiguo"""
+        condiciones, parametros = [], []
+        for condicion, valor in (("ID_VOTANTES < ?", despues_de), ("REGION = ?", region), ("DISTRITO = ?", distrito)):
+            if valor is not None:
+                condiciones.append(condicion)
+                parametros.append(valor)
+        where = f" WHERE {' AND '.join(condiciones)}" if condiciones else ""
+        filas = self._ejecutar(f"{_SELECT_VOTANTE}{where} ORDER BY ID_VOTANTES DESC LIMIT ?", (*parametros, limit))
+        return [_votante_dict(row) for row in filas]
+
+    def get_votantes_desde(self, despues_de: int, limit: int) -> List[Dict]:
+        """Hasta `limit` votantes con ID mayor que `despues_de`, del más antiguo al más reciente"""
+        filas = self._ejecutar(
+            f"{_SELECT_VOTANTE} WHERE ID_VOTANTES > ? ORDER BY ID_VOTANTES LIMIT ?", (despues_de, limit)
+        )
+        return [_votante_dict(row) for row in filas]
+
+    def max_id_votantes(self) -> int:
+        """Mayor ID de votante registrado (0 si no hay ninguno)"""
+        return self._ejecutar("SELECT COALESCE(MAX(ID_VOTANTES), 0) FROM VOTANTES").fetchone()[0]
+
+    def get_all_candidatos_presidenciales(self) -> List[Dict]:
+        """Obtiene todos los candidatos presidenciales"""
+        return self._get_all_candidatos("presidencial")
+
+    def get_all_candidatos_regionales(self) -> List[Dict]:
+        """Obtiene todos los candidatos regionales"""
+        return self._get_all_candidatos("regional")
+
+    def get_all_candidatos_distritales(self) -> List[Dict]:
+        """Obtiene todos los candidatos distritales"""
+        return self._get_all_candidatos("distrital")
+
+    def get_all_votos_presidenciales(self) -> List[Dict]:
+        """Obtiene todos los votos presidenciales"""
+        return self._get_votos("votos_presidenciales")
+
+    def get_all_votos_regionales(self) -> List[Dict]:
+        """Obtiene todos los votos regionales"""
+        return self._get_votos("votos_regionales")
+
+    def get_all_votos_distritales(self) -> List[Dict]:
+        """Obtiene todos los votos distritales"""
+        return self._get_votos("votos_distritales")
+
+    def get_all_votos_nulos(self) -> List[Dict]:
+        """Obtiene todos los votos nulos"""
+        return self._get_votos("votos_nulos")
+
+    def count_votantes(self) -> int:
+        """Cantidad de votantes registrados"""
+        return self._ejecutar("SELECT COUNT(*) FROM VOTANTES").fetchone()[0]
+
+    def count_votos(self, nombre: str) -> int:
+        """Cantidad de votos de una colección (votos_presidenciales, ..., votos_nulos)"""
+        return self._ejecutar(f"SELECT COUNT(*) FROM {_TABLAS_VOTOS[nombre]}").fetchone()[0]
+
+    def get_votos_desde(self, nombre: str, desde: int, limit: int) -> Tuple[List[Dict], int]:
+        """
+        Hasta `limit` votos de una colección registrados después del cursor `desde`, en orden de
+        registro, y el cursor para la página siguiente (el ID del último voto devuelto)
+        """
+        # Paginación por clave: OFFSET recorrería todas las filas anteriores en cada página
+        filas = self._filas_votos(nombre, "WHERE {id_voto} > ?", " LIMIT ?", (desde, limit))
+        return [voto for _, voto in filas], (filas[-1][0] if filas else desde)
@@ -0,0 +1,237 @@
+"""
+Contadores de votos por candidato con escritura diferida
+Los INSERT en VOTO_* siguen siendo síncronos; los incrementos de CANTIDAD_VOTOS se suman
+en memoria y se escriben en lote cada pocos milisegundos, evitando la contención sobre
+las pocas filas de CANDIDATO_* que reciben todos los votos
+"""
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional
+
+from votos_sql import CATEGORIAS
+
+
+def recalcular_contadores(cursor):
+    """Recalcula CANTIDAD_VOTOS desde VOTO_* con un UPDATE por tabla (sin commit)"""
+    for cfg in CATEGORIAS.values():
+        cursor.execute(
+            f"""UPDATE c SET CANTIDAD_VOTOS = ISNULL(v.TOTAL, 0)
+                FROM {cfg['tabla_candidato']} c
+                LEFT JOIN (
+                    SELECT {cfg['columna_candidato']} AS ID, COUNT(*) AS TOTAL
+                    FROM {cfg['tabla_voto']} GROUP BY {cfg['columna_candidato']}
+                ) v ON v.ID = c.{cfg['id_candidato']}
+                WHERE ISNULL(c.CANTIDAD_VOTOS, -1) <> ISNULL(v.TOTAL, 0)"""
+        )
+
+
+class VoteCounterAggregator:
+    """
+    Acumula incrementos (categoría, candidato) -> n y los vuelca con un UPDATE por
+    candidato en una sola transacción. Si el volcado falla, los incrementos vuelven
+    a la cola. Lo que se pierda en una caída se recupera con reconcile(), que recalcula
+    CANTIDAD_VOTOS a partir de VOTO_* (la fuente de verdad).
+
+    Quien registra votos lo hace dentro de confirmando(), desde el INSERT hasta el add():
+    reconcile() espera a que terminen los votos en curso y frena los nuevos mientras recalcula,
+    así ningún voto queda contado en el recálculo y otra vez en los pendientes. Los pendientes
+    de otros procesos no se ven: con varios workers el recálculo los contaría dos veces.
+    """
+
+    def __init__(
+        self,
+        connect: Callable[[], Any],
+        flush_interval: float = 0.5,
+        max_pending: int = 1000,
+        on_flush: Optional[Callable[[Dict[str, Dict[int, int]]], None]] = None,
+    ):
+        self._connect = connect
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._on_flush = on_flush
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._gate = threading.Condition()
+        self._confirmando = 0
+        self._reconciliando = False
+        self._pending: Dict[str, Dict[int, int]] = {categoria: {} for categoria in CATEGORIAS}
+        self._pending_total = 0
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        # Métricas
+        self._flushes = 0
+        self._flushed_votes = 0
+        self._failures = 0
+        self._last_flush_ms = 0.0
+        self._last_error: Optional[str] = None
+
+    # ========== ACUMULACIÓN ==========
+    def add(self, categoria: str, id_candidato: int, n: int = 1):
+        """Suma votos pendientes para un candidato (después del commit del voto)"""
+        with self._lock:
+            pendientes = self._pending[categoria]
+            pendientes[id_candidato] = pendientes.get(id_candidato, 0) + n
+            self._pending_total += n
+            lleno = self._pending_total >= self.max_pending
+        if lleno:
+            self._wakeup.set()
+
+    @contextmanager
+    def confirmando(self):
+        """Envuelve el registro de votos (INSERT, commit y add()) para que reconcile() no lo corte"""
+        with self._gate:
+            while self._reconciliando:
+                self._gate.wait()
+            self._confirmando += 1
+        try:
+            yield
+        finally:
+            with self._gate:
+                self._confirmando -= 1
+                if not self._confirmando:
+                    self._gate.notify_all()
+
+    def pending(self) -> Dict[str, Dict[int, int]]:
+        """Copia de los incrementos aún no escritos en la base de datos"""
+        with self._lock:
+            return {categoria: dict(ids) for categoria, ids in self._pending.items()}
+
+    # ========== VOLCADO ==========
+    def flush(self) -> int:
+        """Escribe los incrementos pendientes; devuelve cuántos votos se volcaron"""
+        with self._flush_lock:
+            with self._lock:
+                lote = self._pending
+                total = self._pending_total
+                self._pending = {categoria: {} for categoria in CATEGORIAS}
+                self._pending_total = 0
+            if not total:
+                return 0
+
+            started = time.monotonic()
+            try:
+                conn = self._connect()
+                cursor = conn.cursor()
+                try:
+                    for categoria, incrementos in lote.items():
+                        if not incrementos:
+                            continue
+                        cfg = CATEGORIAS[categoria]
+                        # Orden fijo de filas para que varios procesos no se bloqueen mutuamente
+                        cursor.executemany(
+                            f"UPDATE {cfg['tabla_candidato']} SET CANTIDAD_VOTOS = CANTIDAD_VOTOS + ? "
+                            f"WHERE {cfg['id_candidato']} = ?",
+                            [(n, id_candidato) for id_candidato, n in sorted(incrementos.items())]
+                        )
+                    conn.commit()
+                except Exception:
+                    conn.rollback()
+                    raise
+                finally:
+                    cursor.close()
+                    conn.close()
+            except Exception as e:
+                self._requeue(lote, total)
+                with self._lock:
+                    self._failures += 1
+                    self._last_error = str(e)
+                raise
+
+            with self._lock:
+                self._flushes += 1
+                self._flushed_votes += total
+                self._last_flush_ms = (time.monotonic() - started) * 1000
+                self._last_error = None
+            if self._on_flush is not None:
+                self._on_flush(lote)
+            return total
+
+    def _requeue(self, lote: Dict[str, Dict[int, int]], total: int):
+        with self._lock:
+            for categoria, incrementos in lote.items():
+                pendientes = self._pending[categoria]
+                for id_candidato, n in incrementos.items():
+                    pendientes[id_candidato] = pendientes.get(id_candidato, 0) + n
+            self._pending_total += total
+
+    # ========== RECONCILIACIÓN ==========
+    def reconcile(self):
+        """
+        Recalcula CANTIDAD_VOTOS desde VOTO_* en una pasada por tabla y descarta los pendientes
+        de este proceso, que el recálculo ya incluye. Mientras tanto no se registran votos en
+        este proceso. Con varios workers, debe correrse cuando ninguno tenga incrementos
+        pendientes (p. ej. al arrancarlos todos a la vez)
+        """
+        with self._flush_lock:
+            with self._gate:
+                self._reconciliando = True
+                # Los votos en curso terminan su add(); los nuevos esperan en confirmando()
+                while self._confirmando:
+                    self._gate.wait()
+            try:
+                conn = self._connect()
+                cursor = conn.cursor()
+                try:
+                    recalcular_contadores(cursor)
+                    conn.commit()
+                except Exception:
+                    conn.rollback()
+                    raise
+                finally:
+                    cursor.close()
+                    conn.close()
+                with self._lock:
+                    # Todos los pendientes son votos ya confirmados: el recálculo los incluye
+                    self._pending = {categoria: {} for categoria in CATEGORIAS}
+                    self._pending_total = 0
+            finally:
+                with self._gate:
+                    self._reconciliando = False
+                    self._gate.notify_all()
+
+    # ========== HILO DE FONDO ==========
+    def start(self):
+        """Inicia el volcado periódico en segundo plano"""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="vote-counters", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Detiene el hilo y vuelca lo pendiente"""
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout=10)
+        try:
+            self.flush()
+        except Exception as e:
+            print(f"No se pudieron volcar los contadores pendientes: {e}")
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Error volcando contadores de votos: {e}")
+                # Evitar reintentos en bucle si la base de datos no responde
+                self._stopped.wait(self.flush_interval)
+
+    def metrics(self) -> Dict[str, Any]:
+        """Pendientes, volcados y errores"""
+        with self._lock:
+            return {
+                "flushIntervalMs": self.flush_interval * 1000,
+                "maxPending": self.max_pending,
+                "pendingVotes": self._pending_total,
+                "flushes": self._flushes,
+                "flushedVotes": self._flushed_votes,
+                "failures": self._failures,
+                "lastFlushMs": round(self._last_flush_ms, 3),
+                "lastError": self._last_error,
+            }
@@ -0,0 +1,224 @@
+"""
+Registro de votos en SQL Server en un solo viaje de red
+Cada voto se valida, inserta y contabiliza con un único lote T-SQL en lugar de 7+ consultas sueltas
+"""
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+# Códigos devueltos por los lotes T-SQL
+VOTO_OK = "OK"
+VOTANTE_NO_ENCONTRADO = "VOTANTE_NO_ENCONTRADO"
+VOTOS_COMPLETOS = "VOTOS_COMPLETOS"
+YA_VOTO = "YA_VOTO"
+CANDIDATO_NO_ENCONTRADO = "CANDIDATO_NO_ENCONTRADO"
+
+# Tablas y mensajes de cada categoría de voto
+CATEGORIAS: Dict[str, Dict] = {
+    "presidencial": {
+        "tabla_voto": "VOTO_PRESIDENCIAL",
+        "columna_candidato": "ID_CANDIDATO",
+        "tabla_candidato": "CANDIDATO_PRESIDENCIAL",
+        "id_candidato": "ID_CANDIDATO_PRESIDENCIAL",
+        "actualiza_fecha_voto": True,
+        "candidato_no_encontrado": "Candidato no encontrado",
+    },
+    "regional": {
+        "tabla_voto": "VOTO_REGIONAL",
+        "columna_candidato": "ID_CANDIDATO_REGIONAL",
+        "tabla_candidato": "CANDIDATO_REGIONAL",
+        "id_candidato": "ID_CANDIDATO_REGIONAL",
+        "actualiza_fecha_voto": False,
+        "candidato_no_encontrado": "Candidato regional no encontrado",
+    },
+    "distrital": {
+        "tabla_voto": "VOTO_DISTRITAL",
+        "columna_candidato": "ID_CANDIDATO_DISTRITAL",
+        "tabla_candidato": "CANDIDATO_DISTRITAL",
+        "id_candidato": "ID_CANDIDATO_DISTRITAL",
+        "actualiza_fecha_voto": False,
+        "candidato_no_encontrado": "Candidato distrital no encontrado",
+    },
+}
+
+
+class VotoRechazado(Exception):
+    """El voto no cumple las validaciones; lleva el código HTTP y el mensaje para el cliente"""
+
+    def __init__(self, status_code: int, detail: str, codigo: Optional[str] = None,
+                 categoria: Optional[str] = None):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.codigo = codigo
+        self.categoria = categoria
+
+
+def error_voto(categoria: str, codigo: str) -> VotoRechazado:
+    """Traduce un código de rechazo al mismo error que devolvían los endpoints"""
+    if codigo == VOTANTE_NO_ENCONTRADO:
+        status_code, detail = 404, "Votante no encontrado"
+    elif codigo == VOTOS_COMPLETOS:
+        status_code, detail = 400, "El votante ya ha ejercido todos sus votos (presidencial, regional y distrital)"
+    elif codigo == YA_VOTO:
+        status_code, detail = 400, f"El votante ya ha ejercido su voto {categoria}"
+    elif codigo == CANDIDATO_NO_ENCONTRADO:
+        status_code, detail = 404, CATEGORIAS[categoria]["candidato_no_encontrado"]
+    else:
+        status_code, detail = 500, f"Respuesta inesperada al registrar voto: {codigo}"
+    return VotoRechazado(status_code, detail, codigo=codigo, categoria=categoria)
+
+
+def marca_fecha_voto(votos: Dict[str, int]) -> bool:
+    """True si los votos (categoría -> candidato) actualizan FECHA_VOTO: la boleta o el voto presidencial"""
+    return len(votos) > 1 or any(CATEGORIAS[categoria]["actualiza_fecha_voto"] for categoria in votos)
+
+
+# El UPDLOCK sobre la fila del votante serializa votos simultáneos del mismo votante
+# hasta el commit, así dos peticiones concurrentes no pueden pasar ambas la validación.
+# La misma lectura trae la región y el distrito del votante para los resultados por área.
+def _validar_votante(columna_extra: str = "") -> str:
+    return f"""
+DECLARE @region VARCHAR(100), @distrito VARCHAR(100);
+SELECT @region = REGION, @distrito = DISTRITO
+FROM VOTANTES WITH (UPDLOCK, ROWLOCK) WHERE ID_VOTANTES = @id_votantes;
+IF @@ROWCOUNT = 0
+BEGIN
+    SELECT 'VOTANTE_NO_ENCONTRADO'{columna_extra};
+    RETURN;
+END
+DECLARE @p INT, @r INT, @d INT;
+SELECT @p = COUNT(*) FROM VOTO_PRESIDENCIAL WHERE ID_VOTANTES = @id_votantes;
+SELECT @r = COUNT(*) FROM VOTO_REGIONAL WHERE ID_VOTANTES = @id_votantes;
+SELECT @d = COUNT(*) FROM VOTO_DISTRITAL WHERE ID_VOTANTES = @id_votantes;
+IF @p >= 1 AND @r >= 1 AND @d >= 1
+BEGIN
+    SELECT 'VOTOS_COMPLETOS'{columna_extra};
+    RETURN;
+END
+"""
+
+_VARIABLE_CATEGORIA = {"presidencial": "@p", "regional": "@r", "distrital": "@d"}
+
+
+def _lote_voto(categoria: str, actualizar_contador: bool) -> str:
+    cfg = CATEGORIAS[categoria]
+    contador = (
+        f"UPDATE {cfg['tabla_candidato']} SET CANTIDAD_VOTOS = CANTIDAD_VOTOS + 1 "
+        f"WHERE {cfg['id_candidato']} = @id_candidato;"
+        if actualizar_contador else ""
+    )
+    fecha_voto = (
+        "UPDATE VOTANTES SET FECHA_VOTO = @fecha WHERE ID_VOTANTES = @id_votantes;"
+        if cfg["actualiza_fecha_voto"] else ""
+    )
+    return f"""
+SET NOCOUNT ON;
+DECLARE @id_votantes INT = ?, @id_candidato INT = ?, @fecha DATETIME = ?;
+DECLARE @nombre VARCHAR(100), @apellido VARCHAR(100);
+{_validar_votante()}
+IF {_VARIABLE_CATEGORIA[categoria]} >= 1
+BEGIN
+    SELECT 'YA_VOTO';
+    RETURN;
+END
+SELECT @nombre = NOMBRES, @apellido = APELLIDOS
+FROM {cfg['tabla_candidato']} WHERE {cfg['id_candidato']} = @id_candidato;
+IF @@ROWCOUNT = 0
+BEGIN
+    SELECT 'CANDIDATO_NO_ENCONTRADO';
+    RETURN;
+END
+INSERT INTO {cfg['tabla_voto']} (ID_VOTANTES, {cfg['columna_candidato']}, NOMBRE, APELLIDO)
+VALUES (@id_votantes, @id_candidato, @nombre, @apellido);
+{contador}
+{fecha_voto}
+SELECT 'OK', @region, @distrito;
+"""
+
+
+# (categoría, actualizar CANTIDAD_VOTOS) -> lote
+LOTES_VOTO: Dict[Tuple[str, bool], str] = {
+    (categoria, contador): _lote_voto(categoria, contador)
+    for categoria in CATEGORIAS for contador in (True, False)
+}
+
+
+def _lote_boleta(actualizar_contadores: bool) -> str:
+    declaraciones = []
+    rechazos = []
+    candidatos = []
+    registros = []
+    for categoria, cfg in CATEGORIAS.items():
+        variable = _VARIABLE_CATEGORIA[categoria]
+        declaraciones.append(f"DECLARE {variable}_nombre VARCHAR(100), {variable}_apellido VARCHAR(100);")
+        rechazos.append(f"""
+IF {variable} >= 1
+BEGIN
+    SELECT 'YA_VOTO', '{categoria}';
+    RETURN;
+END""")
+        candidatos.append(f"""
+SELECT {variable}_nombre = NOMBRES, {variable}_apellido = APELLIDOS
+FROM {cfg['tabla_candidato']} WHERE {cfg['id_candidato']} = {variable}_candidato;
+IF @@ROWCOUNT = 0
+BEGIN
+    SELECT 'CANDIDATO_NO_ENCONTRADO', '{categoria}';
+    RETURN;
+END""")
+        registros.append(f"""
+INSERT INTO {cfg['tabla_voto']} (ID_VOTANTES, {cfg['columna_candidato']}, NOMBRE, APELLIDO)
+VALUES (@id_votantes, {variable}_candidato, {variable}_nombre, {variable}_apellido);""")
+        if actualizar_contadores:
+            registros.append(f"""
+UPDATE {cfg['tabla_candidato']} SET CANTIDAD_VOTOS = CANTIDAD_VOTOS + 1
+WHERE {cfg['id_candidato']} = {variable}_candidato;""")
+    return f"""
+SET NOCOUNT ON;
+DECLARE @id_votantes INT = ?, @p_candidato INT = ?, @r_candidato INT = ?, @d_candidato INT = ?, @fecha DATETIME = ?;
+{chr(10).join(declaraciones)}
+{_validar_votante(", NULL")}
+{''.join(rechazos)}
+{''.join(candidatos)}
+{''.join(registros)}
+UPDATE VOTANTES SET FECHA_VOTO = @fecha WHERE ID_VOTANTES = @id_votantes;
+SELECT 'OK', NULL, @region, @distrito;
+"""
+
+
+LOTES_BOLETA: Dict[bool, str] = {contador: _lote_boleta(contador) for contador in (True, False)}
+
+
+def emitir_voto(cursor, categoria: str, id_votantes: int, id_candidato: int,
+                fecha: Optional[datetime] = None, actualizar_contador: bool = True) -> Tuple[str, str]:
+    """
+    Valida y registra un voto con un solo lote T-SQL; devuelve (región, distrito) del votante.
+    Lanza VotoRechazado con la misma semántica de error que la ruta anterior;
+    el commit o rollback queda a cargo de quien llama. Con actualizar_contador=False
+    no se toca CANTIDAD_VOTOS (lo hace el agregador de contadores).
+    """
+    cursor.execute(
+        LOTES_VOTO[(categoria, actualizar_contador)],
+        (id_votantes, id_candidato, fecha or datetime.now())
+    )
+    fila = cursor.fetchone()
+    if fila[0] != VOTO_OK:
+        raise error_voto(categoria, fila[0])
+    return fila[1], fila[2]
+
+
+def emitir_boleta(cursor, id_votantes: int, id_candidato: int, id_candidato_regional: int,
+                  id_candidato_distrital: int, fecha: Optional[datetime] = None,
+                  actualizar_contadores: bool = True) -> Tuple[str, str]:
+    """
+    Valida y registra los tres votos de un votante con un solo lote T-SQL; devuelve (región, distrito)
+    del votante. Si alguna categoría falla no se registra ninguna; el commit queda a cargo de quien llama.
+    """
+    cursor.execute(
+        LOTES_BOLETA[actualizar_contadores],
+        (id_votantes, id_candidato, id_candidato_regional, id_candidato_distrital, fecha or datetime.now())
+    )
+    fila = cursor.fetchone()
+    codigo, categoria = fila[0], fila[1]
+    if codigo != VOTO_OK:
+        raise error_voto(categoria or "presidencial", codigo)
+    return fila[2], fila[3]
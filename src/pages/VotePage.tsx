@@ -18,6 +18,7 @@ import {
   createVotoPresidencial,
   createVotoRegional,
   createVotoDistrital,
+  createBoleta,
   getDniInfoFromFactiliza,
   type Candidato
 } from "@/services/voteService";
@@ -624,6 +625,12 @@ export default function VotePage() {
     photo: string;
   } | null>(null);
   const [showSuccessToast, setShowSuccessToast] = useState(false);
+  const [successMessage, setSuccessMessage] = useState("¡Voto registrado exitosamente!");
+  
+  // Selecciones de la boleta: sin votos previos, las tres categorías se envían juntas al confirmar la última
+  const [ballotSelections, setBallotSelections] = useState<
+    Partial<Record<'presidencial' | 'regional' | 'distrital', { id: number; name: string; party: string; photo: string }>>
+  >({});
   
   // Estados para candidatos desde BD
   const [presidentialCandidatesFromDB, setPresidentialCandidatesFromDB] = useState<Candidato[]>([]);
@@ -1071,6 +1078,25 @@ export default function VotePage() {
       return;
     }
 
+    // Sin votos previos la boleta se arma en el navegador y se registra completa en una sola petición
+    const votoPorBoleta = !hasVotedPresidencial && !hasVotedRegional && !hasVotedDistrital;
+    const seleccion = { ...ballotSelections, [activeCategory]: selectedCandidate };
+    if (votoPorBoleta && (!seleccion.presidencial || !seleccion.regional || !seleccion.distrital)) {
+      setBallotSelections(seleccion);
+      setShowConfirmModal(false);
+      setSelectedCandidate(null);
+      setSuccessMessage("Selección guardada. Elija un candidato en las demás categorías para emitir su voto.");
+      setShowSuccessToast(true);
+      setTimeout(() => {
+        setShowSuccessToast(false);
+      }, 3000);
+      const pendiente = categories.find((category) => !seleccion[category.id]);
+      if (pendiente) {
+        setActiveCategory(pendiente.id);
+      }
+      return;
+    }
+
     try {
       setIsSubmitting(true);
       setError("");
@@ -1143,9 +1169,25 @@ export default function VotePage() {
         }
       }
       
-      // PASO 2: Registrar el voto en la BD según la categoría
+      // PASO 2: Registrar la boleta completa o el voto de la categoría
       try {
-        if (activeCategory === 'presidencial') {
+        if (votoPorBoleta && seleccion.presidencial && seleccion.regional && seleccion.distrital) {
+          if (!voterRegion || !voterDistrito) {
+            throw new Error("Debe seleccionar una región y un distrito para votar");
+          }
+          await createBoleta(
+            votanteId,
+            seleccion.presidencial.id,
+            seleccion.regional.id,
+            voterRegion,
+            seleccion.distrital.id,
+            voterDistrito
+          );
+          setHasVotedPresidencial(true);
+          setHasVotedRegional(true);
+          setHasVotedDistrital(true);
+          setBallotSelections({});
+        } else if (activeCategory === 'presidencial') {
           await createVotoPresidencial(votanteId, selectedCandidate.id);
           setHasVotedPresidencial(true); // Marcar que ya votó presidencial
         } else if (activeCategory === 'regional') {
@@ -1186,6 +1228,7 @@ export default function VotePage() {
       setSelectedCandidate(null);
       
       // Mostrar toast de éxito
+      setSuccessMessage("¡Voto registrado exitosamente!");
       setShowSuccessToast(true);
       
       // Ocultar el toast después de 3 segundos
@@ -1197,7 +1240,7 @@ export default function VotePage() {
       await loadCandidatesFromDB();
       
       // Si votó presidencial, cambiar a otra categoría automáticamente
-      if (activeCategory === 'presidencial') {
+      if (!votoPorBoleta && activeCategory === 'presidencial') {
         if (!hasVotedRegional) {
           setActiveCategory('regional');
         } else if (!hasVotedDistrital) {
@@ -1260,7 +1303,12 @@ export default function VotePage() {
         return;
       }
 
-      // Si aún le falta votar en alguna categoría, permitir acceso a la pantalla de candidatos
+      // Si aún le falta votar en alguna categoría, permitir acceso a la pantalla de candidatos.
+      // Con algún voto previo las categorías restantes se registran una por una
+      setHasVotedPresidencial(!status.can_vote_presidencial);
+      setHasVotedRegional(!status.can_vote_regional);
+      setHasVotedDistrital(!status.can_vote_distrital);
+      setBallotSelections({});
       setIsMinor(false);
       setIsAuthenticated(true);
     } catch (err) {
@@ -1327,6 +1375,13 @@ export default function VotePage() {
                   }`}>
                     {getCandidatesByCategory().length} candidatos
                   </p>
+                  {ballotSelections[category.id] && (
+                    <p className={`text-sm font-medium mt-1 ${
+                      activeCategory === category.id ? 'text-white' : 'text-green-700'
+                    }`}>
+                      Seleccionado: {ballotSelections[category.id]?.name}
+                    </p>
+                  )}
                 </CardContent>
               </Card>
             ))}
@@ -1400,7 +1455,7 @@ export default function VotePage() {
                   <path strokeLinecap="round" strokeLinejoin="round" strokeWidth={2} d="M5 13l4 4L19 7" />
                 </svg>
               </div>
-              <span className="font-medium">¡Voto registrado exitosamente!</span>
+              <span className="font-medium">{successMessage}</span>
             </div>
           </div>
         )}
@@ -13,7 +13,7 @@ export const API_BASE_URL = import.meta.env.VITE_API_BASE_URL || 'http://localho
 export interface AnalysisStats {
   activeVoters: number;
   participationRate: number;
-  peakActivityTime: string;
+  peakActivityTime: string | null;
   totalVotes: number;
 }
 
@@ -81,25 +81,49 @@ export const getResultsSummary = async (): Promise<ResultsSummary> => {
 };
 
 /**
- * Suscribe a actualizaciones en tiempo real (WebSocket)
+ * Suscribe a actualizaciones en tiempo real (Server-Sent Events)
+ *
+ * El backend envía un evento `snapshot` con los resultados completos al conectar
+ * (y periódicamente) y eventos `votos` con cada voto confirmado; los deltas
+ * presidenciales se aplican sobre el último resumen recibido.
  */
 export const subscribeToRealtimeResults = (
   callback: (data: ResultsSummary) => void
 ): (() => void) => {
-  // TODO: Implementar WebSocket cuando esté listo
-  // const ws = new WebSocket(`${WS_BASE_URL}/results/realtime`);
-  // ws.onmessage = (event) => {
-  //   const data = JSON.parse(event.data);
-  //   callback(data);
-  // };
-  // return () => ws.close();
-  
-  // Simulación temporal con polling
-  const interval = setInterval(async () => {
-    const data = await getResultsSummary();
-    callback(data);
-  }, 30000); // Actualizar cada 30 segundos
-  
-  return () => clearInterval(interval);
-};
+  const source = new EventSource(`${API_BASE_URL}/resultados/stream`);
+  let summary: ResultsSummary | null = null;
+
+  source.addEventListener('snapshot', (event) => {
+    const data = JSON.parse((event as MessageEvent).data);
+    summary = data.summary as ResultsSummary;
+    callback(summary);
+  });
+
+  source.addEventListener('votos', (event) => {
+    if (!summary) return;
+    const data = JSON.parse((event as MessageEvent).data) as {
+      votos: Array<{ categoria: string; id_candidato: number }>;
+    };
+    const presidenciales = data.votos.filter((voto) => voto.categoria === 'presidencial');
+    if (presidenciales.length === 0) return;
 
+    const totalVotes = summary.totalVotes + presidenciales.length;
+    const candidates = summary.candidates.map((candidate) => {
+      const votes = candidate.votes + presidenciales.filter((voto) => voto.id_candidato === candidate.id).length;
+      return {
+        ...candidate,
+        votes,
+        percentage: totalVotes > 0 ? Math.round((votes / totalVotes) * 10000) / 100 : 0
+      };
+    });
+    summary = { ...summary, totalVotes, candidates };
+    callback(summary);
+  });
+
+  source.onerror = (error) => {
+    // EventSource reintenta la conexión automáticamente
+    console.error('Error en el stream de resultados:', error);
+  };
+
+  return () => source.close();
+};
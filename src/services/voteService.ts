@@ -22,7 +22,6 @@ export interface Candidato {
   nombres: string;
   apellidos: string;
   nombre_completo: string;
-  cantidad_votos: number;
 }
 
 export interface VotanteCreate {
@@ -332,6 +331,43 @@ export const createVotoDistrital = async (
   }
 };
 
+/**
+ * Registra los votos presidencial, regional y distrital en una sola petición.
+ * El backend los guarda en una única transacción: o se registran los tres o ninguno.
+ */
+export const createBoleta = async (
+  id_votantes: number,
+  id_candidato: number,
+  id_candidato_regional: number,
+  region: string,
+  id_candidato_distrital: number,
+  distrito: string
+): Promise<void> => {
+  try {
+    const response = await fetch(`${API_BASE_URL}/votos/ballot`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({
+        id_votantes,
+        id_candidato,
+        id_candidato_regional,
+        region,
+        id_candidato_distrital,
+        distrito
+      })
+    });
+    
+    if (!response.ok) {
+      const errorData = await response.json().catch(() => ({ detail: 'Error desconocido' }));
+      const errorMessage = errorData.detail || `Error ${response.status}: ${response.statusText}`;
+      throw new Error(errorMessage);
+    }
+  } catch (error) {
+    console.error('Error creating boleta:', error);
+    throw error;
+  }
+};
+
 /**
  * Registra un voto nulo
  */